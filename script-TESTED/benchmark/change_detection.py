@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+from pyremoteplay.receiver.synthetic import synthetic_clip
+
+from benchmark.decode_modes import BenchReceiver, RESOLUTIONS, SECONDS, bench_session
+
+FPS = 30
+# Ogni immagine resta a schermo per HOLD frame: solo un frame su HOLD cambia.
+HOLD = 4
+THRESHOLD = 0.02
+PIXEL_THRESHOLD = 1.0
+
+
+class ScoreReceiver(BenchReceiver):
+    """ Receiver che registra per ogni frame decodificato se è stato emesso. """
+
+    def __init__(self):
+        super().__init__()
+        self.outputs = []
+
+    def handle_video_data(self, buf):
+        frames = self.frames
+        super().handle_video_data(buf)
+        self.outputs.append(self.frames > frames)
+
+
+def bitstream_detection(packets, resolution):
+    """ Scarta i frame statici con vettori di moto e dimensione dei pacchetti, prima della conversione. """
+    receiver = ScoreReceiver()
+    receiver.set_change_detection(threshold=THRESHOLD)
+    receiver._set_session(bench_session("h264", resolution))
+    receiver._get_video_codec()
+    cpu_start = time.process_time()
+    for packet in packets:
+        receiver.handle_video_data(packet)
+    cpu = time.process_time() - cpu_start
+    receiver.close()
+    return cpu, receiver.outputs
+
+
+def pixel_detection(packets, resolution):
+    """ Metodo attuale: decodifica, converte in RGB ogni frame e confronta i pixel. """
+    receiver = ScoreReceiver()
+    receiver._set_session(bench_session("h264", resolution))
+    receiver._get_video_codec()
+    previous = None
+    changed = []
+
+    def handle_video(frame):
+        nonlocal previous
+        img = frame.to_ndarray().astype(np.int16)
+        diff = np.abs(img - previous).mean() if previous is not None else 255.0
+        changed.append(diff >= PIXEL_THRESHOLD)
+        previous = img
+
+    receiver.handle_video = handle_video
+    cpu_start = time.process_time()
+    for packet in packets:
+        receiver.handle_video_data(packet)
+    cpu = time.process_time() - cpu_start
+    receiver.close()
+    return cpu, changed
+
+
+def accuracy(detected):
+    """ Percentuale di frame classificati come il riferimento (cambia solo ogni HOLD frame). """
+    expected = [index % HOLD == 0 for index in range(len(detected))]
+    matches = sum(a == b for a, b in zip(detected, expected))
+    return matches / len(detected) * 100 if detected else 0.0
+
+
+def main():
+    print("📊 Rilevamento cambiamenti: bitstream (vettori di moto) vs differenza di pixel")
+    print(f"{'clip':<12}{'metodo':<11}{'CPU s':>8}{'ms/frame':>10}{'emessi':>8}{'accuratezza':>13}")
+    for res_name, (width, height) in RESOLUTIONS.items():
+        packets = synthetic_clip("h264", width, height, FPS, SECONDS, hold=HOLD)
+        clip = f"{res_name}@{FPS}"
+        for name, method in (("bitstream", bitstream_detection), ("pixel", pixel_detection)):
+            cpu, detected = method(packets, res_name)
+            per_frame = cpu * 1000 / len(packets)
+            print(
+                f"{clip:<12}{name:<11}{cpu:>8.2f}{per_frame:>10.2f}"
+                f"{sum(detected):>8}{accuracy(detected):>12.1f}%"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import time
+from types import SimpleNamespace
+
+from pyremoteplay.receiver import AVReceiver
+from pyremoteplay.receiver.synthetic import synthetic_clip
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080)}
+FPS_LIST = (30, 60)
+SECONDS = 5
+
+# (nome, modalità, parametri di set_decode_mode)
+MODES = [
+    ("tutti", "all", {}),
+    ("keyframe", "keyframe", {}),
+    ("ogni 10", "nth", {"interval": 10}),
+    ("2 fps", "fps", {"fps": 2}),
+]
+
+
+class BenchReceiver(AVReceiver):
+    """ Receiver che conta i frame in uscita senza conservarli. """
+
+    def __init__(self):
+        super().__init__()
+        self.frames = 0
+
+    def handle_video(self, frame):
+        self.frames += 1
+
+    def handle_audio(self, frame):
+        pass
+
+
+def bench_session(codec, resolution):
+    """ Sessione minima con gli attributi usati dal receiver per creare il decoder. """
+    return SimpleNamespace(
+        codec=codec,
+        decode_profile="full",
+        decoder_config={},
+        resolution=resolution,
+        mac_address="",
+    )
+
+
+def run_mode(packets, resolution, fps, mode, params, codec="h264"):
+    """ Decodifica il clip al ritmo reale dei frame e misura il tempo CPU. """
+    receiver = BenchReceiver()
+    receiver._set_session(bench_session(codec, resolution))
+    receiver._get_video_codec()
+    receiver.set_decode_mode(mode, **params)
+
+    interval = 1.0 / fps
+    cpu = 0.0
+    start = time.monotonic()
+    for index, packet in enumerate(packets):
+        # La modalità fps usa il clock reale: simuliamo l'arrivo dei frame.
+        delay = start + index * interval - time.monotonic()
+        if delay > 0 and mode == "fps":
+            time.sleep(delay)
+        cpu_start = time.process_time()
+        receiver.handle_video_data(packet)
+        cpu += time.process_time() - cpu_start
+    receiver.close()
+    return cpu, receiver.frames
+
+
+def main():
+    print("📊 Benchmark modalità di decodifica (RGB24, un solo thread chiamante)")
+    print(f"{'clip':<12}{'modalità':<12}{'CPU s':>8}{'% core':>9}{'frame':>8}")
+    for res_name, (width, height) in RESOLUTIONS.items():
+        for fps in FPS_LIST:
+            packets = synthetic_clip("h264", width, height, fps, SECONDS)
+            clip = f"{res_name}@{fps}"
+            for name, mode, params in MODES:
+                cpu, frames = run_mode(packets, res_name, fps, mode, params)
+                usage = cpu / SECONDS * 100
+                print(f"{clip:<12}{name:<12}{cpu:>8.2f}{usage:>8.1f}%{frames:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import sys
+
+from pyremoteplay.receiver.probe import get_rankings
+
+
+def main():
+    """ Riesegue il benchmark dei decoder e salva la classifica per questa macchina. """
+    stream_type = sys.argv[1] if len(sys.argv) > 1 else "h264"
+    print(f"📊 Benchmark dei decoder {stream_type} disponibili (può richiedere qualche minuto)...")
+    rankings = get_rankings(stream_type, refresh=True)
+    for key, results in rankings.items():
+        print(f"\n🎞️ {key}")
+        for position, result in enumerate(results, start=1):
+            print(
+                f"  {position}. {result['codec']:<14}{result['thread_type']:<7}"
+                f"{result['ms_per_frame']:>7.2f} ms/frame  ritardo {result['delay_frames']} frame"
+            )
+    print("\n✅ Classifica salvata. Le sessioni con codec='auto' useranno il primo decoder.")
+
+
+if __name__ == "__main__":
+    main()
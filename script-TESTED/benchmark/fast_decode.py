@@ -0,0 +1,56 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from pyremoteplay.receiver import AVReceiver
+from pyremoteplay.receiver.synthetic import synthetic_clip
+
+from benchmark.decode_modes import RESOLUTIONS, FPS_LIST, SECONDS
+
+
+def decode_clip(packets, profile, codec="h264"):
+    """ Decodifica tutti i pacchetti. Ritorna tempo CPU e piani di luma. """
+    decoder = AVReceiver.video_codec(codec, profile)
+    decoder.open()
+    frames = []
+    cpu = 0.0
+    for packet in packets:
+        cpu_start = time.process_time()
+        frame = AVReceiver.decode_video(packet, decoder)
+        cpu += time.process_time() - cpu_start
+        if frame is not None:
+            frames.append(frame)
+    decoder.close()
+    return cpu, frames
+
+
+def psnr(reference, frame):
+    """ PSNR della luma, riportando il frame alla dimensione del riferimento. """
+    ref = reference.reformat(format="gray").to_ndarray().astype(np.float32)
+    img = frame.reformat(reference.width, reference.height, "gray")
+    img = img.to_ndarray().astype(np.float32)
+    mse = np.mean((ref - img) ** 2)
+    if mse == 0:
+        return float("inf")
+    return 10 * np.log10(255 ** 2 / mse)
+
+
+def main():
+    print("📊 Benchmark profilo di decodifica 'fast' rispetto a 'full'")
+    print(f"{'clip':<12}{'full s':>8}{'fast s':>8}{'risparmio':>11}{'PSNR dB':>9}{'dim fast':>11}")
+    for res_name, (width, height) in RESOLUTIONS.items():
+        for fps in FPS_LIST:
+            packets = synthetic_clip("h264", width, height, fps, SECONDS)
+            full_cpu, full_frames = decode_clip(packets, "full")
+            fast_cpu, fast_frames = decode_clip(packets, "fast")
+            scores = [psnr(ref, img) for ref, img in zip(full_frames, fast_frames)]
+            size = f"{fast_frames[0].width}x{fast_frames[0].height}" if fast_frames else "-"
+            saving = (1 - fast_cpu / full_cpu) * 100 if full_cpu else 0.0
+            print(
+                f"{res_name + '@' + str(fps):<12}{full_cpu:>8.2f}{fast_cpu:>8.2f}"
+                f"{saving:>10.1f}%{np.median(scores):>9.1f}{size:>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from pyremoteplay.const import FPS, Resolution
+from pyremoteplay.receiver.replay import ReplayBuffer
+from pyremoteplay.receiver.synthetic import frame_size, synthetic_clip
+
+RESOLUTION = Resolution.RESOLUTION_360P
+FPS_VALUE = 30
+WINDOW = 10.0
+# Il clip dura tre finestre: senza keyframe il GOP supera la finestra
+SECONDS = WINDOW * 3
+
+# (nome, frame tra keyframe) - 0 = un keyframe al secondo, come synthetic_clip(gop=0)
+CLIPS = [
+    ("keyframe/s", 0),
+    ("un keyframe", int(SECONDS * FPS_VALUE) + 1),
+]
+
+
+def bench_session():
+    """ Sessione minima con gli attributi usati dal replay buffer. """
+    return SimpleNamespace(
+        resolution=RESOLUTION,
+        fps=FPS(FPS_VALUE),
+        quality=0,
+        stream_type=SimpleNamespace(name="H264"),
+        add_packet_tap=lambda tap: None,
+        remove_packet_tap=lambda tap: None,
+    )
+
+
+def run_clip(packets):
+    """ Passa il clip al buffer con tempi di arrivo simulati, poi verifica dump e frame_at. """
+    replay = ReplayBuffer(WINDOW)
+    replay.attach(bench_session())
+    interval = 1.0 / FPS_VALUE
+    start = time.monotonic() - len(packets) * interval
+    arrival = start
+    for index, packet in enumerate(packets):
+        arrival = start + index * interval
+        replay("video", packet, arrival)
+    stats = replay.stats
+    frame = replay.frame_at(arrival)
+    with tempfile.TemporaryDirectory() as directory:
+        path = replay.dump(os.path.join(directory, "replay.mp4"))
+        size = os.path.getsize(path)
+    return replay.duration, stats, frame is not None, size
+
+
+def main():
+    width, height = frame_size(RESOLUTION)
+    print(f"📊 Replay buffer: finestra {WINDOW:g} s, clip di {SECONDS:g} s {width}x{height}@{FPS_VALUE}")
+    print(f"{'clip':<14}{'durata s':>10}{'MB':>8}{'GOP':>6}{'frame_at':>10}{'dump KB':>10}")
+    for name, gop in CLIPS:
+        packets = synthetic_clip("h264", width, height, FPS_VALUE, SECONDS, gop=gop)
+        duration, stats, has_frame, size = run_clip(packets)
+        status = "✅" if has_frame and size else "❌"
+        print(
+            f"{name:<14}{duration:>10.1f}{stats['bytes'] / 1_000_000:>8.2f}{stats['gops']:>6}"
+            f"{str(has_frame):>10}{size / 1000:>10.0f} {status}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import sys
+
+from pyremoteplay.receiver.session_file import SessionReplayer
+
+from benchmark.decode_modes import MODES, BenchReceiver
+
+# 0 = il più veloce possibile
+SPEEDS = (0, 4.0)
+
+
+def replay(path, mode, params, speed):
+    """ Riproduce la registrazione nel receiver con la modalità di decodifica data. """
+    receiver = BenchReceiver()
+    receiver.set_decode_mode(mode, **params)
+    stats = SessionReplayer(path, receiver, speed=speed).run()
+    receiver.close()
+    return stats, receiver.frames
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python -m benchmark.session_replay <registrazione.rpsf>")
+        return
+    path = sys.argv[1]
+    print(f"📊 Replay di {path}: pipeline del receiver senza console")
+    print(f"{'velocità':<10}{'modalità':<12}{'x reale':>9}{'CPU s':>8}{'frame':>8}{'in ritardo':>12}")
+    for speed in SPEEDS:
+        label = f"{speed:g}x" if speed else "max"
+        for name, mode, params in MODES:
+            stats, frames = replay(path, mode, params, speed)
+            print(f"{label:<10}{name:<12}{stats['speed']:>9.1f}{stats['cpu']:>8.2f}{frames:>8}{stats['late']:>12}")
+
+
+if __name__ == "__main__":
+    main()
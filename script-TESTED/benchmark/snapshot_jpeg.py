@@ -0,0 +1,71 @@
+import time
+
+import cv2
+import numpy as np
+from pyremoteplay.receiver import AVReceiver
+from pyremoteplay.receiver.snapshot import encode_jpeg
+from pyremoteplay.receiver.synthetic import synthetic_clip
+
+from benchmark.decode_modes import RESOLUTIONS
+
+FPS = 30
+SECONDS = 2
+QUALITY = 90
+
+
+def decode_frames(packets, codec="h264"):
+    """ Decodifica il clip e ritorna i frame YUV del decoder. """
+    decoder = AVReceiver.video_codec(codec)
+    decoder.open()
+    frames = [AVReceiver.decode_video(packet, decoder) for packet in packets]
+    decoder.close()
+    return [frame for frame in frames if frame is not None]
+
+
+def rgb_path(frame):
+    """ Percorso attuale: YUV -> rgb24 -> BGR -> JPEG con OpenCV. """
+    img = AVReceiver.reformat_video(frame, "rgb24").to_ndarray()
+    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+    _, data = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, QUALITY])
+    return data.tobytes()
+
+
+def yuv_path(frame):
+    """ Nuovo percorso: piani YUV del decoder -> JPEG con mjpeg di FFmpeg. """
+    return encode_jpeg(frame, QUALITY)
+
+
+def yuv_path_limited(frame):
+    """ Come yuv_path, senza espandere il range: nessuna conversione dei pixel. """
+    return encode_jpeg(frame, QUALITY, full_range=False)
+
+
+def psnr(frame, data):
+    """ PSNR della luma del JPEG rispetto al frame originale. """
+    ref = frame.reformat(format="gray").to_ndarray().astype(np.float32)
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE).astype(np.float32)
+    mse = np.mean((ref - img) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+
+
+def run(frames, encode):
+    cpu_start = time.process_time()
+    outputs = [encode(frame) for frame in frames]
+    cpu = time.process_time() - cpu_start
+    return cpu * 1000 / len(frames), np.mean([len(data) for data in outputs]) / 1024, outputs
+
+
+def main():
+    print(f"📊 Snapshot JPEG (qualità {QUALITY}): percorso RGB vs YUV nativo")
+    print(f"{'clip':<8}{'percorso':<14}{'ms/frame':>10}{'KB':>8}{'PSNR dB':>9}")
+    paths = (("rgb+opencv", rgb_path), ("yuv", yuv_path), ("yuv limited", yuv_path_limited))
+    for res_name, (width, height) in RESOLUTIONS.items():
+        frames = decode_frames(synthetic_clip("h264", width, height, FPS, SECONDS))
+        for name, encode in paths:
+            ms, size, outputs = run(frames, encode)
+            quality = np.median([psnr(frame, data) for frame, data in zip(frames, outputs)])
+            print(f"{res_name:<8}{name:<14}{ms:>10.2f}{size:>8.1f}{quality:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from datetime import datetime
+
+from pyremoteplay.receiver.ring import RingClosed
+
+from remote_play.dedup import FrameDeduper
+
+MODES = ("fps", "change", "burst")
+# Ogni quanto, senza frame in arrivo, si ricontrolla se la sessione è ancora attiva.
+IDLE_TIMEOUT = 1.0
+
+
+def wall_time(monotonic_ts):
+    """ Converte un istante di time.monotonic() in datetime. """
+    return datetime.fromtimestamp(time.time() - (time.monotonic() - monotonic_ts))
+
+
+class CaptureScheduler:
+    """ Decide quali frame catturare, guidato dall'arrivo dei frame e non da sleep fissi.
+
+    Modalità:
+    - "fps": cattura a frequenza fissa. La pianificazione segue i timestamp di arrivo
+      dei frame ed è compensata: l'errore non si accumula nel tempo.
+    - "change": cattura solo i frame diversi dall'ultimo catturato.
+    - "burst": a riposo cattura a `fps` (0 = nessun frame); dopo `trigger()` cattura
+      ogni frame per `burst_seconds`.
+
+    Ogni scheduler è un solo task in attesa sul cursore del receiver: molte sessioni
+    possono condividere lo stesso loop.
+    """
+
+    def __init__(self, mode="fps", fps=2.0, burst_seconds=2.0, deduper=None):
+        if mode not in MODES:
+            raise ValueError(f"Modalità di cattura non valida: {mode}")
+        self.mode = mode
+        self.fps = fps
+        self.burst_seconds = burst_seconds
+        self.deduper = deduper or FrameDeduper()
+        self.next_due = 0.0
+        self.burst_until = 0.0
+        # Istante monotonic di arrivo dell'ultimo frame restituito da frames()
+        self.last_arrival = 0.0
+        self.seen = 0
+        self.captured = 0
+        self.late = 0
+
+    def trigger(self, seconds=None):
+        """ Avvia un burst: cattura ogni frame per i prossimi secondi. """
+        self.burst_until = time.monotonic() + (seconds or self.burst_seconds)
+
+    def _rate_ready(self, arrival):
+        if self.fps <= 0:
+            return False
+        period = 1.0 / self.fps
+        if not self.next_due:
+            self.next_due = arrival
+        if arrival < self.next_due:
+            return False
+        if arrival - self.next_due >= period:
+            # Troppo indietro (nessun frame per un periodo intero): riparte da ora
+            self.late += 1
+            self.next_due = arrival
+        self.next_due += period
+        return True
+
+    def should_capture(self, frame, arrival):
+        """ True se il frame arrivato al tempo monotonic `arrival` va catturato. """
+        self.seen += 1
+        if self.mode == "change":
+            capture = not self.deduper.is_duplicate(frame)
+        elif self.mode == "burst" and arrival < self.burst_until:
+            capture = True
+        else:
+            capture = self._rate_ready(arrival)
+        if capture:
+            self.captured += 1
+        return capture
+
+    async def frames(self, receiver, is_active):
+        """ Itera (frame, datetime di arrivo) dei frame da catturare.
+
+        Si sveglia solo all'arrivo di un frame, o ogni IDLE_TIMEOUT secondi per
+        controllare is_active(). Termina quando is_active() è falso o il receiver è chiuso.
+        """
+        cursor = receiver.video_stream(latest_only=True)
+        try:
+            while is_active():
+                try:
+                    frame = await cursor.next(timeout=IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    continue
+                except RingClosed:
+                    break
+                timing = cursor.meta
+                arrival = timing.arrival if timing is not None else time.monotonic()
+                if self.should_capture(frame, arrival):
+                    self.last_arrival = arrival
+                    yield frame, wall_time(arrival)
+        finally:
+            cursor.close()
+
+    def stats(self):
+        """ Frame visti, catturati e risincronizzazioni per ritardo. """
+        return {"seen": self.seen, "captured": self.captured, "late": self.late}
@@ -0,0 +1,223 @@
+import asyncio
+import os
+import threading
+from collections import deque
+
+import numpy as np
+from pyremoteplay.controller import Controller
+
+from remote_play.capture_scheduler import CaptureScheduler
+
+DATASET_DIR = "dataset"
+WIDTH = 256
+HEIGHT = 144
+SHARD_FRAMES = 256
+DATASET_FPS = 10.0
+MAX_PENDING_INPUTS = 10000
+
+BUTTONS = Controller.buttons()
+# Vettore degli input per frame: tasti premuti, tasti premuti dal frame precedente, levette (lx, ly, rx, ry)
+INPUT_SIZE = 2 * len(BUTTONS) + 4
+# Ogni feedback inviato alla console, come registrato nello shard
+EVENT_DTYPE = np.dtype([
+    ("ts", "<f8"),
+    ("kind", "u1"),
+    ("sequence", "<u4"),
+    ("button", "<i2"),
+    ("active", "?"),
+    ("sticks", "<f4", (4,)),
+])
+EVENT_KINDS = {"state": 0, "event": 1}
+
+
+def frame_to_rgb(frame, width, height):
+    """ Ridimensiona e converte il frame in RGB in un solo passaggio di swscale. """
+    return frame.reformat(width, height, "rgb24").to_ndarray()
+
+
+def shard_name(number):
+    return f"shard_{number:06d}"
+
+
+def load_shard(directory, number):
+    """ Ritorna i frame dello shard mappati in memoria (N, H, W, 3) e i suoi array di input. """
+    base = os.path.join(directory, shard_name(number))
+    frames = np.load(base + "_frames.npy", mmap_mode="r")
+    with np.load(base + ".npz") as data:
+        return frames, dict(data)
+
+
+class InputTracker:
+    """ Tiene lo stato del controller dai feedback inviati e lo allinea ai timestamp dei frame.
+
+    Registrato come callback di feedback del `Controller`: riceve ogni pacchetto inviato
+    alla console con il suo numero di sequenza. I feedback vengono applicati allo stato
+    solo quando arriva un frame successivo, così lo stato di un frame contiene esattamente
+    gli input inviati fino al suo arrivo.
+    """
+
+    def __init__(self):
+        self.index = {name: position for position, name in enumerate(BUTTONS)}
+        self.held = np.zeros(len(BUTTONS), np.float32)
+        self.sticks = np.zeros(4, np.float32)
+        self.sequences = np.full(2, -1, np.int64)
+        self.pending = deque(maxlen=MAX_PENDING_INPUTS)
+        self.lock = threading.Lock()
+        self.received = 0
+
+    def on_feedback(self, feedback):
+        """ Callback del controller: chiamata nel thread che ha inviato il feedback. """
+        with self.lock:
+            self.pending.append(feedback)
+            self.received += 1
+
+    def align(self, timestamp):
+        """ Applica i feedback inviati entro il timestamp monotonic del frame.
+
+        Ritorna il vettore degli input, le ultime sequenze (evento, stato) e i feedback applicati.
+        """
+        pressed = np.zeros(len(BUTTONS), np.float32)
+        applied = []
+        with self.lock:
+            while self.pending and self.pending[0].timestamp <= timestamp:
+                applied.append(self.pending.popleft())
+        for feedback in applied:
+            self.sticks[:] = feedback.sticks
+            if feedback.kind == "event":
+                self.sequences[0] = feedback.sequence
+                position = self.index.get(feedback.button)
+                if position is not None:
+                    self.held[position] = feedback.is_active
+                    if feedback.is_active:
+                        pressed[position] = 1.0
+            else:
+                self.sequences[1] = feedback.sequence
+        inputs = np.concatenate([self.held, pressed, self.sticks])
+        return inputs, self.sequences.copy(), applied
+
+
+class ShardWriter:
+    """ Scrive il dataset in shard di dimensione fissa con memoria limitata.
+
+    Ogni shard è un file `.npy` di frame (N, H, W, 3) uint8, caricabile con mmap, e un
+    `.npz` con timestamp, vettori di input, sequenze del controller e feedback inviati.
+    I frame vengono copiati in un buffer preallocato; uno shard pieno viene scritto in un
+    thread mentre si riempie il secondo buffer, quindi la memoria usata è al massimo di
+    due shard.
+    """
+
+    def __init__(self, directory, width=WIDTH, height=HEIGHT, shard_frames=SHARD_FRAMES):
+        self.directory = directory
+        self.width = width
+        self.height = height
+        self.shard_frames = shard_frames
+        os.makedirs(directory, exist_ok=True)
+        self.buffers = [np.empty((shard_frames, height, width, 3), np.uint8) for _ in range(2)]
+        self.current = 0
+        self.count = 0
+        self.timestamps = np.empty(shard_frames, np.float64)
+        self.arrivals = np.empty(shard_frames, np.float64)
+        self.inputs = np.empty((shard_frames, INPUT_SIZE), np.float32)
+        self.sequences = np.empty((shard_frames, 2), np.int64)
+        self.events = []
+        self.number = len([name for name in os.listdir(directory) if name.endswith("_frames.npy")])
+        self.writing = None
+        self.frames = 0
+        self.shards = 0
+
+    async def add(self, img, timestamp, arrival, inputs, sequences, events=()):
+        """ Aggiunge un frame RGB già ridimensionato con i suoi input. """
+        position = self.count
+        self.buffers[self.current][position] = img
+        self.timestamps[position] = timestamp
+        self.arrivals[position] = arrival
+        self.inputs[position] = inputs
+        self.sequences[position] = sequences
+        for feedback in events:
+            self.events.append((
+                feedback.timestamp,
+                EVENT_KINDS.get(feedback.kind, 0),
+                feedback.sequence,
+                BUTTONS.index(feedback.button) if feedback.button in BUTTONS else -1,
+                feedback.is_active,
+                feedback.sticks,
+            ))
+        self.count += 1
+        self.frames += 1
+        if self.count == self.shard_frames:
+            await self.flush()
+
+    def _write(self, number, frames, arrays):
+        """ Scrive lo shard con nomi temporanei e poi lo rinomina: uno shard visibile è sempre completo. """
+        base = os.path.join(self.directory, shard_name(number))
+        np.save(base + "_frames.tmp.npy", frames)
+        np.savez(base + ".tmp.npz", **arrays)
+        os.replace(base + ".tmp.npz", base + ".npz")
+        os.replace(base + "_frames.tmp.npy", base + "_frames.npy")
+
+    async def flush(self):
+        """ Avvia la scrittura dello shard corrente, dopo aver atteso quella precedente. """
+        if not self.count:
+            return
+        if self.writing is not None:
+            await self.writing
+        count = self.count
+        arrays = {
+            "timestamps": self.timestamps[:count].copy(),
+            "arrivals": self.arrivals[:count].copy(),
+            "inputs": self.inputs[:count].copy(),
+            "sequences": self.sequences[:count].copy(),
+            "events": np.array(self.events, EVENT_DTYPE),
+            "buttons": np.array(BUTTONS),
+        }
+        frames = self.buffers[self.current][:count]
+        loop = asyncio.get_running_loop()
+        self.writing = loop.run_in_executor(None, self._write, self.number, frames, arrays)
+        self.number += 1
+        self.shards += 1
+        self.current = 1 - self.current
+        self.count = 0
+        self.events = []
+
+    async def close(self):
+        """ Scrive i frame rimasti e attende la fine delle scritture. """
+        await self.flush()
+        if self.writing is not None:
+            await self.writing
+            self.writing = None
+
+
+async def export_dataset(device, user_name, fps=DATASET_FPS, width=WIDTH, height=HEIGHT,
+                         shard_frames=SHARD_FRAMES):
+    """ Esporta frame ridotti e input del controller allineati, fino alla fine della sessione. """
+    directory = os.path.join(DATASET_DIR, user_name)
+    tracker = InputTracker()
+    writer = ShardWriter(directory, width, height, shard_frames)
+    scheduler = CaptureScheduler(mode="fps", fps=fps)
+    controller = device.controller
+    controller.add_feedback_callback(tracker.on_feedback)
+    receiver = device.session.receiver if device.session else None
+    loop = asyncio.get_running_loop()
+
+    print(f"🧠 Esportazione dataset per {user_name}: {width}x{height} a {fps} fps in {directory}")
+    try:
+        if not receiver or not hasattr(receiver, "video_stream"):
+            print("❌ Errore: Receiver non disponibile o non ha `video_stream`.")
+            return
+        frames = scheduler.frames(receiver, lambda: device.session and device.session.is_ready)
+        async for frame, timestamp in frames:
+            arrival = scheduler.last_arrival
+            try:
+                img = await loop.run_in_executor(None, frame_to_rgb, frame, width, height)
+            except Exception as e:
+                print(f"❌ Errore nella conversione del frame per il dataset: {e}")
+                continue
+            inputs, sequences, events = tracker.align(arrival)
+            await writer.add(img, timestamp.timestamp(), arrival, inputs, sequences, events)
+    finally:
+        controller.remove_feedback_callback(tracker.on_feedback)
+        await writer.close()
+        print(
+            f"🧠 Dataset: {writer.frames} frame in {writer.shards} shard, "
+            f"{tracker.received} feedback del controller registrati"
+        )
@@ -0,0 +1,42 @@
+import numpy as np
+
+HASH_SIZE = 8
+HAMMING_THRESHOLD = 5
+
+
+def dhash(frame, hash_size=HASH_SIZE):
+    """ Calcola il difference hash del frame sulla luma ridotta a (hash_size+1)x(hash_size). """
+    # swscale riduce e converte in scala di grigi in un solo passaggio
+    small = frame.reformat(hash_size + 1, hash_size, "gray").to_ndarray()
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class FrameDeduper:
+    """ Scarta i frame quasi identici all'ultimo frame tenuto (menu, schermate di caricamento). """
+
+    def __init__(self, threshold=HAMMING_THRESHOLD, hash_size=HASH_SIZE):
+        self.threshold = threshold
+        self.hash_size = hash_size
+        self.last_hash = None
+        self.candidates = 0
+        self.skipped = 0
+
+    def is_duplicate(self, frame):
+        """ True se il frame è entro la soglia di Hamming dall'ultimo frame tenuto. """
+        self.candidates += 1
+        frame_hash = dhash(frame, self.hash_size)
+        if self.last_hash is not None and bin(frame_hash ^ self.last_hash).count("1") <= self.threshold:
+            self.skipped += 1
+            return True
+        self.last_hash = frame_hash
+        return False
+
+    def reset(self):
+        """ Dimentica l'ultimo frame tenuto: il prossimo frame viene sempre salvato. """
+        self.last_hash = None
+
+    @property
+    def skip_rate(self):
+        """ Percentuale di frame scartati come duplicati. """
+        return self.skipped / self.candidates * 100 if self.candidates else 0.0
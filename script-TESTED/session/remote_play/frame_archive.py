@@ -0,0 +1,233 @@
+import mmap
+import os
+import struct
+import zlib
+
+import numpy as np
+
+# Record nel segmento: magic, timestamp (s), lunghezza, crc32 dei dati, poi i dati.
+RECORD_MAGIC = b"FRM1"
+RECORD_HEADER = struct.Struct("<4sdII")
+# Voce dell'indice: timestamp, offset dei dati nel segmento, lunghezza dei dati.
+INDEX_DTYPE = np.dtype([("ts", "<f8"), ("offset", "<u8"), ("length", "<u4")])
+SEGMENT_BYTES = 256 * 1024 * 1024
+SEGMENT_EXT = ".frames"
+INDEX_EXT = ".idx"
+
+
+def segment_name(number):
+    return f"segment_{number:06d}"
+
+
+def list_segments(directory):
+    """ Numeri dei segmenti presenti nella directory, in ordine. """
+    if not os.path.isdir(directory):
+        return []
+    numbers = []
+    for name in os.listdir(directory):
+        if name.startswith("segment_") and name.endswith(SEGMENT_EXT):
+            numbers.append(int(name[len("segment_"):-len(SEGMENT_EXT)]))
+    return sorted(numbers)
+
+
+def recover_segment(segment_path, index_path):
+    """ Ripara la coda di un segmento dopo un crash.
+
+    Tiene le voci dell'indice fino alla prima che non punta a un record completo con
+    magic, lunghezza e crc validi, re-indicizza i record completi scritti dopo l'ultima
+    voce e tronca i dati parziali. Ritorna il numero di record validi.
+    """
+    size = os.path.getsize(segment_path)
+    index = np.fromfile(index_path, INDEX_DTYPE) if os.path.exists(index_path) else np.empty(0, INDEX_DTYPE)
+    entries = []
+    end = 0
+    with open(segment_path, "rb") as segment:
+        for entry in index:
+            offset = int(entry["offset"])
+            length = int(entry["length"])
+            if offset < RECORD_HEADER.size or offset + length > size:
+                break
+            # Dopo un crash l'indice può puntare a dati mai arrivati sul disco (zeri)
+            segment.seek(offset - RECORD_HEADER.size)
+            magic, _, record_length, crc = RECORD_HEADER.unpack(segment.read(RECORD_HEADER.size))
+            if magic != RECORD_MAGIC or record_length != length:
+                break
+            if zlib.crc32(segment.read(length)) != crc:
+                break
+            entries.append((float(entry["ts"]), offset, length))
+            end = offset + length
+        # Record scritti ma non ancora indicizzati
+        segment.seek(end)
+        while end + RECORD_HEADER.size <= size:
+            magic, ts, length, crc = RECORD_HEADER.unpack(segment.read(RECORD_HEADER.size))
+            offset = end + RECORD_HEADER.size
+            if magic != RECORD_MAGIC or offset + length > size:
+                break
+            if zlib.crc32(segment.read(length)) != crc:
+                break
+            entries.append((ts, offset, length))
+            end = offset + length
+    if end < size:
+        print(f"🩹 Archivio: troncati {size - end} byte parziali in {os.path.basename(segment_path)}")
+        with open(segment_path, "r+b") as segment:
+            segment.truncate(end)
+    np.array(entries, INDEX_DTYPE).tofile(index_path)
+    return len(entries)
+
+
+def read_record(directory, number, offset, length):
+    """ Legge i dati di un record dalla sua posizione, ad esempio presa dall'indice SQLite. """
+    with open(os.path.join(directory, segment_name(number) + SEGMENT_EXT), "rb") as segment:
+        segment.seek(offset)
+        return segment.read(length)
+
+
+class FrameArchive:
+    """ Archivio append-only di frame codificati.
+
+    I frame vengono aggiunti in coda a file segmento di grandi dimensioni; un indice
+    compatto (timestamp, offset, lunghezza) per segmento permette l'accesso casuale
+    tramite mmap. Un solo processo scrive; i lettori aprono `ArchiveReader`.
+    """
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES, do_fsync=True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.do_fsync = do_fsync
+        os.makedirs(directory, exist_ok=True)
+        segments = list_segments(directory)
+        self.number = segments[-1] if segments else 0
+        self.segment = None
+        self.index = None
+        # Voci dell'indice scritte solo dopo l'fsync del segmento
+        self.pending_index = []
+        # Chiamata con (numero del segmento, byte scritti) dopo ogni record. Usata dalla retention.
+        self.on_append = None
+        self._open(self.number, recover=bool(segments))
+
+    def _paths(self, number):
+        base = os.path.join(self.directory, segment_name(number))
+        return base + SEGMENT_EXT, base + INDEX_EXT
+
+    def _open(self, number, recover=False):
+        segment_path, index_path = self._paths(number)
+        if recover:
+            recover_segment(segment_path, index_path)
+        self.number = number
+        self.segment = open(segment_path, "ab")
+        self.index = open(index_path, "ab")
+
+    def _rotate(self):
+        self.close()
+        self._open(self.number + 1)
+
+    def append_many(self, items):
+        """ Aggiunge una lista di (timestamp, dati) con un solo flush e fsync.
+
+        Ritorna la posizione di ogni record: (numero del segmento, offset dei dati, lunghezza).
+        """
+        locations = []
+        for ts, data in items:
+            if self.segment.tell() >= self.segment_bytes:
+                self._flush()
+                self._rotate()
+            offset = self.segment.tell() + RECORD_HEADER.size
+            self.segment.write(RECORD_HEADER.pack(RECORD_MAGIC, ts, len(data), zlib.crc32(data)))
+            self.segment.write(data)
+            self.pending_index.append(np.array((ts, offset, len(data)), INDEX_DTYPE).tobytes())
+            locations.append((self.number, offset, len(data)))
+            if self.on_append is not None:
+                self.on_append(self.number, RECORD_HEADER.size + len(data) + INDEX_DTYPE.itemsize)
+        self._flush()
+        return locations
+
+    def append(self, ts, data):
+        return self.append_many([(ts, data)])[0]
+
+    def _flush(self):
+        """ Rende durevole il segmento, poi scrive le voci dell'indice in attesa.
+
+        L'indice è scritto solo dopo i dati: una voce punta sempre a dati già sul disco.
+        """
+        self.segment.flush()
+        if self.do_fsync:
+            os.fsync(self.segment.fileno())
+        if self.pending_index:
+            self.index.write(b"".join(self.pending_index))
+            self.pending_index = []
+        self.index.flush()
+        if self.do_fsync:
+            os.fsync(self.index.fileno())
+
+    def close(self):
+        for file in (self.segment, self.index):
+            if file is not None:
+                file.close()
+        self.segment = self.index = None
+
+    def reader(self):
+        return ArchiveReader(self.directory)
+
+
+class ArchiveReader:
+    """ Lettura dell'archivio con accesso casuale e ricerca per tempo.
+
+    Indici e segmenti sono mappati in memoria: leggere un frame non copia altro
+    che i suoi byte. `refresh()` rilegge i segmenti aggiunti dal writer.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.segments = []
+        self.refresh()
+
+    def refresh(self):
+        """ Rimappa i segmenti e gli indici presenti su disco. """
+        self.close()
+        segments = []
+        for number in list_segments(self.directory):
+            base = os.path.join(self.directory, segment_name(number))
+            if not os.path.exists(base + INDEX_EXT):
+                continue
+            # Solo voci complete: l'indice può essere in scrittura
+            count = os.path.getsize(base + INDEX_EXT) // INDEX_DTYPE.itemsize
+            if not count:
+                continue
+            index = np.memmap(base + INDEX_EXT, INDEX_DTYPE, "r", shape=(count,))
+            with open(base + SEGMENT_EXT, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            segments.append((index, data))
+        self.segments = segments
+        self.starts = np.cumsum([0] + [len(index) for index, _ in segments])
+        self.timestamps = (
+            np.concatenate([index["ts"] for index, _ in segments]) if segments else np.empty(0)
+        )
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def get(self, position):
+        """ Ritorna (timestamp, dati) del frame alla posizione. """
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        segment = int(np.searchsorted(self.starts, position, side="right")) - 1
+        index, data = self.segments[segment]
+        entry = index[position - self.starts[segment]]
+        offset = int(entry["offset"])
+        return float(entry["ts"]), data[offset:offset + int(entry["length"])]
+
+    def seek(self, ts):
+        """ Posizione del primo frame con timestamp >= ts. """
+        return int(np.searchsorted(self.timestamps, ts, side="left"))
+
+    def range(self, start_ts, end_ts):
+        """ Itera (timestamp, dati) dei frame tra start_ts incluso ed end_ts escluso. """
+        for position in range(self.seek(start_ts), self.seek(end_ts)):
+            yield self.get(position)
+
+    def close(self):
+        for _, data in self.segments:
+            data.close()
+        self.segments = []
+        self.starts = np.zeros(1, np.int64)
+        self.timestamps = np.empty(0)
@@ -1,77 +1,95 @@
 import asyncio
 import os
-import cv2
-import numpy as np
-from datetime import datetime
-from remote_play.utils import clean_frame_directory
+from functools import partial
+from remote_play.capture_scheduler import CaptureScheduler
+from remote_play.dedup import FrameDeduper
+from remote_play.frame_archive import FrameArchive
+from remote_play.frame_index import FrameIndex
+from remote_play.frame_writer import FrameWriter
+from remote_play.retention import RETENTION
 
 FRAME_DIR = "frames"
+# Ogni quanto rileggere lo stato della console: l'app in esecuzione può cambiare durante la sessione
+STATUS_INTERVAL = 10.0
 
-async def save_video_frames(device, user_name):
-    """ Recupera i frame video dal QueueReceiver e li salva come immagini. """
-    frame_path = os.path.join(FRAME_DIR, user_name)
-    os.makedirs(frame_path, exist_ok=True)
 
-    print(f"📡 Inizio cattura frame per {user_name}... Loop attivo fino alla disconnessione.")
-    
+async def refresh_status(device, interval=STATUS_INTERVAL):
+    """ Aggiorna periodicamente lo stato della console, e quindi `device.app_id`. """
     while device.session and device.session.is_ready:
+        await asyncio.sleep(interval)
         try:
-            print("🧹 Pulizia della directory dei frame...")
-            clean_frame_directory(user_name)
-            print("🧹 Pulizia riuscita")
-            
-            print("ATTENDO 1S")
-            await asyncio.sleep(1)
-            
-            receiver = device.session.receiver
-
-            await asyncio.sleep(1)
-            print("ATTENDO 1S")
-            
-            if not receiver or not hasattr(receiver, "video_frames"):
-                print("❌ Errore: Receiver non disponibile o non ha `video_frames`. Attendo...")
-                await asyncio.sleep(0.5)
-                continue  
+            await device.async_get_status()
+        except Exception as e:
+            print(f"⚠️ Stato della console non aggiornato: {e}")
 
-            if receiver.video_frames is None:
-                print("⚠️ Warning: receiver.video_frames è None. Disconnettendo...")
-                break  # Esce dal loop se il receiver non è più disponibile
+async def save_video_frames(device, user_name, mode="fps", fps=2.0):
+    """ Recupera i frame video dal QueueReceiver e li salva come immagini.
 
-            if receiver.video_frames is None:
-                print("⚠️ Warning: receiver.video_frames è None. Reinizzializzo la lista...")
-                receiver.video_frames = []  # Imposta una lista vuota per evitare errori
-                await asyncio.sleep(0.5)
-                continue
+    mode e fps vengono passati al CaptureScheduler: "fps", "change" o "burst".
+    """
+    frame_path = os.path.join(FRAME_DIR, user_name)
+    os.makedirs(frame_path, exist_ok=True)
+    deduper = FrameDeduper()
+    # Conversione, codifica e scrittura avvengono nei pool del writer, mai sul loop della sessione
+    # I frame finiscono in segmenti append-only con indice, non in un file per frame
+    archive = FrameArchive(frame_path)
+    # Ogni frame scritto viene registrato nell'indice SQLite con console, app in esecuzione e dHash
+    index = FrameIndex()
+    session_id = index.start_session(user_name, device.mac_address, frame_path, device.host_name)
+    writer = FrameWriter(
+        frame_path, fmt="yuvjpg", quality=90, archive=archive,
+        on_write=partial(index.add_frames, session_id),
+    )
+    writer.start()
+    # Budget di disco per sessione e globale: i segmenti più vecchi vengono eliminati in background
+    # Le righe dell'indice dei segmenti eliminati vengono rimosse insieme ai segmenti
+    RETENTION.register(user_name, archive, on_evict=index.delete_segment)
+    RETENTION.start()
 
-            frame = receiver.video_frames[-1]
+    # Cattura guidata dall'arrivo dei frame: niente sleep, una sola attesa sul receiver
+    scheduler = CaptureScheduler(mode=mode, fps=fps, deduper=deduper)
+    status_task = asyncio.create_task(refresh_status(device))
+    receiver = device.session.receiver if device.session else None
 
-            # Verifica che il frame sia valido
-            if frame is None or frame.width == 0 or frame.height == 0 or frame.format is None:
-                print("⚠️ Frame non valido ricevuto, lo ignoriamo.")
-                await asyncio.sleep(0.5)
-                continue
+    print(f"📡 Inizio cattura frame per {user_name} (modalità {mode}, {fps} fps)... Loop attivo fino alla disconnessione.")
 
-            print(f"🔍 Frame ricevuto - Tipo: {type(frame)}, Dimensioni: {frame.width}x{frame.height}, Formato: {frame.format}")
-            
+    if not receiver or not hasattr(receiver, "video_stream"):
+        print("❌ Errore: Receiver non disponibile o non ha `video_stream`.")
+    else:
+        frames = scheduler.frames(receiver, lambda: device.session and device.session.is_ready)
+        async for frame, timestamp in frames:
             try:
-                img = frame.to_ndarray(format='rgb24')
-                img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+                # Verifica che il frame sia valido
+                if frame.width == 0 or frame.height == 0 or frame.format is None:
+                    print("⚠️ Frame non valido ricevuto, lo ignoriamo.")
+                    continue
 
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-                filename = os.path.join(frame_path, f"frame_{timestamp}.jpg")
+                # Salta i frame quasi identici all'ultimo salvato, prima di convertirli.
+                # In modalità "change" lo fa già lo scheduler.
+                if mode != "change" and deduper.is_duplicate(frame):
+                    continue
 
-                cv2.imwrite(filename, img)
-                print(f"📸 Frame salvato: {filename}")
+                meta = {"app_id": device.app_id, "dhash": deduper.last_hash}
+                if not await writer.submit(frame, timestamp, meta):
+                    print("⚠️ Coda di salvataggio piena: frame scartato.")
 
+            except AssertionError:
+                print("⚠️ Errore asyncio: tentativo di scrivere su un trasporto chiuso. Ignoro il frame e continuo...")
             except Exception as e:
-                print(f"❌ Errore nella conversione/salvataggio del frame: {e}")
-
-        except AssertionError:
-            print("⚠️ Errore asyncio: tentativo di scrivere su un trasporto chiuso. Ignoro il frame e continuo...")
-            continue
-        except Exception as e:
-            print(f"❌ Errore imprevisto durante la cattura frame: {e}")
-
-        await asyncio.sleep(0.5)
+                print(f"❌ Errore imprevisto durante la cattura frame: {e}")
 
+    status_task.cancel()
+    await writer.close()
+    RETENTION.unregister(user_name)
+    index.end_session(session_id)
+    print(f"🗂️ Frame indicizzati: {index.stats()['inserted']} (sessione {session_id})")
+    index.close()
+    stats = writer.stats()
+    print(
+        f"💾 Frame salvati: {stats['frames']} ({stats['fps']:.1f} frame/s, {stats['mb_s']:.2f} MB/s), "
+        f"scartati: {stats['dropped']}, errori: {stats['errors']}"
+    )
+    capture = scheduler.stats()
+    print(f"🎯 Frame catturati: {capture['captured']}/{capture['seen']} arrivati, risincronizzazioni: {capture['late']}")
+    print(f"♻️ Frame duplicati scartati: {deduper.skipped}/{deduper.candidates} ({deduper.skip_rate:.1f}%)")
     print("🛑 Cattura frame terminata: il receiver non è più disponibile.")
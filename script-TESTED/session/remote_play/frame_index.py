@@ -0,0 +1,193 @@
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+INDEX_PATH = os.path.join("frames", "index.db")
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    host_name TEXT,
+    directory TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL
+);
+CREATE TABLE IF NOT EXISTS frames (
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    ts REAL NOT NULL,
+    app_id TEXT,
+    dhash INTEGER,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+-- Console + titolo + intervallo: sessioni della console, poi range su (app_id, ts)
+CREATE INDEX IF NOT EXISTS idx_sessions_mac ON sessions(mac, started);
+CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user, started);
+CREATE INDEX IF NOT EXISTS idx_frames_session ON frames(session_id, app_id, ts);
+CREATE INDEX IF NOT EXISTS idx_frames_app ON frames(app_id, ts);
+CREATE INDEX IF NOT EXISTS idx_frames_ts ON frames(ts);
+-- Eliminazione delle righe di un segmento rimosso dalla retention
+CREATE INDEX IF NOT EXISTS idx_frames_segment ON frames(session_id, segment);
+CREATE INDEX IF NOT EXISTS idx_frames_dhash ON frames(dhash);
+"""
+
+FRAME_COLUMNS = "f.session_id, s.user, s.mac, s.directory, f.ts, f.app_id, f.dhash, f.segment, f.offset, f.length"
+
+
+def signed_hash(value):
+    """ Porta un hash a 64 bit senza segno nel range degli INTEGER di SQLite. """
+    if value is None:
+        return None
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def delete_segment_rows(directory, segment, path=INDEX_PATH):
+    """ Elimina le righe di un segmento di una sessione terminata, con una connessione propria. """
+    index = FrameIndex(path)
+    try:
+        return index.delete_segment(directory, segment)
+    finally:
+        index.close()
+
+
+class FrameIndex:
+    """ Indice SQLite dei frame catturati e dei metadati di sessione.
+
+    Ogni frame è una riga con sessione, timestamp, app in esecuzione, dHash e
+    posizione nell'archivio. Gli inserimenti sono accumulati e scritti con un solo
+    executemany per transazione; il database è in WAL e le query usano una propria
+    connessione in sola lettura, quindi non bloccano la cattura.
+    """
+
+    def __init__(self, path=INDEX_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Usato dal thread di IO del writer e dal loop: gli accessi passano dal lock
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        # Connessione delle query, aperta alla prima query: non usa il lock del writer
+        self.reader = None
+        self.read_lock = threading.Lock()
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.inserted = 0
+
+    def start_session(self, user, mac, directory, host_name=None):
+        """ Registra una nuova sessione di cattura e ne ritorna l'id. """
+        with self.lock, self.db:
+            cursor = self.db.execute(
+                "INSERT INTO sessions (user, mac, host_name, directory, started) VALUES (?, ?, ?, ?, ?)",
+                (user, mac, host_name, directory, time.time()),
+            )
+        return cursor.lastrowid
+
+    def end_session(self, session_id):
+        """ Scrive le righe in attesa e segna la fine della sessione. """
+        self.flush()
+        with self.lock, self.db:
+            self.db.execute("UPDATE sessions SET ended = ? WHERE id = ?", (time.time(), session_id))
+
+    def add_frames(self, session_id, frames):
+        """ Accoda i frame scritti nell'archivio: lista di (timestamp, meta, posizione).
+
+        meta è un dict con "app_id" e "dhash" (opzionali); posizione è
+        (segmento, offset, lunghezza) come ritornata da `FrameArchive.append_many`.
+        """
+        with self.lock:
+            for ts, meta, (segment, offset, length) in frames:
+                meta = meta or {}
+                self.pending.append(
+                    (session_id, ts, meta.get("app_id"), signed_hash(meta.get("dhash")), segment, offset, length)
+                )
+            due = time.monotonic() - self.last_flush >= self.flush_interval
+            if len(self.pending) >= self.batch_size or due:
+                self._flush()
+
+    def _flush(self):
+        """ Scrive le righe in attesa in una sola transazione. Con il lock acquisito. """
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return
+        with self.db:
+            self.db.executemany("INSERT INTO frames VALUES (?, ?, ?, ?, ?, ?, ?)", self.pending)
+        self.inserted += len(self.pending)
+        self.pending = []
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def delete_segment(self, directory, segment):
+        """ Elimina le righe dei frame di un segmento rimosso dall'archivio. Ritorna le righe eliminate. """
+        with self.lock:
+            self._flush()
+            with self.db:
+                cursor = self.db.execute(
+                    "DELETE FROM frames WHERE segment = ? AND session_id IN "
+                    "(SELECT id FROM sessions WHERE directory = ?)",
+                    (segment, directory),
+                )
+        return cursor.rowcount
+
+    def query(self, mac=None, app_id=None, user=None, session_id=None, start=None, end=None, limit=None):
+        """ Frame che soddisfano tutti i filtri dati, in ordine di tempo.
+
+        start e end sono timestamp unix (end escluso). Ogni riga è un dict con
+        sessione, utente, console, directory dell'archivio e posizione del frame,
+        da leggere con `frame_archive.read_record`.
+        """
+        clauses = []
+        params = []
+        for column, value in (("s.mac", mac), ("f.app_id", app_id), ("s.user", user), ("f.session_id", session_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start is not None:
+            clauses.append("f.ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("f.ts < ?")
+            params.append(end)
+        sql = f"SELECT {FRAME_COLUMNS} FROM frames f JOIN sessions s ON s.id = f.session_id"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY f.ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.read_lock:
+            if self.reader is None:
+                uri = pathlib.Path(self.path).absolute().as_uri() + "?mode=ro"
+                self.reader = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            cursor = self.reader.execute(sql, params)
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        """ Scrive le righe in attesa e chiude il database. """
+        with self.read_lock:
+            if self.reader is not None:
+                self.reader.close()
+                self.reader = None
+        with self.lock:
+            self._flush()
+            self.db.close()
+
+    def stats(self):
+        """ Righe inserite e in attesa. """
+        with self.lock:
+            return {"inserted": self.inserted, "pending": len(self.pending)}
@@ -0,0 +1,231 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import cv2
+from pyremoteplay.receiver.snapshot import encode_jpeg
+
+# Formato -> (estensione, parametri di qualità di cv2.imencode)
+# "yuvjpg" codifica in JPEG direttamente dai piani YUV del decoder, senza passare da RGB.
+FORMATS = {
+    "jpg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "png": (".png", cv2.IMWRITE_PNG_COMPRESSION),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+    "yuvjpg": (".jpg", None),
+}
+OVERFLOW_POLICIES = ("drop_oldest", "drop_new", "block")
+# Attesa massima in close() per i frame ancora in coda
+CLOSE_TIMEOUT = 10.0
+
+
+def frame_to_bgr(frame):
+    """ Converte il frame av in array BGR per OpenCV. """
+    img = frame.to_ndarray(format="rgb24")
+    return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+
+
+def encode_image(img, fmt, quality):
+    """ Codifica l'array BGR nel formato richiesto. Eseguita nel pool di encoder. """
+    extension, param = FORMATS[fmt]
+    ok, data = cv2.imencode(extension, img, [param, quality])
+    if not ok:
+        raise ValueError(f"Codifica {fmt} fallita")
+    return data.tobytes()
+
+
+def write_batch(items, directory, do_fsync):
+    """ Scrive un batch di file: un fsync per ogni file del batch e uno solo per la directory. """
+    written = 0
+    # La directory può essere stata ripulita nel frattempo
+    os.makedirs(directory, exist_ok=True)
+    for filename, data in items:
+        with open(os.path.join(directory, filename), "wb") as file:
+            file.write(data)
+            if do_fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        written += len(data)
+    if do_fsync and items and hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return written
+
+
+class FrameWriter:
+    """ Salva i frame su disco senza bloccare l'event loop della sessione.
+
+    I frame entrano in una coda limitata. Un task li raccoglie in batch, li
+    converte e codifica in un pool di thread (o processi) e scrive ogni batch
+    in un solo passaggio sul disco, con un solo fsync della directory per batch.
+    Con `archive` i frame vengono aggiunti a un `FrameArchive` invece di un file per frame;
+    `on_write`, se dato, riceve nel thread di IO la lista di (timestamp, meta, posizione)
+    dei frame appena scritti nell'archivio (ad esempio `FrameIndex.add_frames`).
+    """
+
+    def __init__(self, directory, fmt="jpg", quality=90, queue_size=64, workers=2,
+                 use_processes=False, overflow="drop_oldest", batch_size=8,
+                 batch_interval=0.5, fsync=True, archive=None, on_write=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato non supportato: {fmt}")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politica di overflow non valida: {overflow}")
+        self.directory = directory
+        self.fmt = fmt
+        self.quality = quality
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.fsync = fsync
+        self.archive = archive
+        self.on_write = on_write
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # La conversione in RGB resta nei thread: i frame av non si possono passare ai processi.
+        self.convert_pool = ThreadPoolExecutor(max_workers=workers)
+        self.encode_pool = ProcessPoolExecutor(max_workers=workers) if use_processes else self.convert_pool
+        self.io_pool = ThreadPoolExecutor(max_workers=1)
+        self.task = None
+        self.frames = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.errors = 0
+        self.started = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        """ Avvia il task di scrittura sul loop corrente. """
+        if self.task is None:
+            self.started = time.monotonic()
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, frame, timestamp=None, meta=None):
+        """ Accoda un frame. Ritorna False se il frame è stato scartato per coda piena.
+
+        meta viene passato così com'è a `on_write` insieme alla posizione del frame.
+        """
+        timestamp = timestamp or datetime.now()
+        item = (frame, timestamp, meta)
+        if not self.queue.full():
+            self.queue.put_nowait(item)
+            return True
+        if self.overflow == "block":
+            await self.queue.put(item)
+            return True
+        self.dropped += 1
+        if self.overflow == "drop_new":
+            return False
+        # drop_oldest: fa posto al frame più recente
+        self.queue.get_nowait()
+        self.queue.task_done()
+        self.queue.put_nowait(item)
+        return True
+
+    async def _next_batch(self):
+        """ Attende il primo frame, poi raccoglie il batch fino a batch_size o batch_interval. """
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.batch_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _encode(self, frame):
+        loop = asyncio.get_running_loop()
+        if self.fmt == "yuvjpg":
+            # Un solo passaggio nel thread: i frame av non si possono passare ai processi.
+            return await loop.run_in_executor(self.convert_pool, encode_jpeg, frame, self.quality)
+        img = await loop.run_in_executor(self.convert_pool, frame_to_bgr, frame)
+        return await loop.run_in_executor(self.encode_pool, encode_image, img, self.fmt, self.quality)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        extension = FORMATS[self.fmt][0]
+        while True:
+            batch = await self._next_batch()
+            try:
+                results = await asyncio.gather(
+                    *(self._encode(frame) for frame, _, _ in batch), return_exceptions=True
+                )
+                items = []
+                metas = []
+                for (_, timestamp, meta), data in zip(batch, results):
+                    if isinstance(data, Exception):
+                        self.errors += 1
+                        print(f"❌ Errore nella codifica del frame: {data}")
+                        continue
+                    if self.archive is not None:
+                        items.append((timestamp.timestamp(), data))
+                        metas.append(meta)
+                    else:
+                        items.append((f"frame_{timestamp.strftime('%Y%m%d_%H%M%S_%f')}{extension}", data))
+                if self.archive is not None:
+                    locations = await loop.run_in_executor(self.io_pool, self._append, items, metas)
+                    written = sum(length for _, _, length in locations)
+                else:
+                    written = await loop.run_in_executor(
+                        self.io_pool, write_batch, items, self.directory, self.fsync
+                    )
+                self.bytes += written
+                self.frames += len(items)
+            except Exception as e:
+                self.errors += len(batch)
+                print(f"❌ Errore nella scrittura del batch: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _append(self, items, metas):
+        """ Scrive nell'archivio e notifica on_write. Eseguita nel thread di IO. """
+        locations = self.archive.append_many(items)
+        if self.on_write is not None:
+            self.on_write([(ts, meta, location) for (ts, _), meta, location in zip(items, metas, locations)])
+        return locations
+
+    async def close(self, timeout=CLOSE_TIMEOUT):
+        """ Scrive i frame ancora in coda e chiude i pool senza bloccare il loop.
+
+        Non attende la coda se il task di scrittura è terminato, e al massimo
+        timeout secondi se è ancora attivo: i frame rimasti vengono scartati.
+        """
+        if self.task is not None:
+            if not self.task.done():
+                join = asyncio.ensure_future(self.queue.join())
+                await asyncio.wait({join, self.task}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                join.cancel()
+            if self.task.done() and not self.task.cancelled() and self.task.exception():
+                print(f"❌ Task di scrittura terminato con errore: {self.task.exception()}")
+            if self.queue.qsize():
+                self.dropped += self.queue.qsize()
+                print(f"⚠️ {self.queue.qsize()} frame non scritti alla chiusura")
+            self.task.cancel()
+            self.task = None
+        # Lo shutdown attende i lavori in corso: fuori dal loop
+        loop = asyncio.get_running_loop()
+        pools = [self.convert_pool, self.io_pool]
+        if self.encode_pool is not self.convert_pool:
+            pools.append(self.encode_pool)
+        await asyncio.gather(*(loop.run_in_executor(None, pool.shutdown) for pool in pools))
+        # L'ultima scrittura nel pool di IO è finita: l'archivio si può chiudere
+        if self.archive is not None:
+            self.archive.close()
+
+    def stats(self):
+        """ Frame scritti, scartati, errori e throughput in frame/s e MB/s. """
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "queued": self.queue.qsize(),
+            "fps": self.frames / elapsed if elapsed else 0.0,
+            "mb_s": self.bytes / 1_000_000 / elapsed if elapsed else 0.0,
+        }
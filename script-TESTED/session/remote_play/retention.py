@@ -0,0 +1,231 @@
+import asyncio
+import heapq
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+
+from remote_play.frame_archive import INDEX_EXT, SEGMENT_EXT, list_segments, segment_name
+from remote_play.frame_index import delete_segment_rows
+from remote_play.utils import FRAME_DIR
+
+GB = 1024 ** 3
+SESSION_BUDGET = 2 * GB
+GLOBAL_BUDGET = 10 * GB
+MAX_AGE = 24 * 3600
+MAX_SEGMENTS = 0
+INTERVAL = 10.0
+
+
+def read_segments(directory):
+    """ Segmenti della directory come [numero, byte, ultima scrittura]. """
+    segments = deque()
+    for number in list_segments(directory):
+        base = os.path.join(directory, segment_name(number))
+        try:
+            stat = os.stat(base + SEGMENT_EXT)
+            size = stat.st_size + os.path.getsize(base + INDEX_EXT)
+        except FileNotFoundError:
+            continue
+        segments.append([number, size, stat.st_mtime])
+    return segments
+
+
+class RetentionManager:
+    """ Mantiene lo spazio su disco dei frame entro i limiti, eliminando i segmenti più vecchi.
+
+    Ogni archivio notifica i byte scritti: il manager tiene i conteggi in memoria e
+    non scansiona mai le directory durante la cattura. Un task in background elimina,
+    a intervalli, i segmenti chiusi più vecchi oltre il budget della sessione, il budget
+    globale, l'età massima o il numero massimo di segmenti. Il segmento in scrittura
+    non viene mai eliminato.
+
+    Anche le directory senza cattura attiva contano nel budget globale e nell'età
+    massima: all'avvio `root` viene letta una sola volta, e le sessioni terminate
+    restano nei conteggi. Tutti i loro segmenti sono chiusi e possono essere eliminati;
+    le righe dell'indice vengono rimosse con `on_evict_closed`.
+    """
+
+    def __init__(self, session_budget=SESSION_BUDGET, global_budget=GLOBAL_BUDGET,
+                 max_age=MAX_AGE, max_segments=MAX_SEGMENTS, interval=INTERVAL,
+                 root=FRAME_DIR, on_evict_closed=delete_segment_rows):
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self.max_age = max_age
+        self.max_segments = max_segments
+        self.interval = interval
+        self.root = root
+        self.on_evict_closed = on_evict_closed
+        self.scanned = False
+        # Per nome: directory, segmenti, on_evict e se la cattura è attiva
+        self.sessions = {}
+        self.total = 0
+        self.evicted = 0
+        self.freed = 0
+        self.lock = threading.Lock()
+        self.task = None
+
+    def register(self, name, archive, on_evict=None):
+        """ Inizia a gestire l'archivio di una sessione. Legge la sua directory una sola volta.
+
+        on_evict, se dato, viene chiamato con (directory, numero) per ogni segmento
+        eliminato, ad esempio `FrameIndex.delete_segment`.
+        """
+        segments = read_segments(archive.directory)
+        with self.lock:
+            # Sostituisce la voce chiusa della stessa directory, se c'è
+            self._remove_directory(archive.directory, name)
+            self.sessions[name] = {
+                "directory": archive.directory, "segments": segments,
+                "on_evict": on_evict, "open": True,
+            }
+            self.total += sum(segment[1] for segment in segments)
+        archive.on_append = partial(self.note_append, name)
+
+    def unregister(self, name):
+        """ Chiude la sessione. I suoi segmenti restano su disco e nei conteggi. """
+        with self.lock:
+            session = self.sessions.get(name)
+            if session:
+                session["open"] = False
+                session["on_evict"] = self.on_evict_closed
+
+    def _remove_directory(self, directory, name=None):
+        """ Toglie dai conteggi le voci della directory o del nome. Con il lock acquisito. """
+        for key, session in list(self.sessions.items()):
+            if session["directory"] == directory or key == name:
+                del self.sessions[key]
+                self.total -= sum(segment[1] for segment in session["segments"])
+
+    def scan(self):
+        """ Aggiunge ai conteggi le directory di root senza cattura attiva. Legge il disco una volta. """
+        if not os.path.isdir(self.root):
+            return
+        for name in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, name)
+            if not os.path.isdir(directory):
+                continue
+            segments = read_segments(directory)
+            if not segments:
+                continue
+            with self.lock:
+                known = any(session["directory"] == directory for session in self.sessions.values())
+                if known or name in self.sessions:
+                    continue
+                self.sessions[name] = {
+                    "directory": directory, "segments": segments,
+                    "on_evict": self.on_evict_closed, "open": False,
+                }
+                self.total += sum(segment[1] for segment in segments)
+
+    def note_append(self, name, number, nbytes):
+        """ Chiamata dall'archivio a ogni scrittura, nel suo thread di IO. """
+        with self.lock:
+            session = self.sessions.get(name)
+            if session is None:
+                return
+            segments = session["segments"]
+            if not segments or segments[-1][0] != number:
+                segments.append([number, 0, 0.0])
+            segments[-1][1] += nbytes
+            segments[-1][2] = time.time()
+            self.total += nbytes
+
+    def _pop_oldest(self, session, victims):
+        number, size, _ = session["segments"].popleft()
+        victims.append((session["directory"], number, session["on_evict"]))
+        self.total -= size
+        return size
+
+    def _select_victims(self):
+        """ Sceglie i segmenti da eliminare e li toglie dai conteggi. Con il lock acquisito. """
+        victims = []
+        now = time.time()
+        for session in self.sessions.values():
+            segments = session["segments"]
+            used = sum(segment[1] for segment in segments)
+            # Solo segmenti chiusi: con la cattura attiva l'ultimo è quello in scrittura
+            keep = 1 if session["open"] else 0
+            while len(segments) > keep:
+                too_big = self.session_budget > 0 and used > self.session_budget
+                too_many = self.max_segments > 0 and len(segments) > self.max_segments
+                too_old = self.max_age > 0 and now - segments[0][2] > self.max_age
+                if not (too_big or too_many or too_old):
+                    break
+                used -= self._pop_oldest(session, victims)
+        if self.global_budget > 0 and self.total > self.global_budget:
+            # Segmenti chiusi più vecchi di tutte le sessioni, in ordine di ultima scrittura
+            heap = [
+                (session["segments"][0][2], name)
+                for name, session in self.sessions.items()
+                if len(session["segments"]) > (1 if session["open"] else 0)
+            ]
+            heapq.heapify(heap)
+            while heap and self.total > self.global_budget:
+                _, name = heapq.heappop(heap)
+                session = self.sessions[name]
+                self._pop_oldest(session, victims)
+                if len(session["segments"]) > (1 if session["open"] else 0):
+                    heapq.heappush(heap, (session["segments"][0][2], name))
+        # Le sessioni terminate senza più segmenti escono dai conteggi
+        for name in [name for name, session in self.sessions.items()
+                     if not session["open"] and not session["segments"]]:
+            del self.sessions[name]
+        return victims
+
+    def enforce(self):
+        """ Elimina i segmenti oltre i limiti. Ritorna i byte liberati. """
+        with self.lock:
+            victims = self._select_victims()
+        freed = 0
+        for directory, number, on_evict in victims:
+            base = os.path.join(directory, segment_name(number))
+            for path in (base + SEGMENT_EXT, base + INDEX_EXT):
+                try:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            if on_evict is not None:
+                try:
+                    on_evict(directory, number)
+                except Exception as e:
+                    print(f"❌ Errore nell'aggiornamento dopo l'eliminazione di {segment_name(number)}: {e}")
+        if victims:
+            self.evicted += len(victims)
+            self.freed += freed
+            print(f"🗑️ Retention: eliminati {len(victims)} segmenti ({freed / 1024 ** 2:.1f} MB)")
+        return freed
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        if not self.scanned:
+            self.scanned = True
+            try:
+                await loop.run_in_executor(None, self.scan)
+            except Exception as e:
+                print(f"❌ Errore nella lettura di {self.root} per la retention: {e}")
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await loop.run_in_executor(None, self.enforce)
+            except Exception as e:
+                print(f"❌ Errore della retention: {e}")
+
+    def start(self):
+        """ Avvia l'eliminazione in background sul loop corrente.
+
+        Al primo avvio legge una volta `root` nell'executor, fuori dalla cattura.
+        """
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def stats(self):
+        """ Byte gestiti, segmenti ed eliminazioni. """
+        with self.lock:
+            segments = sum(len(session["segments"]) for session in self.sessions.values())
+        return {"bytes": self.total, "segments": segments, "evicted": self.evicted, "freed": self.freed}
+
+
+RETENTION = RetentionManager()
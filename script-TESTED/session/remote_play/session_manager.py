@@ -2,13 +2,17 @@ import asyncio
 from pyremoteplay import RPDevice
 from pyremoteplay.profile import Profiles
 from pyremoteplay.receiver import QueueReceiver
-from remote_play.utils import clean_frame_directory
+from pyremoteplay.receiver.pool import DECODER_POOL
+from remote_play.utils import frame_directory
 from remote_play.controller import initialize_controller, send_test_commands
 from remote_play.frame_handler import save_video_frames
+from remote_play.dataset import export_dataset
 import sys
 
 Profiles.set_default_path(r"C:\Users\ADB\.pyremoteplay\.profile.json")
 profiles = Profiles.load()
+# Esporta anche frame ridotti e input del controller allineati (remote_play/dataset.py)
+EXPORT_DATASET = False
 
 import asyncio
 
@@ -55,9 +59,15 @@ async def connect_and_run_session(user_profile, selected_mac, ip_address):
             return
 
         print("\n🎮 Avvio della sessione Remote Play...")
-        frame_path = clean_frame_directory(user_profile.name)
-        receiver = QueueReceiver()
-        receiver.queue_size = 100
+        frame_path = frame_directory(user_profile.name)
+        # Apre il decoder in anticipo: la sessione lo prende già pronto dal pool
+        DECODER_POOL.warm("h264", "360p")
+        # Coda limitata in byte invece che in numero di frame: ~8 MB bastano per la cattura
+        receiver = QueueReceiver(max_bytes=8 * 1024 * 1024)
+        # L'audio non serve per la cattura dei frame: i pacchetti vengono scartati prima della decodifica
+        receiver.set_audio_policy("disabled")
+        # I frame restano nel formato YUV del decoder: il writer li codifica in JPEG senza passare da RGB
+        receiver.video_format = None
 
         session = device.create_session(
             user=user_profile.name,
@@ -98,6 +108,9 @@ async def connect_and_run_session(user_profile, selected_mac, ip_address):
 
         task = asyncio.create_task(save_video_frames(device, user_profile.name))
         print(f"🟢 Task di salvataggio avviato? {task is not None}")
+        if EXPORT_DATASET:
+            dataset_task = asyncio.create_task(export_dataset(device, user_profile.name))
+            print(f"🧠 Task del dataset avviato? {dataset_task is not None}")
 
         initialize_controller(device)
         await asyncio.sleep(3)
@@ -1,12 +1,9 @@
 import os
-import shutil
 
 FRAME_DIR = "frames"
 
-def clean_frame_directory(user_name):
-    """ Elimina i frame salvati della sessione precedente. """
+def frame_directory(user_name):
+    """ Ritorna la directory dei frame dell'utente, creandola se serve. I frame salvati restano: li gestisce la retention. """
     user_frame_path = os.path.join(FRAME_DIR, user_name)
-    if os.path.exists(user_frame_path):
-        shutil.rmtree(user_frame_path)
     os.makedirs(user_frame_path, exist_ok=True)
     return user_frame_path
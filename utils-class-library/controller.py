@@ -4,7 +4,7 @@ import logging
 import threading
 import sys
 import traceback
-from typing import Iterable, Union
+from typing import Callable, Iterable, NamedTuple, Union
 from collections import deque
 from enum import IntEnum, auto
 import time
@@ -17,6 +17,24 @@ from .session import Session
 _LOGGER = logging.getLogger(__name__)
 
 
+class Feedback(NamedTuple):
+    """Controller feedback sent to the host.
+
+    `kind` is `state` for stick state or `event` for a button event.
+    `sequence` is the sequence number of the feedback packet for its kind.
+    `timestamp` is the monotonic time it was sent. `button` and `is_active`
+    are set for events. `sticks` is the stick state when it was sent as
+    left x, left y, right x, right y.
+    """
+
+    kind: str
+    sequence: int
+    timestamp: float
+    button: str = ""
+    is_active: bool = False
+    sticks: tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)
+
+
 class Controller:
     """Controller Interface. Sends user input to Remote Play Session."""
 
@@ -47,6 +65,7 @@ class Controller:
         self._should_send = threading.Semaphore()
         self._stop_event = threading.Event()
         self._thread: threading.Thread = None
+        self._feedback_callbacks: list[Callable[[Feedback], None]] = []
 
     def __del__(self):
         self.disconnect()
@@ -126,6 +145,39 @@ class Controller:
         self.__reset_session()
         self._session = None
 
+    def add_feedback_callback(self, callback: Callable[[Feedback], None]):
+        """Add callback called with :class:`Feedback` after feedback is sent.
+
+        Called in the thread which sent the feedback. Must return quickly.
+        """
+        if callback not in self._feedback_callbacks:
+            self._feedback_callbacks.append(callback)
+
+    def remove_feedback_callback(self, callback: Callable[[Feedback], None]):
+        """Remove feedback callback."""
+        if callback in self._feedback_callbacks:
+            self._feedback_callbacks.remove(callback)
+
+    def _notify_feedback(
+        self, kind: str, sequence: int, button: str = "", is_active: bool = False
+    ):
+        if not self._feedback_callbacks:
+            return
+        state = self._stick_state
+        feedback = Feedback(
+            kind,
+            sequence,
+            time.monotonic(),
+            button,
+            is_active,
+            (state.left.x, state.left.y, state.right.x, state.right.y),
+        )
+        for callback in list(self._feedback_callbacks):
+            try:
+                callback(feedback)
+            except Exception as error:  # pylint: disable=broad-except
+                _LOGGER.error("Error in feedback callback: %s", error)
+
     def update_sticks(self):
         """Send controller stick state to host.
 
@@ -141,6 +193,7 @@ class Controller:
         self._session.stream.send_feedback(
             FeedbackHeader.Type.STATE, self._sequence_state, state=self.stick_state
         )
+        self._notify_feedback("state", self._sequence_state)
         self._sequence_state += 1
 
     def _send_event(self):
@@ -186,13 +239,10 @@ class Controller:
                 _LOGGER.error("Invalid button: %s", name)
                 return None
 
-        if _action == self.ButtonAction.PRESS:
-            self._add_event_buffer(FeedbackEvent(button, is_active=True))
-        elif _action == self.ButtonAction.RELEASE:
-            self._add_event_buffer(FeedbackEvent(button, is_active=False))
-        elif _action == self.ButtonAction.TAP:
-            self._add_event_buffer(FeedbackEvent(button, is_active=True))
+        is_active = _action != self.ButtonAction.RELEASE
+        self._add_event_buffer(FeedbackEvent(button, is_active=is_active))
         self._send_event()
+        self._notify_feedback("event", self._sequence_event - 1, button.name, is_active)
         return button, _action
 
     def button(
@@ -250,6 +250,7 @@ class RPDevice:
         quality: Union[Quality, str, int] = "default",
         codec: str = "h264",
         hdr: bool = False,
+        decode_profile: str = "full",
     ) -> Union[Session, None]:
         """Return initialized session if session created else return None.
         Also connects a controller to session.
@@ -278,6 +279,7 @@ class RPDevice:
             quality=quality,
             codec=codec,
             hdr=hdr,
+            decode_profile=decode_profile,
         )
         self.controller.disconnect()
         self.controller.connect(self.session)
@@ -2,13 +2,22 @@
 
 from __future__ import annotations
 import abc
+from enum import IntEnum, auto
 from struct import unpack_from
+import time
 import warnings
 import logging
 from collections import deque
-from typing import Sequence, TYPE_CHECKING
+from typing import Sequence, TYPE_CHECKING, Union
 
 from pyremoteplay.const import FFMPEG_PADDING
+from .bitstream import parameter_sets
+from .change import ChangeDetector
+from .latency import FrameTiming, LatencyRecorder
+from .memory import FRAME_MEMORY, frame_bytes
+from .pool import DECODER_POOL, STREAM_PARAMS, prime_decoder
+from .rate import RateLimiter
+from .ring import FrameRing, RingCursor
 
 if TYPE_CHECKING:
     from pyremoteplay.session import Session
@@ -41,6 +50,44 @@ class AVReceiver(abc.ABC):
         "preset": "ultrafast",
     }
 
+    # Reduced fidelity decoding for consumers which only analyze frames.
+    # Options a decoder does not support are ignored or clamped by FFMPEG.
+    AV_CODEC_OPTIONS_FAST = {
+        "skip_loop_filter": "all",
+        "idct": "int",
+        "lowres": "1",
+    }
+
+    DECODE_PROFILES = {
+        "full": {},
+        "fast": AV_CODEC_OPTIONS_FAST,
+    }
+
+    class DecodeMode(IntEnum):
+        """Video Decode Modes.
+
+        Frames which are not output are dropped before any format conversion.
+        """
+
+        ALL = auto()
+        KEYFRAME = auto()
+        NTH = auto()
+        FPS = auto()
+
+    class AudioPolicy(IntEnum):
+        """Audio Policies.
+
+        DEFAULT decodes and resamples each packet as it is received.
+        DISABLED drops packets before decoding. No decoder is created.
+        ON_DEMAND stores packets and decodes them when frames are requested.
+        BATCHED decodes packets in batches and resamples each batch at once.
+        """
+
+        DEFAULT = auto()
+        DISABLED = auto()
+        ON_DEMAND = auto()
+        BATCHED = auto()
+
     @staticmethod
     def audio_frame(
         buf: bytes,
@@ -84,6 +131,18 @@ class AVReceiver(abc.ABC):
         :param codec_ctx: av codec context for decoding
         :param video_format: Format to output frames as.
         """
+        frame = AVReceiver.decode_video(buf, codec_ctx)
+        if frame is None:
+            return None
+        return AVReceiver.reformat_video(frame, video_format)
+
+    @staticmethod
+    def decode_video(buf: bytes, codec_ctx: av.CodecContext) -> av.VideoFrame:
+        """Decode H264 Frame. Return AV Frame in the decoder's format.
+
+        :param buf: Raw Video Packet representing one video frame
+        :param codec_ctx: av codec context for decoding
+        """
         frames = None
         packet = av.packet.Packet(b"".join([buf, bytes(FFMPEG_PADDING)]))
         try:
@@ -102,27 +161,67 @@ class AVReceiver(abc.ABC):
         #     frame.interlaced_frame,
         #     frame.pict_type,
         # )
+        return frame
+
+    @staticmethod
+    def reformat_video(
+        frame: av.VideoFrame, video_format="rgb24", scale: float = 1.0
+    ) -> av.VideoFrame:
+        """Return frame converted to video format.
 
-        if frame.format.name != video_format:
+        :param frame: Decoded video frame
+        :param video_format: Format to output frame as.
+            If None, frame is returned in the decoder's format.
+        :param scale: Scale of output frame size. Sizes are rounded to even.
+        """
+        if scale < 1.0:
+            width = max(2, int(frame.width * scale) & ~1)
+            height = max(2, int(frame.height * scale) & ~1)
+            return frame.reformat(width, height, video_format or frame.format.name)
+        if video_format and frame.format.name != video_format:
             frame = frame.reformat(frame.width, frame.height, video_format)
         return frame
 
     @staticmethod
-    def video_codec(codec_name: str) -> av.CodecContext:
-        """Return Video Codec Context."""
+    def video_codec(
+        codec_name: str,
+        profile: str = "full",
+        thread_type: str = None,
+        export_mvs: bool = False,
+    ) -> av.CodecContext:
+        """Return Video Codec Context.
+
+        :param codec_name: Name of FFMPEG decoder
+        :param profile: Decode profile. One of `AVReceiver.DECODE_PROFILES`.
+            `fast` skips deblocking, uses a lower precision IDCT and
+            decodes at half resolution where the decoder supports it.
+        :param thread_type: Decoder threading. One of `FRAME`, `SLICE`, `AUTO`.
+            If None, `AUTO` is used with low delay, which allows only slice
+            threading. Low delay is not set for `FRAME` and `AUTO`, since it
+            turns off frame threading in FFMPEG.
+        :param export_mvs: Export motion vectors as frame side data
+        """
+        if profile not in AVReceiver.DECODE_PROFILES:
+            raise ValueError(f"Invalid decode profile: {profile}")
         try:
             codec_ctx = av.codec.Codec(codec_name, "r").create()
         except av.codec.codec.UnknownCodecError:
             _LOGGER.error("Invalid codec: %s", codec_name)
-        _LOGGER.info("Using Decoder: %s", codec_name)
+        _LOGGER.info("Using Decoder: %s; Profile: %s", codec_name, profile)
+        options = {}
         if codec_name.startswith("h264"):
-            codec_ctx.options = AVReceiver.AV_CODEC_OPTIONS_H264
+            options.update(AVReceiver.AV_CODEC_OPTIONS_H264)
         elif codec_name.startswith("hevc"):
-            codec_ctx.options = AVReceiver.AV_CODEC_OPTIONS_HEVC
+            options.update(AVReceiver.AV_CODEC_OPTIONS_HEVC)
+        options.update(AVReceiver.DECODE_PROFILES[profile])
+        codec_ctx.options = options
         codec_ctx.pix_fmt = "yuv420p"
-        codec_ctx.flags = av.codec.context.Flags.LOW_DELAY
+        if thread_type in (None, "SLICE"):
+            codec_ctx.flags = av.codec.context.Flags.LOW_DELAY
         codec_ctx.flags2 = av.codec.context.Flags2.FAST
-        codec_ctx.thread_type = av.codec.context.ThreadType.AUTO
+        if export_mvs:
+            codec_ctx.flags2 |= av.codec.context.Flags2.EXPORT_MVS
+        codec_ctx.thread_type = av.codec.context.ThreadType[thread_type or "AUTO"]
         return codec_ctx
 
     @staticmethod
@@ -152,16 +251,37 @@ class AVReceiver(abc.ABC):
     def __init__(self):
         self._session: Session = None
         self._video_format = "rgb24"
+        self._output_scale = 1.0
         self._video_decoder = None
         self._audio_decoder = None
         self._audio_resampler = None
+        self._audio_format = "s16"
         self._audio_config = {}
+        self._decode_mode = AVReceiver.DecodeMode.ALL
+        self._decode_interval = 1
+        self._rate = RateLimiter()
+        self._decode_stats = {"decoded": 0, "output": 0, "static": 0}
+        self._change: ChangeDetector = None
+        self._change_threshold = 0.0
+        self._change_score = -1.0
+        self._video_arrival = 0.0
+        self._video_timing: FrameTiming = None
+        self._audio_timing: FrameTiming = None
+        self._video_latency = LatencyRecorder()
+        self._audio_latency = LatencyRecorder()
+        self._learn_params = False
+        self._codec_started = 0.0
+        self._time_to_first_frame = 0.0
+        self._audio_policy = AVReceiver.AudioPolicy.DEFAULT
+        self._audio_batch_size = 1
+        self._audio_pending: deque[tuple[bytes, float]] = deque()
+        self._audio_stats = {"packets": 0, "dropped": 0, "frames": 0, "cpu": 0.0}
 
     def _set_session(self, session: Session):
         self._session = session
 
-    def _get_audio_codec(self, header: bytes):
-        """Get Audio config from header. Get Audio codec."""
+    def _parse_audio_config(self, header: bytes):
+        """Parse Audio config from header."""
         self._audio_config = {
             "channels": header[0],
             "bits": header[1],
@@ -176,22 +296,42 @@ class AVReceiver(abc.ABC):
         )
         _LOGGER.info("Audio Config: %s", self._audio_config)
 
+    def _get_audio_codec(self, header: bytes):
+        """Get Audio config from header. Get Audio codec."""
+        self._parse_audio_config(header)
+        if self._audio_policy == AVReceiver.AudioPolicy.DISABLED:
+            self._session.events.emit("audio_config")
+            return
         if not self._audio_decoder:
             self._audio_decoder = AVReceiver.audio_codec()
-            # Need format to be s16. Format is float.
+            # Decoder outputs float. Resample to receiver format, s16 by default.
             self._audio_resampler = AVReceiver.audio_resampler(
-                "s16",
+                self._audio_format,
                 self._audio_config["channels"],
                 self._audio_config["rate"],
             )
             self._session.events.emit("audio_config")
 
     def _get_video_codec(self):
-        """Get Video Codec Context."""
+        """Get Video Codec Context.
+
+        The decoder is checked out from the decoder pool and primed with the
+        parameter sets last seen from this console, if any.
+        """
         codec_name = self._session.codec
-        self._video_decoder = AVReceiver.video_codec(codec_name)
+        profile = self._session.decode_profile
+        thread_type = self._session.decoder_config.get("thread_type")
+        resolution = self._session.resolution
+        self._codec_started = time.monotonic()
+        self._time_to_first_frame = 0.0
         try:
-            self._video_decoder.open()
+            self._video_decoder = DECODER_POOL.checkout(
+                codec_name,
+                resolution,
+                profile,
+                thread_type,
+                export_mvs=self._change is not None,
+            )
         except av.error.ValueError as error:
             if self._session:
                 try:
@@ -200,13 +340,229 @@ class AVReceiver(abc.ABC):
                     msg = str(error)
                 self._session.error = msg
                 self._session.stop()
+            return
+        self._set_skip_frame()
+        mac_address = self._session.mac_address
+        self._learn_params = bool(mac_address)
+        if mac_address:
+            params = STREAM_PARAMS.get(mac_address, codec_name, resolution)
+            prime_decoder(self._video_decoder, params)
+
+    def _update_stream_params(self, buf: bytes):
+        """Cache parameter sets of the stream for the next session."""
+        params = parameter_sets(buf, self._session.codec)
+        if not params:
+            return
+        self._learn_params = False
+        STREAM_PARAMS.update(
+            self._session.mac_address,
+            self._session.codec,
+            self._session.resolution,
+            params,
+        )
+
+    def _set_packet_arrival(self, arrival: float):
+        """Set monotonic time the first packet of the next video frame arrived.
+
+        Called by the AV handler. If not set, the time the frame data
+        is passed to the receiver is used.
+        """
+        self._video_arrival = arrival
+
+    def _on_video_read(self, timing: FrameTiming):
+        """Record latencies when a consumer first reads a video frame."""
+        if not timing.delivered:
+            timing.delivered = time.monotonic()
+            self._video_latency.record(timing)
+
+    def _on_audio_read(self, timing: FrameTiming):
+        """Record latencies when a consumer first reads an audio frame."""
+        if not timing.delivered:
+            timing.delivered = time.monotonic()
+            self._audio_latency.record(timing)
+
+    def _set_skip_frame(self):
+        """Let the decoder skip non keyframes if decoding keyframes only."""
+        if self._video_decoder is None:
+            return
+        skip = "DEFAULT"
+        if self._decode_mode == AVReceiver.DecodeMode.KEYFRAME:
+            skip = "NONKEY"
+        try:
+            self._video_decoder.skip_frame = skip
+        except (AttributeError, ValueError) as error:
+            # Frames are still filtered by key_frame after decoding.
+            _LOGGER.warning("Could not set skip_frame: %s", error)
+
+    def set_decode_mode(
+        self,
+        mode: Union[DecodeMode, str],
+        interval: int = 1,
+        fps: float = 0.0,
+    ):
+        """Set which decoded video frames are output.
+
+        Frames which are not output are dropped before conversion to
+        :attr:`video_format` and are never passed to :meth:`handle_video`.
+
+        :param mode: One of `all`, `keyframe`, `nth`, `fps` or `AVReceiver.DecodeMode`.
+            `keyframe` lets the decoder skip all non keyframes.
+        :param interval: Output every Nth decoded frame. Used when mode is `nth`.
+        :param fps: Target output frames per second. Used when mode is `fps`.
+        """
+        if not isinstance(mode, AVReceiver.DecodeMode):
+            try:
+                mode = AVReceiver.DecodeMode[mode.upper()]
+            except KeyError as error:
+                raise ValueError(f"Invalid decode mode: {mode}") from error
+        if mode == AVReceiver.DecodeMode.NTH and interval < 1:
+            raise ValueError("Interval must be at least 1")
+        if mode == AVReceiver.DecodeMode.FPS and fps <= 0:
+            raise ValueError("FPS must be greater than 0")
+        self._decode_mode = mode
+        self._decode_interval = interval
+        self._rate = RateLimiter(fps if mode == AVReceiver.DecodeMode.FPS else 0.0)
+        self._set_skip_frame()
+
+    def set_audio_policy(
+        self,
+        policy: Union[AudioPolicy, str],
+        batch_size: int = 10,
+        max_pending: int = 250,
+    ):
+        """Set how audio is decoded. Should be set before starting session.
+
+        :param policy: One of `default`, `disabled`, `on_demand`, `batched`
+            or `AVReceiver.AudioPolicy`.
+        :param batch_size: Packets per batch. Used when policy is `batched`.
+        :param max_pending: Maximum packets stored until frames are requested.
+            Oldest packets are dropped first. Used when policy is `on_demand`.
+        """
+        if not isinstance(policy, AVReceiver.AudioPolicy):
+            try:
+                policy = AVReceiver.AudioPolicy[policy.upper()]
+            except KeyError as error:
+                raise ValueError(f"Invalid audio policy: {policy}") from error
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+        self._audio_policy = policy
+        self._audio_batch_size = batch_size
+        maxlen = max_pending if policy == AVReceiver.AudioPolicy.ON_DEMAND else None
+        self._audio_pending = deque(self._audio_pending, maxlen)
+
+    def _decode_audio_batch(self, batch: list[tuple[bytes, float]]) -> av.AudioFrame:
+        """Return one resampled audio frame of all packets in batch."""
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        timing = FrameTiming(arrival=batch[0][1], decode_start=time.monotonic())
+        frames = []
+        for buf, _ in batch:
+            frame = AVReceiver.audio_frame(buf, self._audio_decoder)
+            if frame is not None:
+                frames.append(frame)
+        timing.decode_end = time.monotonic()
+        if not frames:
+            return None
+        frame = frames[0]
+        if len(frames) > 1:
+            samples = np.concatenate([item.to_ndarray() for item in frames], axis=1)
+            frame = av.AudioFrame.from_ndarray(
+                samples, format=frames[0].format.name, layout=frames[0].layout.name
+            )
+            frame.sample_rate = frames[0].sample_rate
+        if self._audio_resampler:
+            frame = self._audio_resampler.resample(frame)
+            # For av > 9.0.0
+            if isinstance(frame, Sequence):
+                frame = frame[0] if frame else None
+        timing.converted = time.monotonic()
+        self._audio_timing = timing
+        return frame
+
+    def decode_pending_audio(self) -> int:
+        """Decode stored audio packets. Return number of frames handled.
+
+        Used with the `on_demand` and `batched` audio policies.
+        Frames are passed to :meth:`handle_audio` in the calling thread.
+        """
+        if not self._audio_pending or not self._audio_decoder:
+            return 0
+        start = time.thread_time()
+        handled = 0
+        if self._audio_policy == AVReceiver.AudioPolicy.BATCHED:
+            batches = [list(self._audio_pending)]
+            self._audio_pending.clear()
+        else:
+            batches = []
+            while self._audio_pending:
+                batches.append([self._audio_pending.popleft()])
+        for batch in batches:
+            frame = self._decode_audio_batch(batch)
+            if frame is not None:
+                self.handle_audio(frame)
+                handled += 1
+        self._audio_stats["frames"] += handled
+        self._audio_stats["cpu"] += time.thread_time() - start
+        return handled
+
+    def set_change_detection(self, enabled: bool = True, threshold: float = 0.02):
+        """Skip output of frames which did not change.
+
+        Change is scored from motion vectors and packet sizes before the
+        frame is converted. See :class:`ChangeDetector
+        <pyremoteplay.receiver.change.ChangeDetector>`.
+        Motion vectors are only exported if enabled before starting session.
+
+        :param enabled: Score frames if True
+        :param threshold: Frames scoring below threshold are not output.
+            Between 0 and 1. If 0, frames are scored but not skipped.
+        """
+        self._change = ChangeDetector() if enabled else None
+        self._change_threshold = threshold
+        self._change_score = -1.0
+
+    def _should_output(self, frame: av.VideoFrame) -> bool:
+        """Return True if decoded frame should be output."""
+        mode = self._decode_mode
+        if mode == AVReceiver.DecodeMode.ALL:
+            return True
+        if mode == AVReceiver.DecodeMode.KEYFRAME:
+            return frame.key_frame
+        if mode == AVReceiver.DecodeMode.NTH:
+            return (self._decode_stats["decoded"] - 1) % self._decode_interval == 0
+        return self._rate.ready(time.monotonic())
 
     def decode_video_frame(self, buf: bytes) -> av.VideoFrame:
-        """Return decoded Video Frame."""
+        """Return decoded Video Frame.
+
+        Return None if the frame is dropped by the decode mode.
+        """
         if not self._video_decoder:
             _LOGGER.warning("Video decoder not created.")
             return None
-        frame = AVReceiver.video_frame(buf, self._video_decoder, self.video_format)
+        if self._learn_params:
+            self._update_stream_params(buf)
+        timing = FrameTiming(arrival=self._video_arrival or time.monotonic())
+        self._video_arrival = 0.0
+        timing.decode_start = time.monotonic()
+        frame = AVReceiver.decode_video(buf, self._video_decoder)
+        timing.decode_end = time.monotonic()
+        if frame is None:
+            return None
+        if not self._time_to_first_frame:
+            self._time_to_first_frame = timing.decode_end - self._codec_started
+        self._decode_stats["decoded"] += 1
+        if self._change is not None:
+            self._change_score = self._change.score(buf, frame)
+            if self._change_score < self._change_threshold:
+                self._decode_stats["static"] += 1
+                return None
+        if not self._should_output(frame):
+            return None
+        self._decode_stats["output"] += 1
+        frame = AVReceiver.reformat_video(frame, self.video_format, self._output_scale)
+        timing.converted = time.monotonic()
+        self._video_timing = timing
         return frame
 
     def decode_audio_frame(self, buf: bytes) -> av.AudioFrame:
@@ -214,7 +570,12 @@ class AVReceiver(abc.ABC):
         if not self._audio_config or not self._audio_decoder:
             _LOGGER.warning("Audio config not received")
             return None
+        timing = FrameTiming(arrival=time.monotonic())
+        timing.decode_start = timing.arrival
         frame = AVReceiver.audio_frame(buf, self._audio_decoder, self._audio_resampler)
+        # Decoding and resampling are timed together.
+        timing.decode_end = timing.converted = time.monotonic()
+        self._audio_timing = timing
         return frame
 
     def handle_video_data(self, buf: bytes):
@@ -224,10 +585,28 @@ class AVReceiver(abc.ABC):
             self.handle_video(frame)
 
     def handle_audio_data(self, buf: bytes):
-        """Handle audio data."""
+        """Handle audio data according to audio policy."""
+        self._audio_stats["packets"] += 1
+        policy = self._audio_policy
+        if policy == AVReceiver.AudioPolicy.DISABLED:
+            self._audio_stats["dropped"] += 1
+            return
+        if policy == AVReceiver.AudioPolicy.ON_DEMAND:
+            if len(self._audio_pending) == self._audio_pending.maxlen:
+                self._audio_stats["dropped"] += 1
+            self._audio_pending.append((buf, time.monotonic()))
+            return
+        if policy == AVReceiver.AudioPolicy.BATCHED:
+            self._audio_pending.append((buf, time.monotonic()))
+            if len(self._audio_pending) >= self._audio_batch_size:
+                self.decode_pending_audio()
+            return
+        start = time.thread_time()
         frame = self.decode_audio_frame(buf)
         if frame is not None:
             self.handle_audio(frame)
+            self._audio_stats["frames"] += 1
+        self._audio_stats["cpu"] += time.thread_time() - start
 
     def handle_video(self, frame: av.VideoFrame):
         """Handle video frame. Re-implementation required.
@@ -247,6 +626,13 @@ class AVReceiver(abc.ABC):
         """
         raise NotImplementedError
 
+    def _evict(self, nbytes: int) -> int:
+        """Remove stored frames to free nbytes. Return bytes freed.
+
+        Called by the memory accountant. Re-implementation optional.
+        """
+        return 0
+
     def get_video_frame(self) -> av.VideoFrame:
         """Return Video Frame. Re-implementation optional.
 
@@ -262,9 +648,9 @@ class AVReceiver(abc.ABC):
         raise NotImplementedError
 
     def close(self):
-        """Close Receiver."""
+        """Close Receiver. The video decoder is returned to the decoder pool."""
         if self._video_decoder is not None:
-            self._video_decoder.close()
+            DECODER_POOL.release(self._video_decoder)
         if self._audio_decoder is not None:
             self._audio_decoder.close()
         self._video_decoder = self._audio_decoder = None
@@ -279,6 +665,82 @@ class AVReceiver(abc.ABC):
         """Set Video Format."""
         self._video_format = video_format
 
+    @property
+    def output_scale(self) -> float:
+        """Return scale of output video frames."""
+        return self._output_scale
+
+    @output_scale.setter
+    def output_scale(self, scale: float):
+        """Set scale of output video frames. Between 0 and 1."""
+        if not 0 < scale <= 1:
+            raise ValueError("Scale must be greater than 0 and at most 1")
+        self._output_scale = scale
+
+    @property
+    def memory_usage(self) -> int:
+        """Return bytes of stored frames. Re-implementation optional."""
+        return 0
+
+    @property
+    def audio_policy(self) -> AudioPolicy:
+        """Return Audio Policy."""
+        return self._audio_policy
+
+    @property
+    def audio_stats(self) -> dict:
+        """Return audio packets received and dropped, frames handled and CPU cost.
+
+        `cpu` is the CPU time in seconds spent decoding, resampling and
+        handling audio. `cpu_per_packet` is in microseconds.
+        """
+        stats = dict(self._audio_stats)
+        packets = stats["packets"] - stats["dropped"]
+        stats["cpu_per_packet"] = stats["cpu"] * 1_000_000 / packets if packets else 0.0
+        return stats
+
+    @property
+    def decode_mode(self) -> DecodeMode:
+        """Return Decode Mode."""
+        return self._decode_mode
+
+    @property
+    def decode_stats(self) -> dict:
+        """Return count of decoded and output video frames."""
+        return dict(self._decode_stats)
+
+    @property
+    def change_score(self) -> float:
+        """Return change score of the last decoded frame. -1.0 if not scored."""
+        return self._change_score
+
+    @property
+    def time_to_first_frame(self) -> float:
+        """Return seconds from creating the video decoder to the first decoded frame.
+
+        Return 0.0 if no frame has been decoded.
+        """
+        return self._time_to_first_frame
+
+    @property
+    def video_timing(self) -> FrameTiming:
+        """Return timing of the last output video frame."""
+        return self._video_timing
+
+    @property
+    def video_latency(self) -> LatencyRecorder:
+        """Return rolling latency histograms of video frames.
+
+        Latencies are recorded when a consumer first reads a frame.
+        Use `video_latency.summary()` for percentiles of each stage.
+        """
+        return self._video_latency
+
+    @property
+    def audio_latency(self) -> LatencyRecorder:
+        """Return rolling latency histograms of audio frames."""
+        return self._audio_latency
+
     @property
     def video_decoder(self) -> av.CodecContext:
         """Return Video Codec Context."""
@@ -300,77 +762,136 @@ class QueueReceiver(AVReceiver):
     New Frames are added to the end of queue.
     When queue is full the oldest frame is removed.
 
+    Queues are thread-safe rings. Consumers can iterate new frames
+    without copying the queue with
+    :meth:`video_stream() <pyremoteplay.receiver.QueueReceiver.video_stream>`
+    and :meth:`audio_stream() <pyremoteplay.receiver.QueueReceiver.audio_stream>`.
+
     :param max_frames: Maximum number of frames to be stored. Will be at least 1.
     :param max_video_frames: Maximum video frames that can be stored.
         If <= 0, max_frames will be used.
     :param max_audio_frames: Maximum audio frames that can be stored.
         If <= 0, max_frames will be used.
+    :param max_bytes: Maximum bytes of video frames that can be stored.
+        If > 0, video frames are limited by bytes and max_video_frames,
+        which defaults to `MAX_BUDGET_FRAMES`. If <= 0, not limited.
+
+    Frame memory is reported to
+    :data:`FRAME_MEMORY <pyremoteplay.receiver.memory.FRAME_MEMORY>`,
+    which evicts frames and downscales receivers over the process budget.
     """
 
-    def __init__(self, max_frames=10, max_video_frames=-1, max_audio_frames=-1):
+    MAX_BUDGET_FRAMES = 120
+
+    def __init__(
+        self, max_frames=10, max_video_frames=-1, max_audio_frames=-1, max_bytes=0
+    ):
         super().__init__()
         max_frames = max(1, max_frames)
-        max_video_frames = max_frames if max_video_frames <= 0 else max_video_frames
+        if max_video_frames <= 0:
+            max_video_frames = max_frames
+            if max_bytes > 0:
+                max_video_frames = QueueReceiver.MAX_BUDGET_FRAMES
         max_audio_frames = max_frames if max_audio_frames <= 0 else max_audio_frames
-        self._v_queue = deque(maxlen=max_video_frames)
-        self._a_queue = deque(maxlen=max_audio_frames)
+        self._v_queue = FrameRing(
+            max_video_frames,
+            on_read=self._on_video_read,
+            sizeof=frame_bytes,
+            max_bytes=max_bytes,
+        )
+        self._a_queue = FrameRing(
+            max_audio_frames, on_read=self._on_audio_read, sizeof=frame_bytes
+        )
+        FRAME_MEMORY.register(self)
 
     def close(self):
         """Close Receiver."""
         super().close()
+        self._v_queue.close()
+        self._a_queue.close()
         self._v_queue.clear()
         self._a_queue.clear()
 
     def get_video_frame(self) -> av.VideoFrame:
         """Return oldest Video Frame from queue."""
-        try:
-            frame = self._v_queue[0]
-            return frame
-        except IndexError:
-            return None
+        return self._v_queue.oldest()
 
     def get_audio_frame(self) -> av.AudioFrame:
         """Return oldest Audio Frame from queue."""
-        try:
-            frame = self._a_queue[0]
-            return frame
-        except IndexError:
-            return None
+        if self._audio_policy == AVReceiver.AudioPolicy.ON_DEMAND:
+            self.decode_pending_audio()
+        return self._a_queue.oldest()
 
     def get_latest_video_frame(self) -> av.VideoFrame:
         """Return latest Video Frame from queue."""
-        try:
-            frame = self._v_queue[-1]
-            return frame
-        except IndexError:
-            return None
+        frame, timing = self._v_queue.latest_entry()
+        if timing is not None:
+            self._on_video_read(timing)
+        return frame
 
     def get_latest_audio_frame(self) -> av.AudioFrame:
         """Return latest Audio Frame from queue."""
-        try:
-            frame = self._a_queue[-1]
-            return frame
-        except IndexError:
-            return None
+        if self._audio_policy == AVReceiver.AudioPolicy.ON_DEMAND:
+            self.decode_pending_audio()
+        frame, timing = self._a_queue.latest_entry()
+        if timing is not None:
+            self._on_audio_read(timing)
+        return frame
+
+    def get_latest_video_timing(self) -> FrameTiming:
+        """Return timing of latest Video Frame in queue."""
+        return self._v_queue.latest_entry()[1]
 
     def handle_video(self, frame: av.VideoFrame):
         """Handle video frame. Add to queue."""
-        self._v_queue.append(frame)
+        self._v_queue.push(frame, self._video_timing)
+        FRAME_MEMORY.check()
         self._session.events.emit("video_frame")
 
     def handle_audio(self, frame: av.AudioFrame):
         """Handle Audio Frame. Add to queue."""
-        self._a_queue.append(frame)
+        self._a_queue.push(frame, self._audio_timing)
         self._session.events.emit("audio_frame")
 
+    def _evict(self, nbytes: int) -> int:
+        """Remove oldest video frames to free nbytes. The latest frame is kept."""
+        return self._v_queue.trim(nbytes)
+
+    def video_stream(self, latest_only=False, backpressure=False) -> RingCursor:
+        """Return async iterator of new Video Frames.
+
+        Usage: `async for frame in receiver.video_stream(latest_only=True)`
+
+        The :class:`FrameTiming <pyremoteplay.receiver.latency.FrameTiming>`
+        of the frame read last is available as `meta` of the iterator.
+
+        :param latest_only: If True, only the latest frame is returned when
+            the consumer is behind. Skipped frames are counted as dropped.
+        :param backpressure: If True, decoding waits briefly for this consumer
+            before a frame it has not read is removed from the queue.
+        """
+        return self._v_queue.cursor(latest_only, backpressure)
+
+    def audio_stream(self, latest_only=False, backpressure=False) -> RingCursor:
+        """Return async iterator of new Audio Frames.
+
+        See :meth:`video_stream() <pyremoteplay.receiver.QueueReceiver.video_stream>`.
+        """
+        return self._a_queue.cursor(latest_only, backpressure)
+
     @property
     def video_frames(self) -> list[av.VideoFrame]:
-        """Return Latest Video Frames."""
-        frames = list(self._v_queue)
-        return frames
+        """Return Latest Video Frames. Copies the queue."""
+        return self._v_queue.snapshot()
 
     @property
     def audio_frames(self) -> list[av.AudioFrame]:
-        """Return Latest Audio Frames."""
-        frames = list(self._a_queue)
-        return frames
+        """Return Latest Audio Frames. Copies the queue."""
+        if self._audio_policy == AVReceiver.AudioPolicy.ON_DEMAND:
+            self.decode_pending_audio()
+        return self._a_queue.snapshot()
+
+    @property
+    def memory_usage(self) -> int:
+        """Return bytes of stored frames."""
+        return self._v_queue.nbytes + self._a_queue.nbytes
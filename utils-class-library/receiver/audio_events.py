@@ -0,0 +1,215 @@
+"""Detect reference audio cues in the session audio stream."""
+
+from __future__ import annotations
+import logging
+import time
+import warnings
+
+from .pcm import PCMReceiver
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+# RMS below which a window is treated as silence. Samples are in [-1, 1].
+SILENCE_RMS = 0.005
+
+
+def load_cue(path: str, sample_rate: int = 48000):
+    """Return mono float samples of audio file resampled to sample rate."""
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    resampler = av.audio.resampler.AudioResampler("flt", "mono", sample_rate)
+    chunks = []
+    with av.open(path) as container:
+        for frame in container.decode(audio=0):
+            frames = resampler.resample(frame)
+            # For av < 9.0.0
+            if not isinstance(frames, list):
+                frames = [frames] if frames else []
+            chunks.extend(item.to_ndarray().reshape(-1) for item in frames)
+    if not chunks:
+        raise ValueError(f"No audio in file: {path}")
+    return np.concatenate(chunks)
+
+
+class AudioCueReceiver(PCMReceiver):
+    """PCM receiver which matches the audio stream against reference cues.
+
+    Audio is split into windows. Each window is reduced to its RMS energy
+    and a fingerprint of log band energies from its spectrum. All windows
+    received since the last check are processed at once. A cue matches when
+    the mean cosine similarity of its fingerprints and the latest windows
+    reaches the threshold.
+
+    Matches emit the session event `audio_cue` with the cue name and score.
+
+    :param window_ms: Length of analysis window in milliseconds
+    :param bands: Number of frequency bands in fingerprint
+    :param threshold: Minimum score to match. Between 0 and 1
+    :param seconds: Length of audio kept in buffer
+    """
+
+    def __init__(
+        self,
+        window_ms: float = 50.0,
+        bands: int = 32,
+        threshold: float = 0.9,
+        seconds: float = 5.0,
+    ):
+        super().__init__(seconds, "flt")
+        self._window_ms = window_ms
+        self._bands = bands
+        self._threshold = threshold
+        self._window = 0
+        self._edges = None
+        self._cues: dict[str, dict] = {}
+        self._position = 0
+        self._history = None
+        self._windows = 0
+        self._cpu = 0.0
+
+    def register(self, name: str, samples, sample_rate: int = 48000):
+        """Register reference cue.
+
+        :param name: Name emitted when the cue matches
+        :param samples: Mono samples or array of (samples, channels). Float
+            samples should be in [-1, 1]
+        :param sample_rate: Sample rate of samples
+        """
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        samples = np.asarray(samples)
+        if samples.dtype == np.int16:
+            samples = samples / 32768
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        self._cues[name] = {
+            "samples": samples.astype(np.float32),
+            "rate": sample_rate,
+            "fingerprint": None,
+            "last": 0.0,
+        }
+        if self._window:
+            self._prepare_cue(self._cues[name])
+
+    def unregister(self, name: str):
+        """Remove reference cue."""
+        self._cues.pop(name, None)
+
+    def _allocate(self, rate: int, channels: int):
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        super()._allocate(rate, channels)
+        self._window = max(16, int(rate * self._window_ms / 1000))
+        freqs = np.fft.rfftfreq(self._window, 1 / rate)
+        # Log spaced bands from 50 Hz to Nyquist. Low bins are merged.
+        edges = np.geomspace(50, rate / 2, self._bands + 1)
+        self._edges = np.unique(np.searchsorted(freqs, edges[:-1]))
+        self._position = 0
+        self._history = np.zeros((0, len(self._edges)), np.float32)
+        for cue in self._cues.values():
+            self._prepare_cue(cue)
+
+    def _prepare_cue(self, cue: dict):
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        samples = cue["samples"]
+        if cue["rate"] != self.sample_rate:
+            duration = len(samples) / cue["rate"]
+            count = int(duration * self.sample_rate)
+            samples = np.interp(
+                np.linspace(0, len(samples) - 1, count),
+                np.arange(len(samples)),
+                samples,
+            ).astype(np.float32)
+        fingerprint = self._fingerprint(samples)
+        if not len(fingerprint):
+            _LOGGER.warning("Cue shorter than one window. Ignoring")
+            cue["fingerprint"] = None
+            return
+        cue["fingerprint"] = fingerprint
+        cue["duration"] = len(samples) / self.sample_rate
+
+    def _fingerprint(self, samples):
+        """Return unit fingerprint of each whole window in mono samples."""
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        count = len(samples) // self._window
+        windows = samples[: count * self._window].reshape(count, self._window)
+        rms = np.sqrt(np.mean(windows * windows, axis=1))
+        power = np.abs(np.fft.rfft(windows * np.hanning(self._window), axis=1)) ** 2
+        bands = np.log1p(np.add.reduceat(power, self._edges, axis=1))
+        bands -= bands.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(bands, axis=1, keepdims=True)
+        bands = np.divide(bands, norms, out=np.zeros_like(bands), where=norms > 0)
+        # Silent windows match nothing.
+        bands[rms < SILENCE_RMS] = 0
+        return bands.astype(np.float32)
+
+    def handle_audio(self, frame: av.AudioFrame):
+        """Handle Audio Frame. Write samples to buffer and check for cues."""
+        super().handle_audio(frame)
+        if self._buffer is not None and self._cues:
+            self.process()
+
+    def process(self):
+        """Fingerprint new windows and emit matched cues."""
+        import numpy as np  # pylint: disable=import-outside-toplevel
+        from numpy.lib.stride_tricks import sliding_window_view
+
+        start = time.thread_time()
+        available = self.position - self._position
+        count = available // self._window
+        if count <= 0:
+            return
+        if available > self.capacity:
+            count = self.capacity // self._window
+            self._position = self.position - count * self._window
+        samples, _ = self.read(self._position)
+        samples = samples[: count * self._window].mean(axis=1)
+        self._position += count * self._window
+        self._windows += count
+
+        fingerprints = self._fingerprint(samples)
+        cues = [cue for cue in self._cues.values() if cue["fingerprint"] is not None]
+        longest = max((len(cue["fingerprint"]) for cue in cues), default=1)
+        history = np.concatenate([self._history, fingerprints])
+        now = time.monotonic()
+        for name, cue in self._cues.items():
+            reference = cue["fingerprint"]
+            if reference is None or len(history) < len(reference):
+                continue
+            length = len(reference)
+            # Only check alignments ending in a new window.
+            recent = history[-(count + length - 1) :]
+            views = sliding_window_view(recent, reference.shape)[:, 0]
+            scores = np.einsum("nlb,lb->n", views, reference) / length
+            best = float(scores.max())
+            if best >= self._threshold and now - cue["last"] >= cue["duration"]:
+                cue["last"] = now
+                _LOGGER.debug("Audio cue: %s; Score: %.3f", name, best)
+                self._session.events.emit("audio_cue", name, best)
+        self._history = history[-(longest - 1) :] if longest > 1 else history[:0]
+        self._cpu += time.thread_time() - start
+
+    @property
+    def cues(self) -> list[str]:
+        """Return names of registered cues."""
+        return list(self._cues)
+
+    @property
+    def detector_stats(self) -> dict:
+        """Return windows processed and CPU cost of detection.
+
+        `cpu_load` is detection CPU time per second of audio.
+        """
+        audio = self._windows * self._window / self.sample_rate if self._window else 0
+        return {
+            "windows": self._windows,
+            "cpu": self._cpu,
+            "cpu_load": self._cpu / audio if audio else 0.0,
+        }
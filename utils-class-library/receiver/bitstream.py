@@ -0,0 +1,92 @@
+"""Helpers for H264/HEVC Annex-B bitstreams."""
+
+from __future__ import annotations
+from typing import Iterator
+
+START_CODE = b"\x00\x00\x01"
+
+H264_NAL_IDR = 5
+H264_NAL_SPS = 7
+H264_NAL_PPS = 8
+H264_PARAMETER_SETS = (H264_NAL_SPS, H264_NAL_PPS)
+
+HEVC_NAL_IRAP = range(16, 24)
+HEVC_NAL_VPS = 32
+HEVC_NAL_SPS = 33
+HEVC_NAL_PPS = 34
+HEVC_PARAMETER_SETS = (HEVC_NAL_VPS, HEVC_NAL_SPS, HEVC_NAL_PPS)
+
+
+def is_hevc(codec_name: str) -> bool:
+    """Return True if codec name is a HEVC codec."""
+    return codec_name.lower().startswith("hevc")
+
+
+def nal_units(buf: bytes) -> Iterator[tuple[int, int]]:
+    """Yield start and end offsets of each NAL unit in buffer.
+
+    Offsets exclude the start code.
+    """
+    start = buf.find(START_CODE)
+    while start >= 0:
+        start += len(START_CODE)
+        end = buf.find(START_CODE, start)
+        if end < 0:
+            yield start, len(buf)
+            return
+        next_start = end
+        # Drop the leading zero of a 4 byte start code.
+        if buf[end - 1] == 0:
+            end -= 1
+        yield start, end
+        start = next_start
+
+
+def nal_type(buf: bytes, offset: int, hevc: bool) -> int:
+    """Return type of NAL unit starting at offset."""
+    if hevc:
+        return (buf[offset] >> 1) & 0x3F
+    return buf[offset] & 0x1F
+
+
+def is_vcl(unit_type: int, hevc: bool) -> bool:
+    """Return True if NAL unit type carries picture data."""
+    if hevc:
+        return unit_type < 32
+    return 1 <= unit_type <= 5
+
+
+def is_keyframe(buf: bytes, codec_name: str) -> bool:
+    """Return True if buffer starts a picture that can be decoded on its own.
+
+    Only NAL units up to the first slice are read.
+    """
+    hevc = is_hevc(codec_name)
+    for start, end in nal_units(buf):
+        if start >= end:
+            continue
+        unit_type = nal_type(buf, start, hevc)
+        if is_vcl(unit_type, hevc):
+            if hevc:
+                return unit_type in HEVC_NAL_IRAP
+            return unit_type == H264_NAL_IDR
+    return False
+
+
+def parameter_sets(buf: bytes, codec_name: str) -> bytes:
+    """Return parameter set NAL units of buffer in Annex-B format.
+
+    Return empty bytes if buffer has no parameter sets.
+    """
+    hevc = is_hevc(codec_name)
+    types = HEVC_PARAMETER_SETS if hevc else H264_PARAMETER_SETS
+    units = []
+    for start, end in nal_units(buf):
+        if start >= end:
+            continue
+        unit_type = nal_type(buf, start, hevc)
+        if is_vcl(unit_type, hevc):
+            break
+        if unit_type in types:
+            units.append(b"\x00\x00\x00\x01" + bytes(buf[start:end]))
+    return b"".join(units)
@@ -0,0 +1,98 @@
+"""Score how much each video frame changed from bitstream metadata."""
+
+from __future__ import annotations
+import logging
+import math
+import warnings
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+# Packet size at which the size score reaches 1, in doublings over the floor.
+SIZE_DOUBLINGS = 6.0
+# Rate the size floor rises per frame, so it follows bitrate changes.
+FLOOR_DECAY = 1.002
+
+
+def _motion_vectors(frame: av.VideoFrame):
+    """Return motion vectors of frame as structured array or None."""
+    side_data = getattr(frame, "side_data", None)
+    if side_data is None:
+        return None
+    try:
+        vectors = side_data.get("MOTION_VECTORS")
+    except (KeyError, TypeError, ValueError):
+        return None
+    if vectors is None:
+        return None
+    return vectors.to_ndarray()
+
+
+class ChangeDetector:
+    """Score change of video frames without looking at pixels.
+
+    Two signals are combined, and the higher score is used:
+
+    - Motion: share of the picture covered by blocks with non-zero motion
+      vectors. Needs a decoder opened with `export_mvs`.
+    - Size: how far the packet is above the smallest recent packet.
+      Encoders spend few bits on static pictures, so this works without
+      motion vectors too.
+
+    Keyframes always score 1.0, since they carry no motion information.
+    Scores are between 0 and 1.
+    """
+
+    def __init__(self):
+        self._floor = 0.0
+        self._stats = {"frames": 0, "motion": 0}
+
+    def reset(self):
+        """Forget packet size history."""
+        self._floor = 0.0
+
+    def _size_score(self, size: int) -> float:
+        if size <= 0:
+            return 0.0
+        if not self._floor or size < self._floor:
+            self._floor = float(size)
+        else:
+            self._floor *= FLOOR_DECAY
+        return min(1.0, math.log2(size / self._floor) / SIZE_DOUBLINGS)
+
+    @staticmethod
+    def motion_score(frame: av.VideoFrame) -> float:
+        """Return share of picture with motion or -1.0 if not exported."""
+        vectors = _motion_vectors(frame)
+        if vectors is None:
+            return -1.0
+        if not len(vectors):
+            return 0.0
+        moving = (vectors["motion_x"] != 0) | (vectors["motion_y"] != 0)
+        area = vectors["w"].astype("int64") * vectors["h"]
+        return min(1.0, float(area[moving].sum()) / (frame.width * frame.height))
+
+    def score(self, buf: bytes, frame: av.VideoFrame) -> float:
+        """Return change score of decoded frame.
+
+        :param buf: Packet of frame
+        :param frame: Decoded frame
+        """
+        self._stats["frames"] += 1
+        size_score = self._size_score(len(buf))
+        if frame.key_frame:
+            return 1.0
+        motion = ChangeDetector.motion_score(frame)
+        if motion < 0:
+            return size_score
+        self._stats["motion"] += 1
+        return max(motion, size_score)
+
+    @property
+    def stats(self) -> dict:
+        """Return frames scored and frames scored with motion vectors."""
+        return dict(self._stats)
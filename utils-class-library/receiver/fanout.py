@@ -0,0 +1,200 @@
+"""Receiver which decodes once and fans frames out to subscribers."""
+
+from __future__ import annotations
+import logging
+import threading
+import time
+import warnings
+
+from . import AVReceiver
+from .rate import RateLimiter
+from .ring import FrameRing, RingCursor
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+
+def _even(value: float) -> int:
+    """Return value rounded to the nearest even integer of at least 2."""
+    return max(2, int(round(value / 2)) * 2)
+
+
+class Subscription:
+    """Subscription to the video frames of a :class:`FanoutReceiver`.
+
+    Frames are converted to the subscription's format and size and stored
+    in a ring of `max_frames`. Iterate with `async for` or use :meth:`stream`.
+
+    Use :meth:`FanoutReceiver.subscribe` to create subscriptions.
+    """
+
+    def __init__(
+        self,
+        receiver: FanoutReceiver,
+        fps: float,
+        video_format: str,
+        width: int,
+        height: int,
+        max_frames: int,
+    ):
+        self._receiver = receiver
+        self._rate = RateLimiter(fps)
+        self._video_format = video_format
+        self._width = width
+        self._height = height
+        # pylint: disable=protected-access
+        self._ring = FrameRing(max_frames, on_read=receiver._on_video_read)
+        self._cursor = self._ring.cursor()
+
+    def _key(self, frame: av.VideoFrame) -> tuple[str, int, int]:
+        """Return conversion key for frame. Equal keys share one conversion."""
+        width, height = self._width, self._height
+        if width and not height:
+            height = _even(width * frame.height / frame.width)
+        elif height and not width:
+            width = _even(height * frame.width / frame.height)
+        return (
+            self._video_format or frame.format.name,
+            width or frame.width,
+            height or frame.height,
+        )
+
+    def stream(self, latest_only: bool = False) -> RingCursor:
+        """Return a new async iterator of frames for this subscription."""
+        return self._ring.cursor(latest_only)
+
+    def latest(self) -> av.VideoFrame:
+        """Return latest frame or None."""
+        return self._ring.latest()
+
+    def close(self):
+        """Unsubscribe."""
+        self._receiver.unsubscribe(self)
+
+    def __aiter__(self):
+        return self._cursor
+
+    @property
+    def fps(self) -> float:
+        """Return target output FPS. 0 means every decoded frame."""
+        return self._rate.fps
+
+    @property
+    def video_format(self) -> str:
+        """Return video format. None means the decoder's format."""
+        return self._video_format
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """Return width and height as subscribed.
+
+        0 means the decoded size, or derived from the other dimension
+        keeping the aspect ratio if only one was given.
+        """
+        return self._width, self._height
+
+    @property
+    def dropped(self) -> int:
+        """Return frames dropped because the subscriber fell behind."""
+        return self._cursor.dropped
+
+
+class FanoutReceiver(AVReceiver):
+    """Receiver which decodes video once for several subscribers.
+
+    Each subscriber chooses its own output FPS, video format and size.
+    A frame is only converted for subscribers that are due for a frame,
+    and subscribers that ask for the same format and size share one
+    conversion. With no subscribers decoded frames are discarded without
+    any conversion. Audio is dropped before decoding.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._video_format = None
+        self.set_audio_policy(AVReceiver.AudioPolicy.DISABLED)
+        self._subscriptions: tuple[Subscription, ...] = ()
+        self._lock = threading.Lock()
+        self._conversions = 0
+
+    def subscribe(
+        self,
+        fps: float = 0.0,
+        video_format: str = "rgb24",
+        width: int = 0,
+        height: int = 0,
+        max_frames: int = 2,
+    ) -> Subscription:
+        """Return new subscription to video frames.
+
+        :param fps: Target output FPS. If <= 0, every decoded frame is output.
+        :param video_format: Format to output frames as, i.e. 'rgb24', 'gray'.
+            If None, frames are output in the decoder's format.
+        :param width: Output width. If <= 0, the decoded width is used,
+            or the width keeping the aspect ratio if height is given.
+        :param height: Output height. If <= 0, the decoded height is used,
+            or the height keeping the aspect ratio if width is given.
+        :param max_frames: Maximum frames stored for the subscriber.
+        """
+        subscription = Subscription(
+            self, fps, video_format, max(0, width), max(0, height), max_frames
+        )
+        with self._lock:
+            self._subscriptions = self._subscriptions + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove subscription."""
+        with self._lock:
+            self._subscriptions = tuple(
+                sub for sub in self._subscriptions if sub is not subscription
+            )
+        # pylint: disable=protected-access
+        subscription._ring.close()
+
+    def handle_video(self, frame: av.VideoFrame):
+        """Handle video frame. Convert once per distinct subscriber format."""
+        subscriptions = self._subscriptions
+        if not subscriptions:
+            return
+        now = time.monotonic()
+        converted = {}
+        for subscription in subscriptions:
+            # pylint: disable=protected-access
+            if not subscription._rate.ready(now):
+                continue
+            key = subscription._key(frame)
+            output = converted.get(key)
+            if output is None:
+                output = frame
+                if key != (frame.format.name, frame.width, frame.height):
+                    video_format, width, height = key
+                    output = frame.reformat(width, height, video_format)
+                    self._conversions += 1
+                converted[key] = output
+            subscription._ring.push(output, self._video_timing)
+        if converted:
+            self._session.events.emit("video_frame")
+
+    def handle_audio(self, frame: av.AudioFrame):
+        """Not used. Audio is not decoded."""
+
+    def close(self):
+        """Close Receiver. Ends iteration for all subscribers."""
+        super().close()
+        for subscription in self._subscriptions:
+            subscription._ring.close()  # pylint: disable=protected-access
+
+    @property
+    def subscriptions(self) -> list[Subscription]:
+        """Return subscriptions."""
+        return list(self._subscriptions)
+
+    @property
+    def conversions(self) -> int:
+        """Return number of format conversions done."""
+        return self._conversions
@@ -0,0 +1,178 @@
+"""Frame timing and latency histograms for receivers."""
+
+from __future__ import annotations
+from dataclasses import dataclass
+import threading
+import time
+
+STAGES = ("receive", "decode", "convert", "queue", "total")
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+@dataclass
+class FrameTiming:
+    """Monotonic timestamps of one frame through the receiver pipeline.
+
+    Timestamps are from `time.monotonic()` and are 0.0 until reached.
+
+    :param arrival: Frame data arrived at the receiver
+    :param decode_start: Decoding started
+    :param decode_end: Decoding finished
+    :param converted: Conversion to the output format finished
+    :param delivered: Frame was first read by a consumer
+    """
+
+    arrival: float = 0.0
+    decode_start: float = 0.0
+    decode_end: float = 0.0
+    converted: float = 0.0
+    delivered: float = 0.0
+
+    def stages(self) -> dict[str, float]:
+        """Return duration of each stage in seconds."""
+        return {
+            "receive": self.decode_start - self.arrival,
+            "decode": self.decode_end - self.decode_start,
+            "convert": self.converted - self.decode_end,
+            "queue": self.delivered - self.converted,
+            "total": self.delivered - self.arrival,
+        }
+
+
+class LatencyHistogram:
+    """Log-linear histogram of latencies in the style of HdrHistogram.
+
+    Values are recorded in microseconds. Every bucket is within
+    1 / 2 ** (sub_bits - 1) of the values it holds, at any magnitude.
+
+    :param sub_bits: Bits of precision per power of two
+    """
+
+    def __init__(self, sub_bits: int = 7):
+        self._sub_bits = sub_bits
+        self._half = 1 << (sub_bits - 1)
+        self._counts: list[int] = []
+        self.count = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        bucket = max(0, value.bit_length() - self._sub_bits)
+        return bucket * self._half + (value >> bucket)
+
+    def _value(self, index: int) -> int:
+        """Return highest value of bucket at index."""
+        bucket = max(0, index // self._half - 1)
+        sub = index - bucket * self._half
+        return ((sub + 1) << bucket) - 1
+
+    def record(self, seconds: float):
+        """Record latency."""
+        value = max(0, int(seconds * 1_000_000))
+        index = self._index(value)
+        if index >= len(self._counts):
+            self._counts.extend([0] * (index + 1 - len(self._counts)))
+        self._counts[index] += 1
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def merge(self, other: LatencyHistogram):
+        """Add counts of other histogram."""
+        # pylint: disable=protected-access
+        if len(other._counts) > len(self._counts):
+            self._counts.extend([0] * (len(other._counts) - len(self._counts)))
+        for index, count in enumerate(other._counts):
+            self._counts[index] += count
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percentile: float) -> float:
+        """Return latency in seconds at percentile."""
+        if not self.count:
+            return 0.0
+        target = max(1, round(self.count * percentile / 100))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                return min(self._value(index), self.max) / 1_000_000
+        return self.max / 1_000_000
+
+
+class RollingHistogram:
+    """Latency histogram of the last `window` seconds.
+
+    The window is split in intervals; the oldest interval is discarded
+    as a new one starts.
+
+    :param window: Window in seconds
+    :param intervals: Number of intervals in window
+    """
+
+    def __init__(self, window: float = 60.0, intervals: int = 6):
+        self._interval = window / intervals
+        self._histograms = [LatencyHistogram() for _ in range(intervals)]
+        self._started = time.monotonic()
+        self._current = 0
+
+    def _rotate(self, now: float):
+        elapsed = int((now - self._started) // self._interval)
+        if elapsed <= 0:
+            return
+        for _ in range(min(elapsed, len(self._histograms))):
+            self._current = (self._current + 1) % len(self._histograms)
+            self._histograms[self._current] = LatencyHistogram()
+        self._started += elapsed * self._interval
+
+    def record(self, seconds: float, now: float):
+        """Record latency."""
+        self._rotate(now)
+        self._histograms[self._current].record(seconds)
+
+    def snapshot(self, now: float) -> LatencyHistogram:
+        """Return histogram of window."""
+        self._rotate(now)
+        merged = LatencyHistogram()
+        for histogram in self._histograms:
+            merged.merge(histogram)
+        return merged
+
+
+class LatencyRecorder:
+    """Rolling latency histograms per pipeline stage.
+
+    :param window: Window in seconds of recorded latencies
+    """
+
+    def __init__(self, window: float = 60.0):
+        self._lock = threading.Lock()
+        self._window = window
+        self._stages = {stage: RollingHistogram(window) for stage in STAGES}
+
+    def record(self, timing: FrameTiming):
+        """Record stage latencies of a delivered frame."""
+        now = time.monotonic()
+        with self._lock:
+            for stage, seconds in timing.stages().items():
+                self._stages[stage].record(seconds, now)
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        """Return histogram of stage for the current window."""
+        with self._lock:
+            return self._stages[stage].snapshot(time.monotonic())
+
+    def summary(self) -> dict[str, dict]:
+        """Return count, percentiles and max in ms for each stage."""
+        summary = {}
+        for stage in STAGES:
+            histogram = self.histogram(stage)
+            stats = {"count": histogram.count}
+            for percentile in PERCENTILES:
+                stats[f"p{percentile:g}"] = histogram.percentile(percentile) * 1000
+            stats["max"] = histogram.max / 1000
+            summary[stage] = stats
+        return summary
+
+    def reset(self):
+        """Discard recorded latencies."""
+        with self._lock:
+            self._stages = {stage: RollingHistogram(self._window) for stage in STAGES}
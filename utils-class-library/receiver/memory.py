@@ -0,0 +1,136 @@
+"""Process-wide accounting of frame memory held by receivers."""
+
+from __future__ import annotations
+import logging
+import threading
+from typing import TYPE_CHECKING
+import weakref
+
+if TYPE_CHECKING:
+    from . import AVReceiver
+
+_LOGGER = logging.getLogger(__name__)
+
+# Smallest output scale the accountant downscales receivers to.
+MIN_SCALE = 0.25
+
+
+def frame_bytes(frame) -> int:
+    """Return bytes of the planes of an audio or video frame."""
+    return sum(plane.buffer_size for plane in frame.planes)
+
+
+class MemoryAccountant:
+    """Accounting of frame memory of all receivers in the process.
+
+    Receivers which store frames register themselves and report their usage.
+    When the total exceeds the budget, the oldest frames of the largest
+    receivers are evicted first. If the latest frames alone exceed the
+    budget, receivers output smaller frames, down to `min_scale`.
+    The scale is restored once usage would stay well under budget.
+
+    :param budget: Maximum bytes of frames. If <= 0, not limited
+    :param min_scale: Smallest output scale
+    """
+
+    def __init__(self, budget: int = 0, min_scale: float = MIN_SCALE):
+        self._budget = budget
+        self._min_scale = min_scale
+        self._receivers: weakref.WeakSet[AVReceiver] = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._stats = {"evicted": 0, "downscaled": 0, "restored": 0}
+
+    def register(self, receiver: AVReceiver):
+        """Account frame memory of receiver."""
+        self._receivers.add(receiver)
+
+    def unregister(self, receiver: AVReceiver):
+        """Stop accounting frame memory of receiver."""
+        self._receivers.discard(receiver)
+
+    def set_budget(self, budget: int):
+        """Set maximum bytes of frames of all receivers. If <= 0, not limited."""
+        self._budget = budget
+        self.check()
+
+    @staticmethod
+    def _name(receiver: AVReceiver) -> str:
+        # pylint: disable=protected-access
+        session = receiver._session
+        if session is not None:
+            return f"{session.host}-{id(receiver):x}"
+        return f"{type(receiver).__name__}-{id(receiver):x}"
+
+    def usage(self) -> dict[str, int]:
+        """Return bytes of frames held by each receiver."""
+        return {
+            self._name(receiver): receiver.memory_usage
+            for receiver in list(self._receivers)
+        }
+
+    def check(self):
+        """Evict frames or downscale receivers if over budget.
+
+        Called by receivers after storing a frame. Skipped if another
+        thread is already checking.
+        """
+        if self._budget <= 0 or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._enforce()
+        finally:
+            self._lock.release()
+
+    def _enforce(self):
+        # pylint: disable=protected-access
+        receivers = sorted(
+            self._receivers, key=lambda receiver: receiver.memory_usage, reverse=True
+        )
+        total = sum(receiver.memory_usage for receiver in receivers)
+        if total > self._budget:
+            for receiver in receivers:
+                freed = receiver._evict(total - self._budget)
+                if freed:
+                    self._stats["evicted"] += 1
+                total -= freed
+                if total <= self._budget:
+                    return
+            for receiver in receivers:
+                scale = receiver.output_scale
+                if scale > self._min_scale:
+                    receiver.output_scale = max(self._min_scale, scale / 2)
+                    self._stats["downscaled"] += 1
+                    _LOGGER.warning(
+                        "Frame memory over budget: %s > %s. Downscaling %s to %s",
+                        total,
+                        self._budget,
+                        self._name(receiver),
+                        receiver.output_scale,
+                    )
+                    return
+        # Doubling scale quadruples frame size.
+        elif total * 4 < self._budget * 0.8:
+            for receiver in receivers:
+                scale = receiver.output_scale
+                if scale < 1.0:
+                    receiver.output_scale = min(1.0, scale * 2)
+                    self._stats["restored"] += 1
+                    return
+
+    @property
+    def budget(self) -> int:
+        """Return budget in bytes."""
+        return self._budget
+
+    @property
+    def total(self) -> int:
+        """Return bytes of frames held by all receivers."""
+        return sum(receiver.memory_usage for receiver in list(self._receivers))
+
+    @property
+    def stats(self) -> dict:
+        """Return number of evictions, downscales and restores."""
+        return dict(self._stats)
+
+
+FRAME_MEMORY = MemoryAccountant()
@@ -0,0 +1,175 @@
+"""Receiver which stores audio as PCM samples in a ring buffer."""
+
+from __future__ import annotations
+import logging
+import threading
+import warnings
+
+from . import AVReceiver
+from .latency import FrameTiming
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+# Resampler format and NumPy dtype of each sample format.
+SAMPLE_FORMATS = {"s16": "int16", "flt": "float32"}
+
+
+class PCMReceiver(AVReceiver):
+    """Receiver which writes audio into a fixed-size PCM ring buffer.
+
+    Samples are interleaved and stored in an array of shape
+    (samples, channels). The buffer is mirrored: every sample is written
+    twice, one capacity apart, so the last N samples are always contiguous
+    and are returned as a view without copying.
+
+    A view stays valid until the producer writes over it, which is after
+    `capacity - N` more samples. Pass `copy=True` to keep data longer.
+
+    Video is not handled. Use with a receiver that handles video if needed.
+
+    :param seconds: Length of audio kept in buffer
+    :param sample_format: One of `s16` or `flt`
+    """
+
+    def __init__(self, seconds: float = 5.0, sample_format: str = "s16"):
+        super().__init__()
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Invalid sample format: {sample_format}")
+        self._audio_format = sample_format
+        self._seconds = seconds
+        self._buffer = None
+        self._capacity = 0
+        self._sample_rate = 0
+        self._written = 0
+        self._timing: FrameTiming = None
+        self._overruns = 0
+        self._lost = 0
+        self._lock = threading.Lock()
+
+    def _get_audio_codec(self, header: bytes):
+        """Get Audio config from header. Get Audio codec. Allocate buffer."""
+        super()._get_audio_codec(header)
+        self._allocate(self._audio_config["rate"], self._audio_config["channels"])
+
+    def _allocate(self, rate: int, channels: int):
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        capacity = max(1, int(self._seconds * rate))
+        with self._lock:
+            self._sample_rate = rate
+            self._capacity = capacity
+            self._buffer = np.zeros(
+                (capacity * 2, channels), dtype=SAMPLE_FORMATS[self._audio_format]
+            )
+            self._written = 0
+        _LOGGER.debug("PCM buffer: %s samples x %s channels", capacity, channels)
+
+    def _write(self, samples):
+        """Write samples of shape (samples, channels) to buffer."""
+        capacity = self._capacity
+        if len(samples) > capacity:
+            samples = samples[-capacity:]
+        count = len(samples)
+        start = self._written % capacity
+        first = min(count, capacity - start)
+        for offset in (0, capacity):
+            self._buffer[start + offset : start + offset + first] = samples[:first]
+        if first < count:
+            rest = count - first
+            for offset in (0, capacity):
+                self._buffer[offset : offset + rest] = samples[first:]
+        with self._lock:
+            self._written += count
+
+    def handle_audio(self, frame: av.AudioFrame):
+        """Handle Audio Frame. Write samples to buffer."""
+        if self._buffer is None:
+            return
+        samples = frame.to_ndarray().reshape(-1, self._buffer.shape[1])
+        self._write(samples)
+        self._timing = self._audio_timing
+        self._session.events.emit("audio_frame")
+
+    def handle_video(self, frame: av.VideoFrame):
+        """Not used. Video frames are discarded."""
+
+    def _view(self, end: int, count: int, copy: bool):
+        capacity = self._capacity
+        stop = end % capacity + capacity
+        view = self._buffer[stop - count : stop]
+        return view.copy() if copy else view
+
+    def last(self, milliseconds: float, copy: bool = False):
+        """Return the last milliseconds of audio as array of (samples, channels).
+
+        Returns fewer samples if less audio was received.
+        Returns None if audio config was not received.
+
+        :param milliseconds: Length of audio to return
+        :param copy: Return a copy instead of a view of the buffer
+        """
+        if self._buffer is None:
+            return None
+        with self._lock:
+            written = self._written
+        count = int(milliseconds * self._sample_rate / 1000)
+        count = min(count, written, self._capacity)
+        if self._timing is not None:
+            self._on_audio_read(self._timing)
+        return self._view(written, count, copy)
+
+    def read(self, position: int, copy: bool = False) -> tuple:
+        """Return samples written since position and the new position.
+
+        Start with position 0. If more than capacity samples were written
+        since position, the oldest are lost and an overrun is counted.
+
+        :param position: Position returned by the previous read
+        :param copy: Return a copy instead of a view of the buffer
+        """
+        if self._buffer is None:
+            return None, position
+        with self._lock:
+            written = self._written
+        count = written - position
+        if count > self._capacity:
+            with self._lock:
+                self._overruns += 1
+                self._lost += count - self._capacity
+            _LOGGER.debug("PCM overrun: %s samples lost", count - self._capacity)
+            count = self._capacity
+        if count <= 0:
+            return self._view(written, 0, False), written
+        if self._timing is not None:
+            self._on_audio_read(self._timing)
+        return self._view(written, count, copy), written
+
+    @property
+    def capacity(self) -> int:
+        """Return capacity of buffer in samples per channel."""
+        return self._capacity
+
+    @property
+    def sample_rate(self) -> int:
+        """Return sample rate. 0 until audio config is received."""
+        return self._sample_rate
+
+    @property
+    def position(self) -> int:
+        """Return total samples per channel written."""
+        return self._written
+
+    @property
+    def overruns(self) -> int:
+        """Return number of reads which lost samples."""
+        return self._overruns
+
+    @property
+    def lost_samples(self) -> int:
+        """Return samples per channel lost by overruns."""
+        return self._lost
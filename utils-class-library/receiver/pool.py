@@ -0,0 +1,210 @@
+"""Pool of opened video decoders and cache of host stream parameters."""
+
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
+import warnings
+from typing import Union
+
+from pyremoteplay.const import FFMPEG_PADDING, Resolution
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+PARAMS_PATH = os.path.join(
+    os.path.expanduser("~"), ".pyremoteplay", ".stream_params.json"
+)
+
+
+class DecoderPool:
+    """Pool of opened video decoder contexts.
+
+    Decoders are keyed by codec, resolution, decode profile, thread type
+    and motion vector export.
+    Receivers check out a decoder when the stream starts and return it when
+    closed, so reconnecting does not create and open a new decoder.
+
+    :param size: Maximum idle decoders kept per key
+    """
+
+    def __init__(self, size: int = 2):
+        self._size = size
+        self._idle: dict[tuple, list[av.CodecContext]] = {}
+        self._keys: dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(
+        codec_name: str,
+        resolution: Union[Resolution, str, int],
+        profile: str,
+        thread_type: str,
+        export_mvs: bool,
+    ) -> tuple:
+        resolution = Resolution.parse(resolution).name
+        return (codec_name, resolution, profile, thread_type, export_mvs)
+
+    @staticmethod
+    def _open(
+        codec_name: str, profile: str, thread_type: str, export_mvs: bool
+    ) -> av.CodecContext:
+        # pylint: disable=import-outside-toplevel
+        from . import AVReceiver
+
+        codec_ctx = AVReceiver.video_codec(
+            codec_name, profile, thread_type, export_mvs
+        )
+        codec_ctx.open()
+        return codec_ctx
+
+    def warm(
+        self,
+        codec_name: str,
+        resolution: Union[Resolution, str, int],
+        profile: str = "full",
+        thread_type: str = None,
+        count: int = 1,
+        export_mvs: bool = False,
+    ):
+        """Open decoders ahead of time.
+
+        :param codec_name: Name of FFMPEG decoder
+        :param resolution: Resolution of stream
+        :param profile: Decode profile
+        :param thread_type: Decoder threading
+        :param count: Number of decoders to have idle
+        :param export_mvs: Export motion vectors
+        """
+        key = self._key(codec_name, resolution, profile, thread_type, export_mvs)
+        with self._lock:
+            missing = min(count, self._size) - len(self._idle.get(key, []))
+        for _ in range(missing):
+            codec_ctx = self._open(codec_name, profile, thread_type, export_mvs)
+            with self._lock:
+                self._keys[id(codec_ctx)] = key
+                self._idle.setdefault(key, []).append(codec_ctx)
+
+    def checkout(
+        self,
+        codec_name: str,
+        resolution: Union[Resolution, str, int],
+        profile: str = "full",
+        thread_type: str = None,
+        export_mvs: bool = False,
+    ) -> av.CodecContext:
+        """Return opened decoder. Opens a new decoder if none are idle.
+
+        :raises av.error.ValueError: If decoder could not be opened
+        """
+        key = self._key(codec_name, resolution, profile, thread_type, export_mvs)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                _LOGGER.debug("Using pooled decoder: %s", key)
+                return idle.pop()
+        codec_ctx = self._open(codec_name, profile, thread_type, export_mvs)
+        with self._lock:
+            self._keys[id(codec_ctx)] = key
+        return codec_ctx
+
+    def release(self, codec_ctx: av.CodecContext):
+        """Return decoder to pool. Decoders that can't be reset are closed."""
+        with self._lock:
+            key = self._keys.get(id(codec_ctx))
+            idle = self._idle.setdefault(key, []) if key else None
+            keep = idle is not None and len(idle) < self._size
+        flush = getattr(codec_ctx, "flush_buffers", None)
+        if keep and flush is not None:
+            try:
+                flush()
+            # pylint: disable=broad-except
+            except Exception as error:
+                _LOGGER.debug("Could not flush decoder: %s", error)
+            else:
+                with self._lock:
+                    idle.append(codec_ctx)
+                return
+        with self._lock:
+            self._keys.pop(id(codec_ctx), None)
+        codec_ctx.close()
+
+    def close(self):
+        """Close all idle decoders."""
+        with self._lock:
+            idle = [ctx for contexts in self._idle.values() for ctx in contexts]
+            self._idle = {}
+            for codec_ctx in idle:
+                self._keys.pop(id(codec_ctx), None)
+        for codec_ctx in idle:
+            codec_ctx.close()
+
+
+class StreamParameterCache:
+    """Parameter sets (VPS/SPS/PPS) of host streams saved to file.
+
+    Parameters are keyed by console MAC address, codec and resolution.
+    A decoder primed with them can decode as soon as picture data arrives.
+
+    :param path: Path to file
+    """
+
+    def __init__(self, path: str = PARAMS_PATH):
+        self._path = path
+        self._lock = threading.Lock()
+        self._params: dict[str, str] = None
+
+    @staticmethod
+    def _key(mac_address: str, codec_name: str, resolution) -> str:
+        resolution = Resolution.parse(resolution).name
+        return f"{mac_address.upper()}|{codec_name.split('_')[0]}|{resolution}"
+
+    def _load(self) -> dict:
+        if self._params is None:
+            try:
+                with open(self._path, "r", encoding="utf-8") as file:
+                    self._params = json.load(file)
+            except (OSError, ValueError):
+                self._params = {}
+        return self._params
+
+    def get(self, mac_address: str, codec_name: str, resolution) -> bytes:
+        """Return cached parameter sets in Annex-B format or empty bytes."""
+        with self._lock:
+            params = self._load().get(self._key(mac_address, codec_name, resolution))
+        return bytes.fromhex(params) if params else b""
+
+    def update(self, mac_address: str, codec_name: str, resolution, params: bytes):
+        """Save parameter sets if they changed."""
+        key = self._key(mac_address, codec_name, resolution)
+        with self._lock:
+            cache = self._load()
+            if cache.get(key) == params.hex():
+                return
+            cache[key] = params.hex()
+            try:
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+                with open(self._path, "w", encoding="utf-8") as file:
+                    json.dump(cache, file, indent=2)
+            except OSError as error:
+                _LOGGER.warning("Could not save stream parameters: %s", error)
+
+
+def prime_decoder(codec_ctx: av.CodecContext, params: bytes):
+    """Feed parameter sets to decoder so the first picture can be decoded."""
+    if not params:
+        return
+    packet = av.packet.Packet(b"".join([params, bytes(FFMPEG_PADDING)]))
+    try:
+        codec_ctx.decode(packet)
+    except av.error.FFmpegError as error:
+        _LOGGER.debug("Could not prime decoder: %s", error)
+
+
+DECODER_POOL = DecoderPool()
+STREAM_PARAMS = StreamParameterCache()
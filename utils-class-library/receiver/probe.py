@@ -0,0 +1,254 @@
+"""Rank video decoders by benchmarking them on this machine.
+
+Used by sessions created with `codec="auto"`.
+Rankings are cached per machine and stream, so each resolution and fps is
+only benchmarked once.
+"""
+
+from __future__ import annotations
+import json
+import logging
+import os
+import platform
+import time
+from typing import Iterable
+import warnings
+
+from pyremoteplay.const import FPS, Resolution
+from . import AVReceiver
+from .synthetic import frame_size, synthetic_clip
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".pyremoteplay", ".decoder_ranking.json"
+)
+
+# Decoder name and thread type of each candidate.
+CANDIDATES = {
+    "h264": (
+        ("h264", "SLICE"),
+        ("h264", "FRAME"),
+        ("h264", "AUTO"),
+        ("libopenh264", "AUTO"),
+        ("h264_cuvid", "AUTO"),
+        ("h264_qsv", "AUTO"),
+    ),
+    "hevc": (
+        ("hevc", "SLICE"),
+        ("hevc", "FRAME"),
+        ("hevc", "AUTO"),
+        ("hevc_cuvid", "AUTO"),
+        ("hevc_qsv", "AUTO"),
+    ),
+}
+
+PROBE_SECONDS = 1.0
+# Bumped when results of earlier probes are no longer valid.
+PROBE_VERSION = 2
+
+
+def _machine_id() -> str:
+    """Return id which changes when the machine or FFMPEG build changes."""
+    return "|".join(
+        [
+            platform.node(),
+            platform.machine(),
+            str(os.cpu_count()),
+            av.__version__,
+            str(PROBE_VERSION),
+        ]
+    )
+
+
+def _key(resolution: Resolution, fps: FPS) -> str:
+    return f"{resolution.name}@{int(fps)}"
+
+
+def _benchmark(packets: list[bytes], codec_name: str, thread_type: str) -> dict:
+    """Return result of decoding packets or None if decoder is unusable."""
+    if codec_name not in av.codecs_available:
+        return None
+    try:
+        codec_ctx = AVReceiver.video_codec(codec_name, thread_type=thread_type)
+        codec_ctx.open()
+    # pylint: disable=broad-except
+    except Exception as error:
+        _LOGGER.debug("Decoder %s unavailable: %s", codec_name, error)
+        return None
+    decoded = 0
+    delay = None
+    try:
+        start = time.perf_counter()
+        for index, packet in enumerate(packets):
+            frame = AVReceiver.decode_video(packet, codec_ctx)
+            if frame is not None:
+                decoded += 1
+                if delay is None:
+                    delay = index
+        elapsed = time.perf_counter() - start
+    # pylint: disable=broad-except
+    except Exception as error:
+        _LOGGER.debug("Decoder %s failed: %s", codec_name, error)
+        return None
+    finally:
+        try:
+            codec_ctx.close()
+        # pylint: disable=broad-except
+        except Exception as error:
+            _LOGGER.debug("Error closing decoder %s: %s", codec_name, error)
+    if not decoded:
+        return None
+    ms_per_frame = elapsed * 1000 / len(packets)
+    return {
+        "codec": codec_name,
+        "thread_type": thread_type,
+        "ms_per_frame": ms_per_frame,
+        "delay_frames": delay,
+        # Frame threading holds frames back, which adds latency to a live stream.
+        "score": ms_per_frame * (1 + delay),
+    }
+
+
+def probe_decoders(
+    stream_type: str = "h264",
+    seconds: float = PROBE_SECONDS,
+    resolutions: Iterable[Resolution] = tuple(Resolution),
+    fps_list: Iterable[FPS] = tuple(FPS),
+) -> dict:
+    """Return ranking of decoders for each resolution and fps.
+
+    Rankings are sorted from fastest to slowest by estimated latency per frame.
+    Blocks while decoding. Each combination takes about a second per decoder.
+
+    :param stream_type: One of `h264` or `hevc`
+    :param seconds: Length of synthetic clip to decode
+    :param resolutions: Resolutions to probe. All if not given
+    :param fps_list: FPS to probe. All if not given
+    """
+    rankings = {}
+    for resolution in resolutions:
+        width, height = frame_size(resolution)
+        for fps in fps_list:
+            packets = synthetic_clip(stream_type, width, height, int(fps), seconds)
+            results = []
+            for codec_name, thread_type in CANDIDATES[stream_type]:
+                result = _benchmark(packets, codec_name, thread_type)
+                if result is not None:
+                    results.append(result)
+            results.sort(key=lambda result: result["score"])
+            rankings[_key(resolution, fps)] = results
+            _LOGGER.info(
+                "Decoder ranking %s: %s",
+                _key(resolution, fps),
+                [(result["codec"], result["thread_type"]) for result in results],
+            )
+    return rankings
+
+
+def _load_cache(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("machine") != _machine_id():
+        return {}
+    return cache
+
+
+def get_rankings(
+    stream_type: str = "h264",
+    refresh: bool = False,
+    path: str = CACHE_PATH,
+    resolution: Resolution = None,
+    fps: FPS = None,
+    probe: bool = True,
+) -> dict:
+    """Return cached rankings for stream type. Probe decoders if not cached.
+
+    :param stream_type: One of `h264` or `hevc`
+    :param refresh: Probe decoders even if cached
+    :param path: Path to cache file
+    :param resolution: Only probe this resolution. All if None
+    :param fps: Only probe this FPS. All if None
+    :param probe: If False, only return cached rankings
+    """
+    cache = {} if refresh else _load_cache(path)
+    rankings = cache.get("rankings", {})
+    stream_rankings = rankings.setdefault(stream_type, {})
+    resolutions = tuple(Resolution) if resolution is None else (resolution,)
+    fps_list = tuple(FPS) if fps is None else (fps,)
+    missing = [
+        (_resolution, _fps)
+        for _resolution in resolutions
+        for _fps in fps_list
+        if _key(_resolution, _fps) not in stream_rankings
+    ]
+    if not missing or not probe:
+        return stream_rankings
+
+    _LOGGER.info(
+        "Probing %s decoders for %s. This only runs once per machine.",
+        stream_type,
+        [_key(_resolution, _fps) for _resolution, _fps in missing],
+    )
+    for _resolution, _fps in missing:
+        stream_rankings.update(
+            probe_decoders(stream_type, resolutions=(_resolution,), fps_list=(_fps,))
+        )
+    cache = {"machine": _machine_id(), "rankings": rankings}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(cache, file, indent=2)
+    except OSError as error:
+        _LOGGER.warning("Could not save decoder ranking: %s", error)
+    return stream_rankings
+
+
+def is_probed(
+    stream_type: str, resolution: Resolution, fps: FPS, path: str = CACHE_PATH
+) -> bool:
+    """Return True if decoders are ranked for stream. Never probes."""
+    rankings = get_rankings(stream_type, path=path, probe=False)
+    return _key(resolution, fps) in rankings
+
+
+def best_decoder(
+    stream_type: str,
+    resolution: Resolution,
+    fps: FPS,
+    path: str = CACHE_PATH,
+    probe: bool = True,
+) -> dict:
+    """Return config of fastest decoder for stream.
+
+    Config contains `codec` and `thread_type`.
+    Falls back to the FFMPEG software decoder with default threading
+    (`thread_type` None) if no decoder could be probed.
+    Only the resolution and fps of the stream are probed, if not cached.
+    Probing blocks. Call from an executor when an event loop is running.
+
+    :param stream_type: One of `h264` or `hevc`
+    :param resolution: Resolution of stream
+    :param fps: FPS of stream
+    :param path: Path to cache file
+    :param probe: If False, return the default decoder if not cached
+    """
+    ranking = get_rankings(
+        stream_type, path=path, resolution=resolution, fps=fps, probe=probe
+    ).get(_key(resolution, fps))
+    if not ranking:
+        _LOGGER.warning("No decoder ranking for %s. Using default", stream_type)
+        return {"codec": stream_type, "thread_type": None}
+    best = ranking[0]
+    _LOGGER.info(
+        "Auto selected decoder: %s; Threads: %s", best["codec"], best["thread_type"]
+    )
+    return {"codec": best["codec"], "thread_type": best["thread_type"]}
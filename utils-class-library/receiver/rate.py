@@ -0,0 +1,34 @@
+"""Output rate limiting for receivers."""
+
+from __future__ import annotations
+
+
+class RateLimiter:
+    """Drift compensated frame rate limiter.
+
+    Frames are let through on a fixed schedule, so the average output rate
+    matches the target as long as input frames arrive faster than it.
+
+    :param fps: Target frames per second. If <= 0, every frame is let through.
+    """
+
+    def __init__(self, fps: float = 0.0):
+        self.fps = fps
+        self._next = 0.0
+
+    def reset(self):
+        """Reset schedule. The next frame is let through."""
+        self._next = 0.0
+
+    def ready(self, now: float) -> bool:
+        """Return True if frame arriving at monotonic time now should be output."""
+        if self.fps <= 0:
+            return True
+        if now < self._next:
+            return False
+        period = 1.0 / self.fps
+        self._next += period
+        if self._next <= now:
+            # Fell behind; don't burst to catch up.
+            self._next = now + period
+        return True
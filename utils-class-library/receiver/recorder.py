@@ -0,0 +1,228 @@
+"""Receiver which records the compressed AV stream without decoding."""
+
+from __future__ import annotations
+from datetime import datetime
+from fractions import Fraction
+import logging
+import os
+import threading
+import time
+import warnings
+
+from . import AVReceiver
+from .bitstream import is_keyframe, parameter_sets
+from .synthetic import frame_size
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+CONTAINERS = {
+    "matroska": "mkv",
+    "mp4": "mp4",
+}
+
+TIME_BASE = Fraction(1, 1000)
+
+
+def add_streams(
+    output: av.container.OutputContainer,
+    codec_name: str,
+    resolution,
+    fps: int,
+    keyframe: bytes,
+    audio_config: dict = None,
+) -> tuple[av.stream.Stream, av.stream.Stream]:
+    """Add streams for muxing host packets as received. Return video and audio stream.
+
+    :param output: Container to add streams to
+    :param codec_name: Codec of the host stream. One of `h264` or `hevc`
+    :param resolution: `Resolution` of the stream
+    :param fps: Frame rate of the stream
+    :param keyframe: First keyframe. Its parameter sets fill the container headers
+    :param audio_config: Audio config with `channels` and `rate`.
+        No audio stream is added if None
+    """
+    stream = output.add_stream(codec_name, rate=int(fps))
+    stream.width, stream.height = frame_size(resolution)
+    stream.pix_fmt = "yuv420p"
+    # The stream context is only used to fill the container headers.
+    # Use the parameter sets of the host stream instead of the encoder's.
+    stream.codec_context.global_header = False
+    stream.codec_context.extradata = parameter_sets(keyframe, codec_name)
+    video_stream = stream
+
+    audio_stream = None
+    if audio_config:
+        stream = output.add_stream("opus", rate=audio_config["rate"])
+        stream.channels = audio_config["channels"]
+        stream.codec_context.options = {"strict": "experimental"}
+        audio_stream = stream
+    return video_stream, audio_stream
+
+
+def mux_packet(
+    output: av.container.OutputContainer,
+    stream: av.stream.Stream,
+    buf: bytes,
+    pts: int,
+    keyframe: bool = False,
+):
+    """Mux buffer into stream. Timestamps are in ms. Errors are logged."""
+    packet = av.packet.Packet(buf)
+    packet.stream = stream
+    packet.time_base = TIME_BASE
+    packet.pts = packet.dts = pts
+    packet.is_keyframe = keyframe
+    try:
+        output.mux(packet)
+    except av.error.FFmpegError as error:
+        _LOGGER.error("Error muxing packet: %s", error)
+
+
+class PassthroughReceiver(AVReceiver):
+    """Receiver which writes the compressed video and audio into segmented files.
+
+    Video is muxed as received from the host and audio is muxed as Opus packets.
+    Nothing is decoded, so no frames are available from this receiver.
+
+    A new segment starts at the first keyframe after `segment_seconds`.
+    Video received before the first keyframe is dropped.
+
+    :param directory: Directory to write segments to. Created if it doesn't exist
+    :param prefix: Prefix for segment file names
+    :param segment_seconds: Minimum length of a segment in seconds
+    :param container: One of `matroska` or `mp4`
+    :param audio: Record audio if True
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "session",
+        segment_seconds: float = 300.0,
+        container: str = "matroska",
+        audio: bool = True,
+    ):
+        super().__init__()
+        if container not in CONTAINERS:
+            raise ValueError(f"Container must be one of {list(CONTAINERS)}")
+        self._directory = directory
+        self._prefix = prefix
+        self._segment_seconds = segment_seconds
+        self._container_format = container
+        self._record_audio = audio
+        self._lock = threading.Lock()
+        self._output = None
+        self._video_stream = None
+        self._audio_stream = None
+        self._segment_start = 0.0
+        self._segment_index = 0
+        self._last_pts = {}
+        self._segments = []
+
+    def _get_video_codec(self):
+        """Nothing to decode. Video is muxed as received."""
+
+    def _get_audio_codec(self, header: bytes):
+        """Get Audio config from header. Audio is muxed as received."""
+        self._parse_audio_config(header)
+        self._session.events.emit("audio_config")
+
+    def _segment_path(self) -> str:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        extension = CONTAINERS[self._container_format]
+        name = f"{self._prefix}_{timestamp}_{self._segment_index:04d}.{extension}"
+        return os.path.join(self._directory, name)
+
+    def _open_segment(self, keyframe: bytes):
+        """Open a new segment starting with keyframe."""
+        self._close_segment()
+        os.makedirs(self._directory, exist_ok=True)
+        path = self._segment_path()
+        self._segment_index += 1
+
+        output = av.open(path, "w", format=self._container_format)
+        self._video_stream, self._audio_stream = add_streams(
+            output,
+            self._stream_codec,
+            self._session.resolution,
+            self._session.fps,
+            keyframe,
+            self._audio_config if self._record_audio else None,
+        )
+
+        self._output = output
+        self._segment_start = time.monotonic()
+        self._last_pts = {}
+        self._segments.append(path)
+        _LOGGER.info("Recording segment: %s", path)
+
+    def _close_segment(self):
+        if self._output is None:
+            return
+        path = self._segments[-1]
+        try:
+            self._output.close()
+        # pylint: disable=broad-except
+        except Exception as error:
+            _LOGGER.error("Error closing segment %s: %s", path, error)
+        self._output = self._video_stream = self._audio_stream = None
+        if self._session and self._session.events:
+            self._session.events.emit("segment", path)
+
+    def _mux(self, buf: bytes, stream, keyframe: bool = False):
+        """Mux buffer into stream. Timestamps are ms since segment start."""
+        pts = int((time.monotonic() - self._segment_start) * 1000)
+        last_pts = self._last_pts.get(stream.index, -1)
+        if pts <= last_pts:
+            pts = last_pts + 1
+        self._last_pts[stream.index] = pts
+        mux_packet(self._output, stream, buf, pts, keyframe)
+
+    def handle_video_data(self, buf: bytes):
+        """Handle video data. Mux into current segment."""
+        keyframe = is_keyframe(buf, self._stream_codec)
+        with self._lock:
+            if keyframe and (
+                self._output is None
+                or time.monotonic() - self._segment_start >= self._segment_seconds
+            ):
+                self._open_segment(buf)
+            if self._output is None:
+                return
+            self._mux(buf, self._video_stream, keyframe)
+
+    def handle_audio_data(self, buf: bytes):
+        """Handle audio data. Mux into current segment."""
+        with self._lock:
+            if self._output is None or self._audio_stream is None:
+                return
+            self._mux(buf, self._audio_stream)
+
+    def handle_video(self, frame: av.VideoFrame):
+        """Not used. Video is not decoded."""
+
+    def handle_audio(self, frame: av.AudioFrame):
+        """Not used. Audio is not decoded."""
+
+    def close(self):
+        """Close Receiver. Finalizes the current segment."""
+        with self._lock:
+            self._close_segment()
+        super().close()
+
+    @property
+    def _stream_codec(self) -> str:
+        """Return codec of the host stream."""
+        if self._session.stream_type.name.startswith("HEVC"):
+            return "hevc"
+        return "h264"
+
+    @property
+    def segments(self) -> list[str]:
+        """Return paths of recorded segments."""
+        return list(self._segments)
@@ -0,0 +1,286 @@
+"""Instant replay of the last seconds of the compressed AV stream."""
+
+from __future__ import annotations
+from collections import deque
+import logging
+import os
+from struct import unpack_from
+import threading
+import time
+from typing import TYPE_CHECKING
+import warnings
+
+from . import AVReceiver
+from .bitstream import is_keyframe
+from .recorder import add_streams, mux_packet
+
+if TYPE_CHECKING:
+    from pyremoteplay.session import Session
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+REPLAY_SECONDS = 30.0
+# Default bitrate of the host in kbps by resolution, used if quality is default.
+DEFAULT_BITRATES = {
+    "RESOLUTION_360P": 2000,
+    "RESOLUTION_540P": 6000,
+    "RESOLUTION_720P": 10000,
+    "RESOLUTION_1080P": 15000,
+}
+# Headroom over the nominal bitrate for keyframes and audio.
+BITRATE_HEADROOM = 1.25
+
+
+def replay_bytes(session: Session, seconds: float) -> int:
+    """Return bytes needed to buffer seconds of the session's stream."""
+    kbps = int(getattr(session, "quality", 0) or 0)
+    if kbps <= 0:
+        kbps = DEFAULT_BITRATES.get(session.resolution.name, 10000)
+    return int(seconds * kbps * 1000 / 8 * BITRATE_HEADROOM)
+
+
+class ReplayBuffer:
+    """Ring buffer of the last seconds of compressed video and audio packets.
+
+    Packets are kept as received, grouped by GOP. The oldest GOP is dropped
+    whole, so the buffer always starts at a keyframe. Nothing is decoded
+    until a replay is requested, so the cost is the size of the compressed
+    stream: about 4 MB for 30 seconds at 360p, 47 MB at 720p.
+
+    The current GOP is never dropped, so a replay can always be decoded.
+    Memory is bounded by one GOP plus the window: older GOPs are dropped to
+    stay within `seconds` and `max_bytes`, but the current GOP grows until
+    the next keyframe. Remote Play hosts rarely send keyframes and there is
+    no way to request one, so on a static GOP the buffer holds everything
+    since the last keyframe, and `dump` writes it all.
+
+    The buffer receives packets as a packet tap of the session. It works
+    while the session's receiver is detached.
+
+    Usage:
+    `replay = ReplayBuffer(); replay.attach(session); ...; replay.dump("clip.mp4")`
+
+    :param seconds: Seconds of stream to keep. More is kept up to a full GOP
+    :param max_bytes: Maximum bytes of packets to keep. If 0, sized from
+        the bitrate of the session when attached
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, seconds: float = REPLAY_SECONDS, max_bytes: int = 0):
+        self._seconds = seconds
+        self._max_bytes = max_bytes
+        self._size_from_session = not max_bytes
+        self._session: Session = None
+        self._lock = threading.Lock()
+        self._gops: deque[list[tuple[str, float, bytes]]] = deque()
+        self._gop_bytes: deque[int] = deque()
+        self._bytes = 0
+        self._codec = ""
+        self._resolution = None
+        self._fps = 0
+        self._audio_header = b""
+        self._stats = {"packets": 0, "dropped_gops": 0, "long_gops": 0, "dumps": 0}
+        self._long_gop = False
+
+    def attach(self, session: Session):
+        """Start buffering packets of session."""
+        self.detach()
+        self._session = session
+        self._resolution = session.resolution
+        self._fps = session.fps
+        if self._size_from_session:
+            self._max_bytes = replay_bytes(session, self._seconds)
+            _LOGGER.debug("Replay buffer size: %s bytes", self._max_bytes)
+        session.add_packet_tap(self)
+
+    def detach(self):
+        """Stop buffering. Buffered packets are kept."""
+        if self._session is not None:
+            self._session.remove_packet_tap(self)
+        self._session = None
+
+    def clear(self):
+        """Remove buffered packets."""
+        with self._lock:
+            self._gops.clear()
+            self._gop_bytes.clear()
+            self._bytes = 0
+
+    def __call__(self, kind: str, buf: bytes, arrival: float):
+        """Buffer packet. Called by the session's packet tap."""
+        if kind == "audio_header":
+            self._audio_header = bytes(buf)
+            return
+        with self._lock:
+            if kind == "video":
+                if not self._codec:
+                    self._codec = self._stream_codec()
+                if is_keyframe(buf, self._codec):
+                    self._gops.append([])
+                    self._gop_bytes.append(0)
+                    self._long_gop = False
+            if not self._gops:
+                # Nothing is kept before the first keyframe.
+                return
+            self._gops[-1].append((kind, arrival, bytes(buf)))
+            self._gop_bytes[-1] += len(buf)
+            self._bytes += len(buf)
+            self._stats["packets"] += 1
+            self._trim(arrival)
+
+    def _trim(self, now: float):
+        """Drop oldest GOPs not needed for the window or over the byte limit.
+
+        The current GOP is always kept, even if it alone is over the limits.
+        """
+        while len(self._gops) > 1 and (
+            self._gops[1][0][1] <= now - self._seconds
+            or self._bytes > self._max_bytes
+        ):
+            self._gops.popleft()
+            self._bytes -= self._gop_bytes.popleft()
+            self._stats["dropped_gops"] += 1
+        if not self._long_gop and self._gop_bytes[-1] > self._max_bytes:
+            self._long_gop = True
+            self._stats["long_gops"] += 1
+            _LOGGER.debug(
+                "Replay GOP is over %s bytes. Kept until next keyframe",
+                self._max_bytes,
+            )
+
+    def _stream_codec(self) -> str:
+        """Return codec of the host stream."""
+        if self._session and self._session.stream_type.name.startswith("HEVC"):
+            return "hevc"
+        return "h264"
+
+    def packets(self, start: float = 0.0) -> list[tuple[str, float, bytes]]:
+        """Return buffered packets as (kind, arrival, buffer).
+
+        :param start: Monotonic time. Packets start at the last keyframe at
+            or before start. All packets are returned if 0
+        """
+        with self._lock:
+            first = 0
+            for index, gop in enumerate(self._gops):
+                if gop[0][1] > start:
+                    break
+                first = index
+            packets = []
+            for index in range(first, len(self._gops)):
+                packets.extend(self._gops[index])
+        return packets
+
+    def dump(self, path: str, seconds: float = 0.0, container: str = "mp4") -> str:
+        """Write buffered stream to file and return path. Nothing is decoded.
+
+        Blocks while writing. Run in an executor from the event loop.
+
+        :param path: Path of file
+        :param seconds: Seconds before now to write, from the keyframe before.
+            All buffered packets are written if 0
+        :param container: Container format, i.e. `mp4` or `matroska`
+        """
+        start = time.monotonic() - seconds if seconds else 0.0
+        packets = self.packets(start)
+        if not packets:
+            raise ValueError("Replay buffer is empty")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        output = av.open(path, "w", format=container)
+        try:
+            streams = self._add_streams(output, packets)
+            begin = packets[0][1]
+            last_pts = {}
+            for kind, arrival, buf in packets:
+                stream = streams.get(kind)
+                if stream is None:
+                    continue
+                pts = max(int((arrival - begin) * 1000), last_pts.get(kind, -1) + 1)
+                last_pts[kind] = pts
+                keyframe = kind == "video" and is_keyframe(buf, self._codec)
+                mux_packet(output, stream, buf, pts, keyframe)
+        finally:
+            output.close()
+        self._stats["dumps"] += 1
+        _LOGGER.info(
+            "Replay written: %s, %.1f s", path, packets[-1][1] - packets[0][1]
+        )
+        return path
+
+    def _add_streams(self, output, packets: list) -> dict:
+        """Add video and audio streams to output container."""
+        if self._resolution is None:
+            raise ValueError("Replay buffer was never attached to a session")
+        audio_config = None
+        header = self._audio_header
+        if header and any(kind == "audio" for kind, _, _ in packets):
+            audio_config = {
+                "channels": header[0],
+                "rate": unpack_from("!I", header, 2)[0],
+            }
+        video_stream, audio_stream = add_streams(
+            output,
+            self._codec,
+            self._resolution,
+            self._fps,
+            packets[0][2],
+            audio_config,
+        )
+        return {"video": video_stream, "audio": audio_stream}
+
+    def frame_at(self, timestamp: float, video_format: str = None) -> av.VideoFrame:
+        """Return video frame shown at a past time. Return None if not buffered.
+
+        Decodes from the keyframe before timestamp with a new decoder.
+
+        :param timestamp: Monotonic time, as `arrival` of a
+            :class:`FrameTiming <pyremoteplay.receiver.latency.FrameTiming>`
+        :param video_format: Format to convert frame to. Decoder format if None
+        """
+        packets = self.packets(timestamp)
+        if not packets or packets[0][1] > timestamp:
+            return None
+        decoder = AVReceiver.video_codec(self._codec)
+        decoder.open()
+        frame = None
+        try:
+            for kind, arrival, buf in packets:
+                if arrival > timestamp:
+                    break
+                if kind != "video":
+                    continue
+                decoded = AVReceiver.decode_video(buf, decoder)
+                if decoded is not None:
+                    frame = decoded
+        finally:
+            decoder.close()
+        if frame is not None and video_format:
+            frame = AVReceiver.reformat_video(frame, video_format)
+        return frame
+
+    @property
+    def duration(self) -> float:
+        """Return seconds of stream buffered."""
+        with self._lock:
+            if not self._gops:
+                return 0.0
+            return self._gops[-1][-1][1] - self._gops[0][0][1]
+
+    @property
+    def nbytes(self) -> int:
+        """Return bytes of packets buffered."""
+        return self._bytes
+
+    @property
+    def stats(self) -> dict:
+        """Return packets, GOPs dropped and over max_bytes, dumps, bytes and GOPs."""
+        with self._lock:
+            return dict(self._stats, bytes=self._bytes, gops=len(self._gops))
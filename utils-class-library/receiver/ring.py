@@ -0,0 +1,311 @@
+"""Thread-safe frame ring with per-consumer cursors."""
+
+from __future__ import annotations
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable
+
+
+class RingClosed(Exception):
+    """Raised when reading from a closed ring."""
+
+
+class FrameRing:
+    """Fixed size ring written by a single producer thread.
+
+    Consumers read through their own :class:`RingCursor`, so reading never
+    removes items for other consumers and never copies the ring.
+    When the ring is full the oldest item is overwritten. Cursors that did
+    not read the overwritten item count it as dropped.
+
+    :param capacity: Maximum number of items. Will be at least 1.
+    :param block_timeout: Max seconds the producer waits for cursors with
+        backpressure to read before overwriting an item they have not read.
+    :param on_read: Called with the meta of an item each time a cursor reads it.
+        Called in the consumer's thread. Not called if meta is None.
+    :param sizeof: Returns size of an item in bytes. Required for `max_bytes`.
+    :param max_bytes: Maximum bytes of items. The oldest items are removed
+        to make room. The latest item is always kept. If <= 0, not limited.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        block_timeout: float = 0.1,
+        on_read: Callable[[Any], None] = None,
+        sizeof: Callable[[Any], int] = None,
+        max_bytes: int = 0,
+    ):
+        self._capacity = max(1, capacity)
+        self._block_timeout = block_timeout
+        self._on_read = on_read
+        self._sizeof = sizeof
+        self._max_bytes = max_bytes if sizeof else 0
+        self._items: list[Any] = [None] * self._capacity
+        self._metas: list[Any] = [None] * self._capacity
+        self._sizes: list[int] = [0] * self._capacity
+        self._bytes = 0
+        self._head = 0  # Sequence of next item to write
+        self._tail = 0  # Sequence of oldest item
+        self._closed = False
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._blocking: weakref.WeakSet[RingCursor] = weakref.WeakSet()
+        self._overwritten = 0
+
+    def __len__(self) -> int:
+        return self._head - self._tail
+
+    def push(self, item: Any, meta: Any = None):
+        """Add item to the ring. Called by the producer.
+
+        Pushing to a closed ring reopens it.
+
+        :param item: Item to add
+        :param meta: Metadata of item, i.e. timing. Available to cursors as `meta`
+        """
+        size = self._sizeof(item) if self._sizeof else 0
+        with self._lock:
+            self._closed = False
+            if self._head - self._tail >= self._capacity:
+                self._wait_for_space()
+                self._remove_oldest()
+                self._overwritten += 1
+            if self._max_bytes > 0:
+                while self._head > self._tail and self._bytes + size > self._max_bytes:
+                    self._wait_for_space()
+                    self._remove_oldest()
+                    self._overwritten += 1
+            self._items[self._head % self._capacity] = item
+            self._metas[self._head % self._capacity] = meta
+            self._sizes[self._head % self._capacity] = size
+            self._bytes += size
+            self._head += 1
+            waiters = self._waiters
+            self._waiters = []
+        self._wake(waiters)
+
+    def _remove_oldest(self):
+        index = self._tail % self._capacity
+        self._items[index] = None
+        self._metas[index] = None
+        self._bytes -= self._sizes[index]
+        self._sizes[index] = 0
+        self._tail += 1
+
+    def trim(self, nbytes: int) -> int:
+        """Remove oldest items until nbytes are freed. Return bytes freed.
+
+        The latest item is kept. Cursors with backpressure are not waited for.
+        """
+        freed = 0
+        with self._lock:
+            while freed < nbytes and self._head - self._tail > 1:
+                freed += self._sizes[self._tail % self._capacity]
+                self._remove_oldest()
+                self._overwritten += 1
+            self._space.notify_all()
+        return freed
+
+    def _wait_for_space(self):
+        """Wait until cursors with backpressure read the oldest item."""
+        if not self._blocking:
+            return
+        self._space.wait_for(
+            lambda: self._closed
+            or all(cursor.position > self._tail for cursor in self._blocking),
+            timeout=self._block_timeout,
+        )
+
+    @staticmethod
+    def _wake(waiters: list):
+        for loop, future in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_set_future, future)
+
+    def clear(self):
+        """Remove all items."""
+        with self._lock:
+            self._items = [None] * self._capacity
+            self._metas = [None] * self._capacity
+            self._sizes = [0] * self._capacity
+            self._bytes = 0
+            self._tail = self._head
+            self._space.notify_all()
+
+    def close(self):
+        """Close ring. Consumers waiting for items stop iterating.
+
+        Items already in the ring can still be read.
+        """
+        with self._lock:
+            self._closed = True
+            waiters = self._waiters
+            self._waiters = []
+            self._space.notify_all()
+        self._wake(waiters)
+
+    def oldest(self) -> Any:
+        """Return oldest item or None."""
+        with self._lock:
+            if self._head == self._tail:
+                return None
+            return self._items[self._tail % self._capacity]
+
+    def latest(self) -> Any:
+        """Return latest item or None."""
+        with self._lock:
+            if self._head == self._tail:
+                return None
+            return self._items[(self._head - 1) % self._capacity]
+
+    def latest_entry(self) -> tuple[Any, Any]:
+        """Return latest item and its meta or None, None."""
+        with self._lock:
+            if self._head == self._tail:
+                return None, None
+            index = (self._head - 1) % self._capacity
+            return self._items[index], self._metas[index]
+
+    def snapshot(self) -> list:
+        """Return copy of items from oldest to latest."""
+        with self._lock:
+            return [
+                self._items[seq % self._capacity]
+                for seq in range(self._tail, self._head)
+            ]
+
+    def cursor(self, latest_only: bool = False, backpressure: bool = False):
+        """Return new cursor positioned after the latest item.
+
+        :param latest_only: If True, reading skips to the latest item.
+            Skipped items are counted as dropped.
+        :param backpressure: If True, the producer waits for this cursor
+            before overwriting items it has not read.
+        """
+        with self._lock:
+            cursor = RingCursor(self, self._head, latest_only)
+            if backpressure:
+                self._blocking.add(cursor)
+        return cursor
+
+    def _read(self, cursor: RingCursor) -> tuple[bool, Any]:
+        """Return True and next item for cursor if available.
+
+        Sets meta of cursor to the meta of the item.
+        """
+        with self._lock:
+            if cursor.position < self._tail:
+                cursor.dropped += self._tail - cursor.position
+                cursor.position = self._tail
+            if cursor.position >= self._head:
+                if self._closed:
+                    raise RingClosed
+                return False, None
+            if cursor.latest_only and cursor.position < self._head - 1:
+                cursor.dropped += self._head - 1 - cursor.position
+                cursor.position = self._head - 1
+            item = self._items[cursor.position % self._capacity]
+            meta = self._metas[cursor.position % self._capacity]
+            cursor.meta = meta
+            cursor.position += 1
+            cursor.delivered += 1
+            if cursor in self._blocking:
+                self._space.notify_all()
+        if meta is not None and self._on_read is not None:
+            self._on_read(meta)
+        return True, item
+
+    def _add_waiter(self, cursor: RingCursor) -> asyncio.Future:
+        """Return future which is done when an item is available for cursor."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if cursor.position < self._head or self._closed:
+                future.set_result(None)
+            else:
+                self._waiters.append((loop, future))
+        return future
+
+    def _remove_cursor(self, cursor: RingCursor):
+        with self._lock:
+            self._blocking.discard(cursor)
+            self._space.notify_all()
+
+    @property
+    def capacity(self) -> int:
+        """Return capacity."""
+        return self._capacity
+
+    @property
+    def overwritten(self) -> int:
+        """Return number of items overwritten or trimmed since creation."""
+        return self._overwritten
+
+    @property
+    def nbytes(self) -> int:
+        """Return bytes of items in ring. 0 if sizeof is not set."""
+        return self._bytes
+
+
+def _set_future(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class RingCursor:
+    """Read position of one consumer in a :class:`FrameRing`.
+
+    Iterate with `async for` to wait for new items without polling.
+    `meta` is the meta of the item read last.
+    """
+
+    def __init__(self, ring: FrameRing, position: int, latest_only: bool):
+        self._ring = ring
+        self.position = position
+        self.latest_only = latest_only
+        self.meta = None
+        self.dropped = 0
+        self.delivered = 0
+
+    def read(self) -> Any:
+        """Return next item without waiting or None if there is none."""
+        try:
+            _, item = self._ring._read(self)  # pylint: disable=protected-access
+        except RingClosed:
+            return None
+        return item
+
+    async def next(self, timeout: float = None) -> Any:
+        """Return next item. Wait for it if not available.
+
+        :param timeout: Timeout in seconds. Raises `asyncio.TimeoutError`.
+        :raises RingClosed: If the ring is closed.
+        """
+        # pylint: disable=protected-access
+        while True:
+            available, item = self._ring._read(self)
+            if available:
+                return item
+            await asyncio.wait_for(self._ring._add_waiter(self), timeout)
+
+    def close(self):
+        """Stop reading. Releases backpressure of this cursor."""
+        self._ring._remove_cursor(self)  # pylint: disable=protected-access
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self.next()
+        except RingClosed as error:
+            self.close()
+            raise StopAsyncIteration from error
+
+    @property
+    def stats(self) -> dict:
+        """Return delivered and dropped counts."""
+        return {"delivered": self.delivered, "dropped": self.dropped}
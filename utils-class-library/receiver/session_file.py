@@ -0,0 +1,392 @@
+"""Record a session's AV packets and controller feedback and replay them offline."""
+
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import struct
+import threading
+import time
+from typing import Iterator, NamedTuple, TYPE_CHECKING
+
+from pyee import EventEmitter
+
+from pyremoteplay.const import FPS, Resolution, StreamType
+from .bitstream import is_keyframe
+
+if TYPE_CHECKING:
+    from pyremoteplay.controller import Controller, Feedback
+    from pyremoteplay.session import Session
+    from . import AVReceiver
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"RPSF"
+VERSION = 1
+# Magic, version, length of JSON metadata.
+FILE_HEADER = struct.Struct("<4sHI")
+# Kind, seconds since start of recording, length of payload.
+RECORD_HEADER = struct.Struct("<BdI")
+# Sequence, event (1) or state (0), is active, sticks. Followed by button name.
+FEEDBACK = struct.Struct("<I??4f")
+
+VIDEO = 1
+AUDIO = 2
+AUDIO_HEADER = 3
+FEEDBACK_KIND = 4
+
+PACKET_KINDS = {"video": VIDEO, "audio": AUDIO, "audio_header": AUDIO_HEADER}
+
+WRITE_BUFFER = 1024 * 1024
+
+
+class Record(NamedTuple):
+    """Record of a session file. Time is seconds since start of recording."""
+
+    kind: int
+    time: float
+    payload: bytes
+
+
+def pack_feedback(feedback: Feedback) -> bytes:
+    """Return feedback packed for a session file."""
+    return (
+        FEEDBACK.pack(
+            feedback.sequence,
+            feedback.kind == "event",
+            feedback.is_active,
+            *feedback.sticks,
+        )
+        + feedback.button.encode()
+    )
+
+
+def unpack_feedback(payload: bytes, timestamp: float) -> Feedback:
+    """Return feedback from payload of a session file record."""
+    # pylint: disable=import-outside-toplevel
+    from pyremoteplay.controller import Feedback
+
+    sequence, event, is_active, *sticks = FEEDBACK.unpack_from(payload)
+    return Feedback(
+        "event" if event else "state",
+        sequence,
+        timestamp,
+        payload[FEEDBACK.size :].decode(),
+        is_active,
+        tuple(sticks),
+    )
+
+
+def _stream_codec(stream_type: StreamType) -> str:
+    return "hevc" if stream_type.name.startswith("HEVC") else "h264"
+
+
+class SessionRecorder:
+    """Record compressed AV packets and controller feedback of a session to file.
+
+    Packets are recorded as received through a packet tap of the session, so
+    nothing is decoded. The file starts with the stream metadata as JSON,
+    followed by records of kind, time and payload. Video is recorded from
+    the first keyframe, so the recording can be decoded from its start.
+
+    Usage: `recorder = SessionRecorder("session.rpsf"); recorder.attach(session)`
+
+    :param path: Path of file. Overwritten if it exists
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        # pylint: disable=consider-using-with
+        self._file = open(path, "wb", buffering=WRITE_BUFFER)
+        self._lock = threading.Lock()
+        self._session: Session = None
+        self._controller: Controller = None
+        self._start = 0.0
+        self._video_started = False
+        self._stats = {"packets": 0, "feedback": 0, "bytes": 0, "skipped": 0}
+
+    def attach(self, session: Session, controller: Controller = None):
+        """Start recording session. Feedback of controller is recorded if given."""
+        self.detach()
+        with self._lock:
+            self._session = session
+            self._video_started = False
+        session.add_packet_tap(self)
+        if controller is not None:
+            self._controller = controller
+            controller.add_feedback_callback(self.add_feedback)
+
+    def detach(self):
+        """Stop recording. The file is kept open."""
+        if self._session is not None:
+            self._session.remove_packet_tap(self)
+        if self._controller is not None:
+            self._controller.remove_feedback_callback(self.add_feedback)
+        self._session = self._controller = None
+
+    def _metadata(self) -> dict:
+        session = self._session
+        return {
+            "version": VERSION,
+            "created": time.time(),
+            "codec": _stream_codec(session.stream_type),
+            "stream_type": session.stream_type.name,
+            "resolution": session.resolution.name,
+            "fps": int(session.fps),
+            "mac_address": session.mac_address,
+        }
+
+    def _write(self, kind: int, timestamp: float, payload: bytes):
+        """Write record. Writes the file header first. With lock acquired."""
+        if self._file is None:
+            return
+        if not self._start:
+            if self._session is None:
+                return
+            meta = json.dumps(self._metadata()).encode()
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION, len(meta)) + meta)
+            self._start = timestamp
+        self._file.write(
+            RECORD_HEADER.pack(kind, timestamp - self._start, len(payload))
+        )
+        self._file.write(payload)
+        self._stats["bytes"] += RECORD_HEADER.size + len(payload)
+
+    def __call__(self, kind: str, buf: bytes, arrival: float):
+        """Record packet. Called by the session's packet tap."""
+        with self._lock:
+            if kind == "video" and not self._video_started:
+                if self._session is None or not is_keyframe(
+                    buf, _stream_codec(self._session.stream_type)
+                ):
+                    self._stats["skipped"] += 1
+                    return
+                self._video_started = True
+            self._write(PACKET_KINDS[kind], arrival, buf)
+            self._stats["packets"] += 1
+
+    def add_feedback(self, feedback: Feedback):
+        """Record controller feedback."""
+        with self._lock:
+            self._write(FEEDBACK_KIND, feedback.timestamp, pack_feedback(feedback))
+            self._stats["feedback"] += 1
+
+    def close(self):
+        """Stop recording and close file."""
+        self.detach()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        _LOGGER.info("Session recorded: %s, %s", self._path, self._stats)
+
+    @property
+    def path(self) -> str:
+        """Return path of file."""
+        return self._path
+
+    @property
+    def stats(self) -> dict:
+        """Return packets, feedback and bytes recorded and video packets skipped."""
+        return dict(self._stats)
+
+
+class SessionReader:
+    """Read a session file written by :class:`SessionRecorder`.
+
+    :param path: Path of file
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        with open(path, "rb") as file:
+            magic, version, length = FILE_HEADER.unpack(file.read(FILE_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"Not a session file: {path}")
+            if version > VERSION:
+                raise ValueError(f"Unsupported session file version: {version}")
+            self._meta = json.loads(file.read(length))
+            self._offset = file.tell()
+
+    def __iter__(self) -> Iterator[Record]:
+        with open(self._path, "rb", buffering=WRITE_BUFFER) as file:
+            file.seek(self._offset)
+            while True:
+                header = file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                kind, timestamp, length = RECORD_HEADER.unpack(header)
+                payload = file.read(length)
+                if len(payload) < length:
+                    _LOGGER.warning("Session file truncated: %s", self._path)
+                    return
+                yield Record(kind, timestamp, payload)
+
+    def feedback(self) -> list[Feedback]:
+        """Return controller feedback. Timestamps are seconds since start."""
+        return [
+            unpack_feedback(record.payload, record.time)
+            for record in self
+            if record.kind == FEEDBACK_KIND
+        ]
+
+    @property
+    def meta(self) -> dict:
+        """Return stream metadata."""
+        return dict(self._meta)
+
+
+class ReplaySession:
+    """Stand-in for :class:`Session <pyremoteplay.session.Session>` when replaying.
+
+    Has the attributes receivers use. Emits `feedback` events with
+    :class:`Feedback <pyremoteplay.controller.Feedback>` when replayed.
+
+    :param meta: Metadata of session file
+    :param codec: Video codec to decode with. Codec of the recording if None
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, meta: dict, codec: str = None):
+        self.codec = codec or meta["codec"]
+        self.decode_profile = "full"
+        self.decoder_config = {}
+        self.resolution = Resolution[meta["resolution"]]
+        self.stream_type = StreamType[meta["stream_type"]]
+        self.fps = FPS(meta["fps"])
+        # Empty, so stream parameters of consoles are not touched by replays.
+        self.mac_address = ""
+        self.host = "replay"
+        self.error = ""
+        self.events = EventEmitter()
+        self._taps = []
+        self._stopped = False
+
+    def add_packet_tap(self, tap):
+        """Add packet tap. Called with each replayed packet."""
+        if tap not in self._taps:
+            self._taps.append(tap)
+
+    def remove_packet_tap(self, tap):
+        """Remove packet tap."""
+        if tap in self._taps:
+            self._taps.remove(tap)
+
+    def stop(self):
+        """Stop replay."""
+        self._stopped = True
+
+    @property
+    def is_ready(self) -> bool:
+        """Return True if replaying."""
+        return not self._stopped
+
+    @property
+    def is_stopped(self) -> bool:
+        """Return True if stopped."""
+        return self._stopped
+
+
+class SessionReplayer:
+    """Feed a session file into an :class:`AVReceiver`.
+
+    Packets are passed to the receiver as a live session would, with
+    arrival times of the replay. The receiver is not closed.
+
+    :param path: Path of session file
+    :param receiver: Receiver to feed
+    :param speed: Replay speed. 1.0 is real time, 2.0 twice as fast.
+        0 replays as fast as possible
+    :param codec: Video codec to decode with. Codec of the recording if None
+    """
+
+    def __init__(
+        self, path: str, receiver: AVReceiver, speed: float = 1.0, codec: str = None
+    ):
+        if speed < 0:
+            raise ValueError("Speed must be 0 or greater")
+        self._reader = SessionReader(path)
+        self._receiver = receiver
+        self._speed = speed
+        self._session = ReplaySession(self._reader.meta, codec)
+        self._stats = {}
+
+    def run(self) -> dict:
+        """Replay file. Blocks until done or the session is stopped.
+
+        Return stats: records, media seconds, wall seconds, speed achieved,
+        CPU seconds and records which were replayed late.
+        """
+        # pylint: disable=protected-access
+        session = self._session
+        receiver = self._receiver
+        receiver._set_session(session)
+        kinds = {value: key for key, value in PACKET_KINDS.items()}
+        records = late = 0
+        media = 0.0
+        video_started = False
+        cpu_start = time.process_time()
+        start = time.monotonic()
+        for record in self._reader:
+            if session.is_stopped:
+                break
+            if self._speed:
+                delay = start + record.time / self._speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -0.1:
+                    late += 1
+            now = time.monotonic()
+            media = record.time
+            records += 1
+            if record.kind == FEEDBACK_KIND:
+                session.events.emit(
+                    "feedback", unpack_feedback(record.payload, record.time)
+                )
+                continue
+            for tap in list(session._taps):
+                tap(kinds[record.kind], record.payload, now)
+            if record.kind == VIDEO:
+                if not video_started:
+                    receiver._get_video_codec()
+                    video_started = True
+                receiver._set_packet_arrival(now)
+                receiver.handle_video_data(record.payload)
+            elif record.kind == AUDIO:
+                receiver.handle_audio_data(record.payload)
+            elif record.kind == AUDIO_HEADER:
+                receiver._get_audio_codec(record.payload)
+        elapsed = time.monotonic() - start
+        self._stats = {
+            "records": records,
+            "media": media,
+            "elapsed": elapsed,
+            "speed": media / elapsed if elapsed else 0.0,
+            "cpu": time.process_time() - cpu_start,
+            "late": late,
+        }
+        return dict(self._stats)
+
+    async def async_run(self) -> dict:
+        """Replay file in an executor. Return stats."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.run)
+
+    def stop(self):
+        """Stop replay."""
+        self._session.stop()
+
+    @property
+    def session(self) -> ReplaySession:
+        """Return stand-in session."""
+        return self._session
+
+    @property
+    def meta(self) -> dict:
+        """Return stream metadata of file."""
+        return self._reader.meta
+
+    @property
+    def stats(self) -> dict:
+        """Return stats of last run."""
+        return dict(self._stats)
@@ -0,0 +1,79 @@
+"""Encode decoded video frames to JPEG without converting to RGB."""
+
+from __future__ import annotations
+from fractions import Fraction
+import logging
+import threading
+import warnings
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+# JPEG is full range. Other formats are converted to this, never to RGB.
+JPEG_FORMAT = "yuvj420p"
+PLANAR_420 = ("yuv420p", "yuvj420p")
+
+_ENCODERS = threading.local()
+
+
+def _qscale(quality: int) -> int:
+    """Return MJPEG qscale (2 best, 31 worst) for JPEG quality (1 - 100)."""
+    quality = min(100, max(1, quality))
+    return round(2 + (100 - quality) * 29 / 99)
+
+
+def _get_encoder(
+    width: int, height: int, pix_fmt: str, quality: int
+) -> av.CodecContext:
+    """Return MJPEG encoder of this thread for size, format and quality."""
+    key = (width, height, pix_fmt, quality)
+    encoders = getattr(_ENCODERS, "encoders", None)
+    if encoders is None:
+        encoders = _ENCODERS.encoders = {}
+    encoder = encoders.get(key)
+    if encoder is None:
+        encoder = av.codec.Codec("mjpeg", "w").create()
+        encoder.width = width
+        encoder.height = height
+        encoder.pix_fmt = pix_fmt
+        encoder.time_base = Fraction(1, 1)
+        qscale = str(_qscale(quality))
+        options = {"qmin": qscale, "qmax": qscale}
+        if pix_fmt != JPEG_FORMAT:
+            # Limited range 4:2:0 is non standard JPEG, but widely decoded.
+            options["strict"] = "unofficial"
+        encoder.options = options
+        encoder.open()
+        encoders[key] = encoder
+        _LOGGER.debug("Opened JPEG encoder: %sx%s %s", width, height, pix_fmt)
+    return encoder
+
+
+def encode_jpeg(
+    frame: av.VideoFrame, quality: int = 90, full_range: bool = True
+) -> bytes:
+    """Return frame encoded as JPEG.
+
+    4:2:0 frames from the decoder are encoded from their planes with no
+    RGB conversion. Encoders are reused per thread.
+
+    :param frame: Video frame. Should be in the decoder's format
+    :param quality: JPEG quality between 1 and 100
+    :param full_range: Expand limited range YUV to full range, so colors
+        are exact. Only scales the planes. If False, limited range planes
+        are encoded as is, which is faster but lowers contrast in some viewers.
+    """
+    if frame.format.name not in PLANAR_420 or full_range:
+        if frame.format.name != JPEG_FORMAT:
+            frame = frame.reformat(format=JPEG_FORMAT)
+            # Own copy. The decoded frame may be shared with other readers.
+            frame.pts = None
+    encoder = _get_encoder(frame.width, frame.height, frame.format.name, quality)
+    packets = encoder.encode(frame)
+    if not packets:
+        raise ValueError("JPEG encoder returned no data")
+    return bytes(packets[0])
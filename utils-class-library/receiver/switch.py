@@ -0,0 +1,256 @@
+"""Receiver which forwards stream data to a receiver that can be swapped."""
+
+from __future__ import annotations
+import logging
+import threading
+import time
+from typing import Callable, TYPE_CHECKING
+import warnings
+
+from . import AVReceiver
+from .bitstream import is_keyframe
+
+if TYPE_CHECKING:
+    from pyremoteplay.session import Session
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+# Seconds to wait for a keyframe after attaching before forwarding anyway.
+RESYNC_TIMEOUT = 2.0
+
+
+class ReceiverSwitch(AVReceiver):
+    """Receiver which forwards stream data to the attached receiver.
+
+    Receivers can be attached, swapped and detached while the stream runs.
+    While detached, data is dropped before decoding. After attaching, video
+    data is dropped until the next keyframe, so decoding starts on a clean
+    picture. If no keyframe arrives within `resync_timeout` seconds,
+    data is forwarded anyway and the decoder recovers on its own.
+
+    The arrival time of video data is passed to the attached receiver with
+    the data, so its latency starts when the packet arrived at the switch.
+
+    Data is forwarded outside the switch's lock, so attaching and detaching
+    never wait for a decode. Use :meth:`close_receiver` to close a receiver
+    which may still be decoding.
+
+    Taps receive every compressed packet, attached or not, before decoding.
+    A tap is called as `tap(kind, buf, arrival)` where kind is `video`, `audio`
+    or `audio_header` and arrival is the monotonic time the packet arrived.
+    Taps are called in the thread of the AV handler and must return quickly.
+
+    Used internally by :class:`Session <pyremoteplay.session.Session>`.
+
+    :param session: Session which owns the switch
+    :param resync_timeout: Seconds to wait for a keyframe after attaching
+    """
+
+    # pylint: disable=protected-access
+
+    def __init__(self, session: Session, resync_timeout: float = RESYNC_TIMEOUT):
+        super().__init__()
+        self._session = session
+        self._resync_timeout = resync_timeout
+        self._receiver: AVReceiver = None
+        self._lock = threading.Lock()
+        self._video_started = False
+        self._audio_header = b""
+        self._resync_since = 0.0
+        self._arrival = 0.0
+        self._forwarding: list[AVReceiver] = []
+        self._closing: list[AVReceiver] = []
+        self._taps: list[Callable[[str, bytes, float], None]] = []
+        self._stats = {"forwarded": 0, "dropped": 0, "resyncs": 0}
+
+    def add_tap(self, tap: Callable[[str, bytes, float], None]):
+        """Add packet tap.
+
+        If the audio header was received, it is passed to the tap first.
+
+        :param tap: Called with kind, buffer and arrival of each packet
+        """
+        with self._lock:
+            if tap in self._taps:
+                return
+            self._taps = self._taps + [tap]
+            header = self._audio_header
+        if header:
+            try:
+                tap("audio_header", header, time.monotonic())
+            # pylint: disable=broad-except
+            except Exception as error:
+                _LOGGER.error("Error in packet tap: %s", error)
+
+    def remove_tap(self, tap: Callable[[str, bytes, float], None]):
+        """Remove packet tap."""
+        with self._lock:
+            self._taps = [_tap for _tap in self._taps if _tap != tap]
+
+    def _tap(self, kind: str, buf: bytes, arrival: float):
+        """Pass packet to taps. Errors are logged and do not stop the stream."""
+        for tap in self._taps:
+            try:
+                tap(kind, buf, arrival)
+            # pylint: disable=broad-except
+            except Exception as error:
+                _LOGGER.error("Error in packet tap: %s", error)
+
+    def attach(self, receiver: AVReceiver):
+        """Attach receiver. Detaches the current receiver.
+
+        Does not wait for data being forwarded to the current receiver.
+        """
+        with self._lock:
+            self._receiver = receiver
+            receiver._set_session(self._session)
+            if self._audio_header:
+                receiver._get_audio_codec(self._audio_header)
+            if self._video_started:
+                if receiver.video_decoder is None:
+                    receiver._get_video_codec()
+                self._resync_since = time.monotonic()
+                self._stats["resyncs"] += 1
+                _LOGGER.info("Receiver attached. Waiting for keyframe")
+
+    def detach(self) -> AVReceiver:
+        """Detach and return the current receiver. The receiver is not closed.
+
+        Does not wait for data being forwarded to the receiver.
+        """
+        with self._lock:
+            receiver = self._receiver
+            self._receiver = None
+        if receiver is not None:
+            _LOGGER.info("Receiver detached")
+        return receiver
+
+    def close_receiver(self, receiver: AVReceiver):
+        """Close a detached receiver.
+
+        If data is being forwarded to it, it is closed when forwarding is
+        done, in the thread of the AV handler. Never waits.
+        """
+        with self._lock:
+            if receiver in self._forwarding:
+                if receiver not in self._closing:
+                    self._closing.append(receiver)
+                return
+        receiver.close()
+
+    def _forward(self, receiver: AVReceiver, func: Callable, *args):
+        """Call func of receiver outside the lock. Close receiver if pending."""
+        try:
+            func(*args)
+        finally:
+            with self._lock:
+                self._forwarding.remove(receiver)
+                close = receiver in self._closing and receiver not in self._forwarding
+                if close:
+                    self._closing.remove(receiver)
+            if close:
+                receiver.close()
+
+    def _get_video_codec(self):
+        """Get Video Codec of attached receiver."""
+        with self._lock:
+            self._video_started = True
+            if self._receiver is not None and self._receiver.video_decoder is None:
+                self._receiver._get_video_codec()
+
+    def _get_audio_codec(self, header: bytes):
+        """Parse Audio config. Get Audio codec of attached receiver."""
+        self._parse_audio_config(header)
+        self._tap("audio_header", header, time.monotonic())
+        with self._lock:
+            self._audio_header = header
+            if self._receiver is not None:
+                self._receiver._get_audio_codec(header)
+
+    def _set_packet_arrival(self, arrival: float):
+        """Set arrival of the next video data. Passed on when it is forwarded."""
+        self._arrival = arrival
+
+    def _resynced(self, buf: bytes) -> bool:
+        """Return True if video data should be forwarded after attaching."""
+        if is_keyframe(buf, self._session.codec):
+            _LOGGER.debug("Resynced at keyframe")
+            return True
+        if time.monotonic() - self._resync_since >= self._resync_timeout:
+            _LOGGER.warning("No keyframe after attaching receiver. Forwarding")
+            return True
+        return False
+
+    def handle_video_data(self, buf: bytes):
+        """Forward video data to attached receiver. Drop if detached.
+
+        The receiver and the resync decision are taken under the lock.
+        The data is decoded outside it.
+        """
+        arrival = self._arrival or time.monotonic()
+        self._arrival = 0.0
+        self._tap("video", buf, arrival)
+        with self._lock:
+            receiver = self._receiver
+            if receiver is None:
+                self._stats["dropped"] += 1
+                return
+            if self._resync_since:
+                if not self._resynced(buf):
+                    self._stats["dropped"] += 1
+                    return
+                self._resync_since = 0.0
+            self._stats["forwarded"] += 1
+            self._forwarding.append(receiver)
+        self._forward(receiver, self._forward_video, receiver, buf, arrival)
+
+    @staticmethod
+    def _forward_video(receiver: AVReceiver, buf: bytes, arrival: float):
+        receiver._set_packet_arrival(arrival)
+        receiver.handle_video_data(buf)
+
+    def handle_audio_data(self, buf: bytes):
+        """Forward audio data to attached receiver. Drop if detached."""
+        self._tap("audio", buf, time.monotonic())
+        with self._lock:
+            receiver = self._receiver
+            if receiver is None:
+                return
+            self._forwarding.append(receiver)
+        self._forward(receiver, receiver.handle_audio_data, buf)
+
+    def handle_video(self, frame: av.VideoFrame):
+        """Not used. Frames are handled by the attached receiver."""
+
+    def handle_audio(self, frame: av.AudioFrame):
+        """Not used. Frames are handled by the attached receiver."""
+
+    def close(self):
+        """Close Switch and attached receiver."""
+        with self._lock:
+            receiver = self._receiver
+            self._video_started = False
+            self._audio_header = b""
+            self._resync_since = 0.0
+        if receiver is not None:
+            self.close_receiver(receiver)
+
+    @property
+    def receiver(self) -> AVReceiver:
+        """Return attached receiver or None."""
+        return self._receiver
+
+    @property
+    def taps(self) -> list[Callable[[str, bytes, float], None]]:
+        """Return packet taps."""
+        return list(self._taps)
+
+    @property
+    def stats(self) -> dict:
+        """Return video packets forwarded and dropped and number of resyncs."""
+        return dict(self._stats)
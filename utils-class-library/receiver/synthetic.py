@@ -0,0 +1,106 @@
+"""Synthetic video clips for benchmarking decoders and receivers."""
+
+from __future__ import annotations
+from fractions import Fraction
+import logging
+import warnings
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+ENCODERS = {
+    "h264": ("libx264", "libopenh264", "h264"),
+    "hevc": ("libx265", "hevc"),
+}
+
+
+def frame_size(resolution) -> tuple[int, int]:
+    """Return width and height of 16:9 frames for `Resolution`."""
+    height = int(resolution.name.split("_")[-1].rstrip("P"))
+    return height * 16 // 9, height
+
+
+def _get_encoder(codec_name: str) -> av.CodecContext:
+    """Return first available encoder context for codec."""
+    stream_type = codec_name.split("_")[0].lower()
+    for encoder in ENCODERS.get(stream_type, (stream_type,)):
+        try:
+            return av.codec.Codec(encoder, "w").create()
+        except av.codec.codec.UnknownCodecError:
+            continue
+    raise ValueError(f"No encoder available for codec: {codec_name}")
+
+
+def _frame_planes(width: int, height: int, index: int):
+    """Return Y, U, V planes for frame at index.
+
+    A scrolling gradient with a moving box roughly resembles game content:
+    most of the picture moves a little and a small area moves a lot.
+    """
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    cols = np.arange(width, dtype=np.uint16)
+    rows = np.arange(height, dtype=np.uint16)[:, None]
+    luma = ((cols + rows + index * 2) % 220 + 16).astype(np.uint8)
+    size = max(16, height // 6)
+    left = (index * 8) % max(1, width - size)
+    top = (index * 4) % max(1, height - size)
+    luma[top : top + size, left : left + size] = 235
+    chroma_u = np.full((height // 2, width // 2), 128 + (index % 32), np.uint8)
+    chroma_v = np.full((height // 2, width // 2), 128 - (index % 32), np.uint8)
+    return np.concatenate(
+        [luma, chroma_u.reshape(-1, width), chroma_v.reshape(-1, width)]
+    )
+
+
+def synthetic_clip(
+    codec_name: str = "h264",
+    width: int = 1280,
+    height: int = 720,
+    fps: int = 30,
+    seconds: float = 2.0,
+    gop: int = 0,
+    hold: int = 1,
+) -> list[bytes]:
+    """Return encoded Annex-B packets of a synthetic clip.
+
+    Each item is the payload of one video frame, the same unit that
+    :meth:`AVReceiver.handle_video_data() <pyremoteplay.receiver.AVReceiver.handle_video_data>`
+    receives from a session.
+
+    :param codec_name: Video codec. One of `h264` or `hevc`
+    :param width: Width of frames
+    :param height: Height of frames
+    :param fps: Frames per second
+    :param seconds: Length of clip in seconds
+    :param gop: Frames between keyframes. If <= 0, one keyframe per second is used
+    :param hold: Frames each picture is shown for. Values > 1 add static
+        frames, like menus and loading screens
+    """
+    encoder = _get_encoder(codec_name)
+    encoder.width = width
+    encoder.height = height
+    encoder.pix_fmt = "yuv420p"
+    encoder.time_base = Fraction(1, fps)
+    encoder.framerate = Fraction(fps, 1)
+    encoder.gop_size = gop if gop > 0 else fps
+    encoder.options = {"preset": "ultrafast", "tune": "zerolatency"}
+    encoder.open()
+    _LOGGER.debug(
+        "Encoding synthetic clip: %s %sx%s@%s", encoder.name, width, height, fps
+    )
+
+    packets = []
+    for index in range(int(seconds * fps)):
+        frame = av.VideoFrame.from_ndarray(
+            _frame_planes(width, height, index // max(1, hold)), format="yuv420p"
+        )
+        frame.pts = index
+        packets.extend(bytes(packet) for packet in encoder.encode(frame))
+    packets.extend(bytes(packet) for packet in encoder.encode(None))
+    encoder.close()
+    return packets
@@ -0,0 +1,234 @@
+"""Views of decoded frames: regions of interest and scaled variants."""
+
+from __future__ import annotations
+import logging
+import threading
+from typing import NamedTuple
+import warnings
+
+from . import QueueReceiver
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import av
+except ModuleNotFoundError:
+    warnings.warn("av not installed")
+
+# Formats cropped directly from planes. Chroma is subsampled by 2 both ways.
+PLANAR_420 = ("yuv420p", "yuvj420p")
+# Tolerance of float sums, i.e. 0.7 + 0.3.
+EPSILON = 1e-9
+
+
+class Region(NamedTuple):
+    """Region of a frame in fractions of frame width and height."""
+
+    left: float
+    top: float
+    width: float
+    height: float
+
+    def validate(self):
+        """Raise ValueError if region is empty or not inside the frame."""
+        if not all(0 <= value <= 1 for value in self):
+            raise ValueError(f"Region values must be fractions between 0 and 1: {self}")
+        if self.width <= 0 or self.height <= 0:
+            raise ValueError(f"Region must not be empty: {self}")
+        if self.left + self.width > 1 + EPSILON or self.top + self.height > 1 + EPSILON:
+            raise ValueError(f"Region must be inside the frame: {self}")
+
+    def pixels(self, frame_width: int, frame_height: int) -> tuple[int, int, int, int]:
+        """Return left, top, width, height in pixels aligned for 4:2:0 chroma.
+
+        Raise ValueError if region is invalid or too small for the frame.
+        """
+        self.validate()
+        left = int(self.left * frame_width) & ~1
+        top = int(self.top * frame_height) & ~1
+        width = max(2, int(self.width * frame_width) & ~1)
+        height = max(4, int(self.height * frame_height) & ~3)
+        width = min(width, (frame_width - left) & ~1)
+        height = min(height, (frame_height - top) & ~3)
+        if width <= 0 or height <= 0:
+            raise ValueError(
+                f"Region is empty in frame of {frame_width}x{frame_height}: {self}"
+            )
+        return left, top, width, height
+
+
+def _plane_array(plane, width: int, height: int):
+    """Return plane as array of (height, width) without copying."""
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    rows = np.frombuffer(plane, np.uint8).reshape(-1, plane.line_size)
+    return rows[:height, :width]
+
+
+def crop_frame(frame: av.VideoFrame, region: Region) -> av.VideoFrame:
+    """Return region of frame in the frame's format.
+
+    4:2:0 frames are cropped from their planes, so no pixels outside the
+    region are converted. Other formats are converted to `rgb24` first.
+    """
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    left, top, width, height = region.pixels(frame.width, frame.height)
+    if frame.format.name in PLANAR_420:
+        luma = _plane_array(frame.planes[0], frame.width, frame.height)
+        chroma = [
+            _plane_array(plane, frame.width // 2, frame.height // 2)
+            for plane in frame.planes[1:3]
+        ]
+        rows = [luma[top : top + height, left : left + width]]
+        for plane in chroma:
+            rows_range = slice(top // 2, (top + height) // 2)
+            part = plane[rows_range, left // 2 : (left + width) // 2]
+            rows.append(np.ascontiguousarray(part).reshape(-1, width))
+        return av.VideoFrame.from_ndarray(np.concatenate(rows), format="yuv420p")
+    image = frame.to_ndarray(format="rgb24")
+    image = np.ascontiguousarray(image[top : top + height, left : left + width])
+    return av.VideoFrame.from_ndarray(image, format="rgb24")
+
+
+class FrameView:
+    """Decoded frame with cached derived views.
+
+    Regions and scaled variants are computed once per frame. Consumers
+    asking for the same region, scale and format share the result.
+    Scaling and conversion are done in one swscale pass.
+
+    Attributes of the decoded frame, i.e. `width` and `to_ndarray`,
+    are available on the view.
+
+    :param frame: Decoded video frame. Should be in the decoder's format
+    :param regions: Named regions of interest
+    """
+
+    def __init__(self, frame: av.VideoFrame, regions: dict[str, Region] = None):
+        self._frame = frame
+        self._regions = regions or {}
+        self._cache: dict[tuple, av.VideoFrame] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+
+    def __getattr__(self, name: str):
+        return getattr(self._frame, name)
+
+    def _derive(self, key: tuple, func) -> av.VideoFrame:
+        with self._lock:
+            view = self._cache.get(key)
+            if view is None:
+                view = func()
+                self._cache[key] = view
+            else:
+                self._hits += 1
+        return view
+
+    @staticmethod
+    def _output(frame: av.VideoFrame, video_format: str, scale: float):
+        width = max(2, int(frame.width * scale) & ~1)
+        height = max(2, int(frame.height * scale) & ~1)
+        video_format = video_format or frame.format.name
+        if scale >= 1.0 and video_format == frame.format.name:
+            return frame
+        return frame.reformat(width, height, video_format)
+
+    def region(
+        self, name: str, video_format: str = "rgb24", scale: float = 1.0
+    ) -> av.VideoFrame:
+        """Return named region of interest.
+
+        :param name: Name of region
+        :param video_format: Format to output region as.
+            If None, the frame's format is used.
+        :param scale: Scale of output size
+        """
+        try:
+            region = self._regions[name]
+        except KeyError as error:
+            raise ValueError(f"Unknown region: {name}") from error
+        return self.crop(region, video_format, scale)
+
+    def crop(
+        self, region: Region, video_format: str = "rgb24", scale: float = 1.0
+    ) -> av.VideoFrame:
+        """Return region of frame.
+
+        :param region: Region in fractions of frame size
+        :param video_format: Format to output region as.
+            If None, the frame's format is used.
+        :param scale: Scale of output size
+        """
+        region = Region(*region)
+        cropped = self._derive(
+            ("crop", region), lambda: crop_frame(self._frame, region)
+        )
+        return self._derive(
+            ("region", region, video_format, scale),
+            lambda: FrameView._output(cropped, video_format, scale),
+        )
+
+    def scaled(self, scale: float, video_format: str = "rgb24") -> av.VideoFrame:
+        """Return whole frame scaled, i.e. 0.25 for a thumbnail.
+
+        :param scale: Scale of output size
+        :param video_format: Format to output frame as.
+            If None, the frame's format is used.
+        """
+        return self._derive(
+            ("scaled", scale, video_format),
+            lambda: FrameView._output(self._frame, video_format, scale),
+        )
+
+    @property
+    def frame(self) -> av.VideoFrame:
+        """Return decoded frame."""
+        return self._frame
+
+    @property
+    def cache_info(self) -> dict:
+        """Return number of cached views and cache hits."""
+        return {"views": len(self._cache), "hits": self._hits}
+
+
+class ViewReceiver(QueueReceiver):
+    """Queue receiver which stores frames as :class:`FrameView`.
+
+    Frames are kept in the decoder's format. Only the regions and scaled
+    variants consumers ask for are converted.
+
+    Usage: `receiver.get_latest_video_frame().region("minimap")`
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._video_format = None
+        self._regions: dict[str, Region] = {}
+
+    def add_region(
+        self, name: str, left: float, top: float, width: float, height: float
+    ):
+        """Add named region of interest. Values are fractions of frame size.
+
+        Applies to frames received after adding.
+        Raise ValueError if region is empty or not inside the frame.
+        """
+        region = Region(left, top, width, height)
+        region.validate()
+        self._regions = {**self._regions, name: region}
+
+    def remove_region(self, name: str):
+        """Remove named region of interest."""
+        regions = dict(self._regions)
+        regions.pop(name, None)
+        self._regions = regions
+
+    def handle_video(self, frame: av.VideoFrame):
+        """Handle video frame. Add view of frame to queue."""
+        super().handle_video(FrameView(frame, self._regions))
+
+    @property
+    def regions(self) -> dict[str, Region]:
+        """Return named regions of interest."""
+        return dict(self._regions)
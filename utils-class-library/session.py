@@ -3,10 +3,11 @@ from __future__ import annotations
 import asyncio
 import logging
 import socket
+import threading
 import time
-from typing import Union
+from typing import Callable, Union
 from base64 import b64decode, b64encode
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import IntEnum, auto
 from functools import partial
 from struct import pack_into
@@ -16,6 +17,8 @@ from Cryptodome.Random import get_random_bytes
 from pyee import ExecutorEventEmitter
 
 from pyremoteplay.receiver import AVReceiver
+from pyremoteplay.receiver.probe import best_decoder, is_probed
+from pyremoteplay.receiver.switch import ReceiverSwitch
 from .const import (
     DEFAULT_SESSION_TIMEOUT,
     FPS,
@@ -182,7 +185,16 @@ class Session:
     :param quality: Quality of video stream. Name of or value of or `Quality` enum
     :param codec: Name of FFMPEG video codec to use. i.e. 'h264', 'h264_cuvid'.
         Video codec should be 'h264' or 'hevc'. PS4 hosts will always use h264.
+        If 'auto', the fastest h264 decoder on this machine is used,
+        or the fastest hevc decoder if hdr is True.
+        If decoders are not ranked for the resolution and fps yet, they are
+        probed in an executor when the session starts. The default decoder
+        is used until probing is done.
+        See :func:`best_decoder() <pyremoteplay.receiver.probe.best_decoder>`.
     :param hdr: Uses HDR if True. Has no effect if codec is 'h264'
+    :param decode_profile: Video decode profile. 'full' or 'fast'.
+        'fast' trades image quality for lower CPU usage.
+        See `AVReceiver.DECODE_PROFILES`.
     """
 
     HEADER_LENGTH = 8
@@ -281,6 +293,7 @@ class Session:
         quality: Union[Quality, str, int] = "default",
         codec: str = "h264",
         hdr: bool = False,
+        decode_profile: str = "full",
     ):
         self.error = ""
         self.disconnect_reason = ""
@@ -290,6 +303,7 @@ class Session:
         self._session_id = b""
         self._server_type = Session.ServerType.UNKNOWN
         self._type = ""
+        self._mac_address = ""
         self._regist_key = None
         self._rp_key = None
         self._sock = None
@@ -298,6 +312,9 @@ class Session:
         self._state = Session.State.INIT
         self._stream = None
         self._receiver = None
+        self._receiver_attached = True
+        self._switch: ReceiverSwitch = None
+        self._packet_taps = []
         self._events = ExecutorEventEmitter()
         self._loop = loop
         self._protocol = None
@@ -315,17 +332,34 @@ class Session:
 
         if not codec:
             codec = "h264"
-        self._codec = codec.lower()
+        codec = codec.lower()
+        self._decoder_config = {}
+        self._decoder_probe = None
+        self._probe_stream = ""
+        if codec == "auto":
+            stream_type = "hevc" if hdr else "h264"
+            # Probing blocks. Only cached rankings are used here.
+            self._decoder_config = best_decoder(
+                stream_type, self._resolution, self._fps, probe=False
+            )
+            if not is_probed(stream_type, self._resolution, self._fps):
+                self._probe_stream = stream_type
+            codec = self._decoder_config["codec"]
+        else:
+            stream_type = codec.split("_")[0]
+        self._codec = codec
 
-        stream_type = codec.split("_")[0]
-        if hdr and not codec.startswith("h264"):
+        if hdr and not stream_type.startswith("h264"):
             stream_type = f"{stream_type}_hdr"
         self._stream_type = StreamType.parse(stream_type)
 
-        if self._codec.split("_")[0].upper() not in self._stream_type.name:
+        if stream_type.split("_")[0].upper() not in self._stream_type.name:
             raise ValueError(
                 f"Codec: {self._codec} does not seem to match stream type: {self._stream_type.name}"
             )
+        if decode_profile not in AVReceiver.DECODE_PROFILES:
+            raise ValueError(f"Invalid decode profile: {decode_profile}")
+        self._decode_profile = decode_profile
         self.set_receiver(receiver)
 
     def _set_lowest_stream(self):
@@ -341,6 +375,7 @@ class Session:
         if not regist_data:
             return False
         self._regist_data = regist_data["data"]
+        self._mac_address = mac_address
         self._type = status.get("host-type")
         self._regist_key = self._regist_data["RegistKey"]
         self._rp_key = bytes.fromhex(self._regist_data["RP-Key"])
@@ -552,12 +587,58 @@ class Session:
         self._stream = RPStream(
             self, stop_event, is_test=test, cb_stop=cb_stop, mtu=mtu, rtt=rtt
         )
-        if not test and self.receiver:
-            self._stream.add_receiver(self.receiver)
+        if not test:
+            self._apply_decoder_probe()
+            # Stream data goes through the switch so receivers can be
+            # attached and detached while the stream runs.
+            self._switch = ReceiverSwitch(self)
+            for tap in self._packet_taps:
+                self._switch.add_tap(tap)
+            if self.receiver and self._receiver_attached:
+                self._switch.attach(self.receiver)
+            self._stream.add_receiver(self._switch)
         self.loop.create_task(self._stream.async_connect())
         if test:
             self.loop.create_task(self._wait_for_test(stop_event))
 
+    def _start_decoder_probe(self):
+        """Probe decoders for the stream in a daemon thread if not ranked yet.
+
+        The thread is never waited for, so stopping the session does not
+        block while probing.
+        """
+        if not self._probe_stream or self._decoder_probe is not None:
+            return
+        _LOGGER.info("Probing decoders. Using %s until done", self._codec)
+        probe = Future()
+        args = (self._probe_stream, self._resolution, self._fps)
+
+        def run():
+            try:
+                probe.set_result(best_decoder(*args))
+            # pylint: disable=broad-except
+            except Exception as error:
+                probe.set_exception(error)
+
+        self._decoder_probe = probe
+        threading.Thread(target=run, name="decoder_probe", daemon=True).start()
+
+    def _apply_decoder_probe(self):
+        """Use probed decoder if probing is done. Default is kept otherwise."""
+        probe = self._decoder_probe
+        if probe is None or not probe.done():
+            return
+        self._decoder_probe = None
+        self._probe_stream = ""
+        if self.state == Session.State.STOP:
+            return
+        if probe.exception() is not None:
+            _LOGGER.warning("Decoder probe failed. Using %s", self._codec)
+            return
+        self._decoder_config = probe.result()
+        self._codec = self._decoder_config["codec"]
+        _LOGGER.info("Using decoder: %s", self._decoder_config)
+
     async def _wait_for_test(self, stop_event):
         """Wait for network test to complete. Uses defaults if timed out."""
         try:
@@ -632,6 +713,7 @@ class Session:
 
         if not self.loop:
             self._loop = asyncio.get_running_loop()
+        self._start_decoder_probe()
         status = await self._check_host()
         if not status[0]:
             self.error = f"Host @ {self._host} is not reachable."
@@ -673,7 +755,8 @@ class Session:
             for task in self._tasks:
                 task.cancel()
         if self._thread_executor:
-            self._thread_executor.shutdown()
+            # Not waited for. A running decoder probe is not in this executor.
+            self._thread_executor.shutdown(wait=False, cancel_futures=True)
         if self._protocol:
             self._protocol.close()
         if self.events:
@@ -687,7 +770,11 @@ class Session:
         self._events = None
 
     def set_receiver(self, receiver: AVReceiver):
-        """Set AV Receiver. Should be set before starting session."""
+        """Set AV Receiver. The previous receiver is closed.
+
+        Can be set while the session is running. Video decoding starts
+        at the next keyframe.
+        """
         cls = AVReceiver
         if receiver is None:
             return
@@ -697,8 +784,50 @@ class Session:
             raise ValueError(f"Cannot set receiver of abstract class {cls}")
         old_receiver = self._receiver
         self._receiver = receiver
-        if old_receiver:
-            old_receiver.close()
+        if self._switch and self._receiver_attached:
+            self._switch.attach(receiver)
+        if old_receiver and old_receiver is not receiver:
+            if self._switch:
+                # Closed when done decoding. Never blocks the loop.
+                self._switch.close_receiver(old_receiver)
+            else:
+                old_receiver.close()
+
+    def add_packet_tap(self, tap: Callable[[str, bytes, float], None]):
+        """Add tap which receives every compressed AV packet.
+
+        Can be added before or while the session is running.
+        See :class:`ReceiverSwitch <pyremoteplay.receiver.switch.ReceiverSwitch>`.
+
+        :param tap: Called with kind, buffer and arrival of each packet
+        """
+        if tap not in self._packet_taps:
+            self._packet_taps.append(tap)
+        if self._switch:
+            self._switch.add_tap(tap)
+
+    def remove_packet_tap(self, tap: Callable[[str, bytes, float], None]):
+        """Remove packet tap."""
+        if tap in self._packet_taps:
+            self._packet_taps.remove(tap)
+        if self._switch:
+            self._switch.remove_tap(tap)
+
+    def detach_receiver(self):
+        """Stop passing stream data to receiver. Data is dropped before decoding.
+
+        The receiver is kept and its frames stay available.
+        Use :meth:`attach_receiver` to resume.
+        """
+        self._receiver_attached = False
+        if self._switch:
+            self._switch.detach()
+
+    def attach_receiver(self):
+        """Resume passing stream data to receiver. Video decoding starts at the next keyframe."""
+        self._receiver_attached = True
+        if self._switch and self._receiver:
+            self._switch.attach(self._receiver)
 
     def _set_ready(self):
         self._state = Session.State.READY
@@ -743,6 +872,11 @@ class Session:
         """Return host type."""
         return self._type
 
+    @property
+    def mac_address(self) -> str:
+        """Return host MAC address. Empty until the host status is received."""
+        return self._mac_address
+
     @property
     def state(self) -> State:
         """Return State."""
@@ -808,6 +942,16 @@ class Session:
         """Return video codec."""
         return self._codec
 
+    @property
+    def decoder_config(self) -> dict:
+        """Return decoder config. Contains `thread_type` if codec is 'auto'."""
+        return dict(self._decoder_config)
+
+    @property
+    def decode_profile(self) -> str:
+        """Return video decode profile."""
+        return self._decode_profile
+
     @property
     def hdr(self) -> bool:
         """Return True if HDR."""
@@ -830,6 +974,11 @@ class Session:
         """Return AV Receiver."""
         return self._receiver
 
+    @property
+    def receiver_attached(self) -> bool:
+        """Return True if stream data is passed to receiver."""
+        return self._receiver_attached and self._receiver is not None
+
     @property
     def events(self) -> ExecutorEventEmitter:
         """Return Event Emitter."""